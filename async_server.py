@@ -0,0 +1,503 @@
+"""
+async_server.py
+
+asyncio event-loop mode of the Battleships server.
+
+Every connection is a coroutine instead of a thread, accepts are non-blocking,
+and the lobby / match loop wake up on events rather than polling with
+time.sleep. It speaks the same wire protocol as server.py: client.py and
+loadgen.py negotiate codecs and compression in their HELLO, and a client
+from before HELLO is served the original protocol (see utils.answer_hello).
+
+    python3 async_server.py
+"""
+
+import asyncio
+import argparse
+import itertools
+import resource
+from battleship import run_two_player_game_async, fleet_pool, GAME_SHIPS
+from bots import BotPlayer, BOT_LEVELS
+from server import GameState
+from utils import *
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+HOST = "127.0.0.1"
+PORT = 5000
+ACCEPT_BACKLOG = 4096       # Pending connections the kernel may queue for us
+INPUT_QUEUE_LIMIT = 16      # Commands a player may have queued ahead of the game
+BOT_WAIT = 20.0             # Seconds a lone player waits before a bot is seated against them
+BOT_LEVEL = "hunt"          # Bot strategy, one of bots.BOT_LEVELS
+
+# ─── Shared State ──────────────────────────────────────────────────────────────
+# No locks needed: everything below is only touched from the event loop.
+connected_players = set()   # Every live AsyncPlayer, logged in or not
+player_queue = PlayerQueue() # AsyncPlayer instances, players first then spectators
+all_player_logins = {}
+bot_names = set()           # Usernames of the bots currently seated, off-limits to humans
+current_state = None
+queue_changed = None        # asyncio.Event, set whenever player_queue changes
+bot_wait = BOT_WAIT         # None = never seat bots (see --bot-wait)
+bot_level = BOT_LEVEL
+bot_ids = itertools.count(1)
+
+
+# ─── Async Player Class ────────────────────────────────────────────────────────
+class AsyncPlayer:
+    is_bot = False
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info("peername")
+        self.username = None
+        self.pin = None
+        self.my_turn = False
+        self.inbox = asyncio.Queue(INPUT_QUEUE_LIMIT)  # Commands waiting for the match coroutine
+        self.connected = True
+        self.seq = 0
+        self.recv_seq = 0
+        self.protocol = LEGACY_PROTOCOL  # until the client's HELLO says otherwise
+        self.board_versions = None  # (board id, show_ships) -> version last sent; set on HELLO
+        self.codec = "json"         # until the client's HELLO picks another
+        self.compression = None     # likewise
+
+    def clear_inputs(self):
+        while not self.inbox.empty():
+            self.inbox.get_nowait()
+
+
+class AsyncBotPlayer(BotPlayer):
+    """
+    BotPlayer for the event loop: its moves go into an `inbox` like an
+    AsyncPlayer's, and the match it is in is always current_state.
+    """
+    def __init__(self, username, level=BOT_LEVEL):
+        super().__init__(username, level)
+        self.inbox = asyncio.Queue()
+
+    def push_input(self, coord) -> bool:
+        self.inbox.put_nowait(coord)
+        return True
+
+    def clear_inputs(self):
+        while not self.inbox.empty():
+            self.inbox.get_nowait()
+
+    def game_state(self):
+        return current_state
+
+def new_bot():
+    """
+    An AsyncBotPlayer under a fresh name, reserved in bot_names so no human
+    can register it while the bot plays. retire_bot() gives the name back.
+    """
+    username = f"{bot_level.capitalize()}Bot-{next(bot_ids)}"
+    while username in all_player_logins or username in bot_names:
+        username = f"{bot_level.capitalize()}Bot-{next(bot_ids)}"
+    bot_names.add(username)
+    return AsyncBotPlayer(username, bot_level)
+
+def retire_bot(bot):
+    """Take a bot out of the queue for good and release its name."""
+    player_queue.discard(bot)
+    bot_names.discard(bot.username)
+
+
+def _queue_changed():
+    queue_changed.set()
+
+
+# ─── Async Client Handler ──────────────────────────────────────────────────────
+async def client_handler(reader, writer):
+    """
+    Coroutine equivalent of server.client_handler: log in, join the queue,
+    then relay chat and feed in-game commands into the player's inbox.
+    """
+    player = AsyncPlayer(reader, writer)
+    connected_players.add(player)
+    print(f"[INFO] New connection from {player.addr}")
+
+    try:
+        # ── 1.  Login / Register ────────────────────────────────────────────
+        while player.username is None and player.pin is None:
+            package = await receive_package_async(player)
+            if not package:
+                raise ConnectionError("Lost during login")
+            if package.get("type") == "hello":
+                await answer_hello_async(player, package)
+                player.board_versions = {}  # only clients that said HELLO get deltas
+                continue
+
+            try:
+                cmd, username = package.get("coord").split(maxsplit=1)
+            except ValueError:
+                raise ConnectionError
+
+            if cmd == "REGISTER":
+                if username in all_player_logins or username in bot_names:
+                    await send_package_async(player, MessageTypes.S_MESSAGE, "USERNAME_TAKEN")
+                    continue
+                await send_package_async(player, MessageTypes.S_MESSAGE, "USERNAME_OK")
+                pin_package = await receive_package_async(player)
+                pin = pin_package.get("coord").split()[-1]
+                all_player_logins[username] = pin
+                await send_package_async(player, MessageTypes.S_MESSAGE, "REGISTRATION_SUCCESS")
+                player.username, player.pin = username, pin
+
+            elif cmd == "LOGIN":
+                if username not in all_player_logins:
+                    await send_package_async(player, MessageTypes.S_MESSAGE, "USER_NOT_FOUND")
+                    continue
+                await send_package_async(player, MessageTypes.S_MESSAGE, "USERNAME_OK")
+                for _ in range(3):
+                    pin_package = await receive_package_async(player)
+                    pin_try = pin_package.get("coord").split()[-1]
+                    if pin_try == all_player_logins[username]:
+                        await send_package_async(player, MessageTypes.S_MESSAGE, "LOGIN_SUCCESS")
+                        player.username, player.pin = username, pin_try
+                        break
+                    await send_package_async(player, MessageTypes.S_MESSAGE, "LOGIN_FAILURE")
+                else:
+                    continue
+
+            else:
+                await send_package_async(player, MessageTypes.S_MESSAGE, "You must either login or register before joining")
+
+        role_msg = (
+            "Waiting for your opponent…" if len(player_queue) < 2
+            else f"You are number {len(player_queue)-1} in the queue - you'll see live updates of the current game."
+        )
+        await send_package_async(player, MessageTypes.WAITING, role_msg)
+
+        # ── 2.  Join the queue ──────────────────────────────────────────────
+        player_queue.append(player)
+        _queue_changed()
+
+        # ── 3.  Main receive loop ───────────────────────────────────────────
+        while player.connected:
+            package = await receive_package_async(player)
+            if not package:
+                raise ConnectionError("disconnect")
+
+            # --- CHAT ------------------------------------------------------
+            if package.get("type") == "chat":
+                msg = f"{player.username}: {package.get('msg')}"
+                await broadcast(msg=msg, msg_type=MessageTypes.CHAT)
+                continue
+
+            # --- RESYNC (client missed a BOARD_DELTA) ----------------------
+            if (package.get("coord") or "").startswith("RESYNC"):
+                await resync_board(player, package.get("coord"))
+                continue
+
+            # --- NON-CHAT (commands / coords) -----------------------------
+            actively_playing = current_state and player.username in current_state.players
+
+            if not (actively_playing or player.my_turn):
+                await send_package_async(player, MessageTypes.S_MESSAGE,
+                                         "Please wait, it isn't your turn.")
+                continue
+
+            coord = package.get("coord")
+            if coord:
+                try:
+                    player.inbox.put_nowait(coord)
+                except asyncio.QueueFull:
+                    await send_package_async(player, MessageTypes.S_MESSAGE,
+                                             f"Too many commands queued - dropped '{coord}'.")
+            else:
+                await send_package_async(player, MessageTypes.S_MESSAGE,
+                                         "Invalid move payload.")
+
+    except (ConnectionError, OSError):
+        print(f"[INFO] {player.username} disconnected.")
+    finally:
+        player.connected = False
+        try:
+            player.inbox.put_nowait(None)   # wake a match waiting on this player
+        except asyncio.QueueFull:
+            pass                            # not waiting: it'll see `connected`
+        connected_players.discard(player)
+        # Only the spectators behind a leaving player move up
+        index = player_queue.position(player)
+        if player_queue.discard(player):
+            _queue_changed()
+            await resend_queue_pos(max(1, index - 1))
+        writer.close()
+
+
+# ─── Match & Rematch Logic ─────────────────────────────────────────────────────
+async def start_match(p1: AsyncPlayer, p2: AsyncPlayer, state: GameState):
+    """
+    Start a single match between p1 and p2. Returns ('done', winner) or
+    ('connection_lost', None).
+    """
+    game_starting_message = f"Starting match between {p1.username} and {p2.username}"
+
+    print("[INFO] " + game_starting_message)
+    await broadcast(msg=game_starting_message, msg_type=MessageTypes.S_MESSAGE)
+
+    await asyncio.sleep(2)
+
+    return await run_two_player_game_async(p1, p2, state, notify_spectators, broadcast)
+
+async def handle_connection_lost(p1, p2):
+    """
+    Same contract as server.handle_connection_lost, but instead of checking the
+    queue once a second we sleep on `queue_changed` until the deadline.
+    """
+    winner, loser = (p2, p1) if not p1.connected else (p1, p2)
+
+    await broadcast(
+        msg=f"{loser.username} has disconnected, they have 15 seconds to reconnect...",
+        msg_type=MessageTypes.WAITING
+    )
+
+    player_queue.discard(loser)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + 15
+    insert_at = 0 if loser is p1 else 1
+
+    while (remaining := deadline - loop.time()) > 0:
+        if (pl := player_queue.get(loser.username)) is not None:
+                player_queue.discard(pl)
+                player_queue.insert(insert_at, pl)
+                await broadcast(msg=f"{pl.username} has reconnected! "
+                                    "Resuming game from where it left off...",
+                                msg_type=MessageTypes.S_MESSAGE)
+                return True
+
+        queue_changed.clear()
+        try:
+            await asyncio.wait_for(queue_changed.wait(), remaining)
+        except asyncio.TimeoutError:
+            break
+
+    await broadcast(msg=f"{loser.username} failed to reconnect in time – starting a new game…",
+                    msg_type=MessageTypes.S_MESSAGE)
+    return False
+
+
+# ─── Announcements ─────────────────────────────────────────────────────────────
+async def _safe_send(player, type, *args):
+    return await _safe_send_prepared(player, type, build_payload(type, *args))
+
+async def resync_board(player, command):
+    """
+    Coroutine version of server.resync_board: send a full snapshot of a board
+    view the client lost track of. Only boards in the current match qualify,
+    and only the player's own board with ships showing.
+    """
+    try:
+        _, board_id, show_ships = command.split()
+        board_id, show_ships = int(board_id), show_ships == "1"
+    except ValueError:
+        return
+    if current_state is None or player not in player_queue or player.board_versions is None:
+        return
+    for board in current_state.boards.values():
+        if board is None or board.board_id != board_id:
+            continue
+        if show_ships and current_state.boards.get(player.username) is not board:
+            return
+        player.board_versions.pop((board_id, show_ships), None)
+        await _safe_send_prepared(player, *board_message(player, board, show_ships))
+        return
+
+async def _safe_send_prepared(player, type, payload):
+    try:
+        await send_payload_async(player, type, payload)
+        return True
+    except ConnectionError:
+        if player_queue.discard(player):
+            _queue_changed()
+        print(f"[INFO] Removed unreachable player {player.username}")
+        return False
+
+async def broadcast(
+        *,
+        msg=None,
+        msg_type=MessageTypes.S_MESSAGE,
+        board=None,
+        show_ships=False,
+        spectators_only=False,
+        targets=None):
+    """
+    Same parameters as server.broadcast. Recipients are written to
+    concurrently so one slow socket doesn't hold up the rest. `targets`
+    overrides the queue-derived audience (used for shutdown notices).
+    """
+    if targets is None:
+        targets = player_queue.tail(2) if spectators_only else list(player_queue)
+
+    # Render and serialise once (boards once per distinct delta); only seq,
+    # encryption and framing are per player
+    board_updates = {}
+    msg_payload = build_payload(msg_type, msg) if msg is not None else None
+
+    async def deliver(p):
+        if board is not None and not await _safe_send_prepared(
+                p, *board_message(p, board, show_ships, shared=board_updates)):
+            return
+        if msg_payload is not None:
+            await _safe_send_prepared(p, msg_type, msg_payload)
+
+    await asyncio.gather(*(deliver(p) for p in list(targets)))
+
+async def notify_spectators(defender_board, result, ships_sunk, attacker):
+    """
+    Computes the right message(s) then delegates to broadcast().
+    """
+    if ships_sunk:
+        await broadcast(
+            msg=f"{attacker.username} has won!",
+            msg_type=MessageTypes.S_MESSAGE,
+            spectators_only=True
+        )
+        await resend_queue_pos()
+        return
+
+    if result == "timeout":
+        text = f"{attacker.username} timed out. They lose!"
+        await resend_queue_pos()
+    else:
+        verb = {"hit": "HIT", "miss": "MISSED", "already_shot": "ALREADY SHOT"}[result]
+        text = f"{attacker.username} has {verb} the defender."
+
+    await broadcast(msg=text,
+                    msg_type=MessageTypes.S_MESSAGE,
+                    board=defender_board,
+                    show_ships=False,
+                    spectators_only=True)
+
+async def resend_queue_pos(from_position=1):
+    """
+    Tell spectators their place in line. Pass `from_position` when only
+    those from that place back have moved (e.g. someone ahead left).
+    """
+    spectators = player_queue.tail(1 + from_position)
+    await asyncio.gather(*(
+        _safe_send(spec, MessageTypes.WAITING, f"You are number {position} in the queue")
+        for position, spec in enumerate(spectators, start=from_position)
+    ))
+
+
+# ─── Matchmaker ────────────────────────────────────────────────────────────────
+async def matchmaker():
+    """
+    Coroutine version of server.main's game loop. Sleeps on `queue_changed`
+    instead of polling once a second while fewer than two players are queued.
+    """
+    global current_state
+
+    while True:
+        if len(player_queue) < 2:
+            lone = player_queue.head(1)
+            if lone and lone[0].is_bot:
+                retire_bot(lone[0])     # bots only backfill a match
+                continue
+            queue_changed.clear()
+            try:
+                await asyncio.wait_for(queue_changed.wait(), bot_wait if lone else None)
+            except asyncio.TimeoutError:
+                bot = new_bot()
+                print(f"[INFO] Seated {bot.username} against {lone[0].username}")
+                player_queue.append(bot)
+            continue
+
+        p1, p2 = player_queue.head(2)
+
+        if (current_state is None) or (current_state.players != {p1.username, p2.username}):
+            current_state = GameState(p1, p2)
+            for player in (p1, p2):
+                player.clear_inputs()
+
+        result, winner = await start_match(p1, p2, current_state)
+        conn_lost = (result == "connection_lost")
+        conn_found = conn_lost and await handle_connection_lost(p1, p2)
+
+        if not conn_found:
+            current_state = None
+
+        if conn_lost:
+            continue
+
+        loser = p2 if winner is p1 else p1
+        for player in (p1, p2):
+            player_queue.discard(player)
+        player_queue.appendleft(winner)
+        # A bot that loses makes way for anyone waiting to play
+        if loser.is_bot and len(player_queue) > 1:
+            retire_bot(loser)
+        else:
+            player_queue.append(loser)
+
+        if len(player_queue) >= 2:
+            next_up = player_queue.head(2)
+            await broadcast(msg=f"A new game will start shortly between {next_up[0].username} and {next_up[1].username}", msg_type=MessageTypes.WAITING)
+        await resend_queue_pos()
+        await asyncio.sleep(3)
+
+
+# ─── Main Server Loop ──────────────────────────────────────────────────────────
+def _raise_fd_limit():
+    """
+    Each idle client costs one file descriptor and no thread, so the open-file
+    limit is what caps us. Lift the soft limit as far as the hard limit allows.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        soft = hard
+    return soft
+
+async def serve(host=HOST, port=PORT, backlog=ACCEPT_BACKLOG):
+    global queue_changed
+    queue_changed = asyncio.Event()
+
+    server = await asyncio.start_server(client_handler, host, port,
+                                        backlog=backlog, reuse_address=True)
+    print(f"[INFO] Async server started on {host}:{port}, listening for connections...")
+
+    try:
+        async with server:
+            await asyncio.gather(server.serve_forever(), matchmaker())
+    except asyncio.CancelledError:
+        print("[INFO] Ctrl+C received. Shutting down...")
+        await broadcast(msg="Server is shutting down.",
+                        msg_type=MessageTypes.SHUTDOWN,
+                        targets=connected_players)
+        raise
+
+def main(host=HOST, port=PORT, backlog=ACCEPT_BACKLOG, wait_for_bot=BOT_WAIT, bot_strategy=BOT_LEVEL):
+    global bot_wait, bot_level
+    bot_wait, bot_level = wait_for_bot, bot_strategy
+    derive_key('we_love_cs')
+    fleet_pool(GAME_SHIPS)  # Fill the AUTO placement pool before anyone can ask for it
+    print(f"[INFO] Open file limit: {_raise_fd_limit()}")
+
+    try:
+        asyncio.run(serve(host, port, backlog))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[INFO] Compression: {compression_stats.summary()}")
+        print("[INFO] Server socket closed. Exiting.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Battleships server (asyncio mode)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--backlog", type=int, default=ACCEPT_BACKLOG,
+                        help="listen() backlog for pending connections")
+    parser.add_argument("--bot-wait", type=float, default=BOT_WAIT,
+                        help="seconds a lone player waits before playing a bot (negative: never)")
+    parser.add_argument("--bot-level", choices=BOT_LEVELS, default=BOT_LEVEL,
+                        help="strategy the bot plays")
+    args = parser.parse_args()
+    main(args.host, args.port, args.backlog,
+         wait_for_bot=args.bot_wait if args.bot_wait >= 0 else None, bot_strategy=args.bot_level)
@@ -10,6 +10,10 @@ Contains core data structures and logic for Battleship, including:
 
 import time
 import random
+import itertools
+import functools
+import threading
+from fleets import FleetPool, random_fleet
 from utils import *
 
 BOARD_SIZE = 10
@@ -21,6 +25,8 @@ SHIPS = [
     ("Destroyer", 2)
 ]
 
+_board_ids = itertools.count(1)
+
 
 class Board:
     """
@@ -31,9 +37,18 @@ class Board:
       - self.placed_ships: a list of dicts, each dict with:
           {
              'name': <ship_name>,
+             'size': <ship length>,
              'positions': set of (r, c),
           }
         used to determine when a specific ship has been fully sunk.
+      - self.ship_at / self.cells_afloat: cell -> ship index and a count of
+        unhit ship cells, so resolving a hit and spotting game over are
+        constant time whatever the fleet size. Both are kept by add_ship().
+      - self.version: bumped on every change to the grids, so rendered and
+        packed views can be cached until the board next changes.
+      - self.changes: one (version, cells, sunk_ship_name) entry per version,
+        so the server can send only what changed since a version a client
+        already has (see changes_since()).
 
     In a full 2-player networked game:
       - Each player has their own Board instance.
@@ -43,33 +58,41 @@ class Board:
 
     def __init__(self, size=BOARD_SIZE):
         self.size = size
+        self.board_id = next(_board_ids)  # Unique per process, names the board in BOARD_DELTA
+        self.version = 0        # Incremented by do_place_ship / fire_at
+        self.changes = []       # (version, cells, sunk ship name or None), oldest first
+        self._rendered = {}     # (kind, show_hidden) -> (version, view)
+        self._init_storage()
+
+    def _init_storage(self):
         # '.' for empty water
-        self.hidden_grid = [['.' for _ in range(size)] for _ in range(size)]
+        self.hidden_grid = [['.' for _ in range(self.size)] for _ in range(self.size)]
         # display_grid is what the player or an observer sees (no 'S')
-        self.display_grid = [['.' for _ in range(size)] for _ in range(size)]
+        self.display_grid = [['.' for _ in range(self.size)] for _ in range(self.size)]
         self.placed_ships = []  # e.g. [{'name': 'Destroyer', 'positions': {(r, c), ...}}, ...]
+        self.ship_at = {}       # r * size + c -> the placed_ships entry covering that cell
+        self.cells_afloat = 0   # ship cells not yet hit, across all named ships
 
     def place_ships_randomly(self, ships=SHIPS):
         """
         Randomly place each ship in 'ships' on the hidden_grid, storing positions for each ship.
+        Placements are drawn from precomputed tables (see fleets.random_fleet), so every
+        valid fleet is equally likely and dense boards don't stall.
         In a networked version, you might parse explicit placements from a player's commands
         (e.g. "PLACE A1 H BATTLESHIP") or prompt the user for board coordinates and placement orientations; 
         the self.place_ships_manually() can be used as a guide.
         """
-        for ship_name, ship_size in ships:
-            placed = False
-            while not placed:
-                orientation = random.randint(0, 1)  # 0 => horizontal, 1 => vertical
-                row = random.randint(0, self.size - 1)
-                col = random.randint(0, self.size - 1)
+        for placement in random_fleet(ships, self.size, self._taken_mask()):
+            self.add_ship(*placement)
 
-                if self.can_place_ship(row, col, ship_size, orientation):
-                    occupied_positions = self.do_place_ship(row, col, ship_size, orientation)
-                    self.placed_ships.append({
-                        'name': ship_name,
-                        'positions': occupied_positions
-                    })
-                    placed = True
+    def _taken_mask(self):
+        """Bitmask (bit r * size + c) of every cell that isn't open water."""
+        mask = 0
+        for r, row in enumerate(self.hidden_grid):
+            for c, cell in enumerate(row):
+                if cell != '.':
+                    mask |= 1 << (r * self.size + c)
+        return mask
 
 
     def place_ships_manually(self, ships=SHIPS):
@@ -102,11 +125,7 @@ class Board:
 
                 # Check if we can place the ship
                 if self.can_place_ship(row, col, ship_size, orientation):
-                    occupied_positions = self.do_place_ship(row, col, ship_size, orientation)
-                    self.placed_ships.append({
-                        'name': ship_name,
-                        'positions': occupied_positions
-                    })
+                    self.add_ship(ship_name, row, col, ship_size, orientation)
                     break
                 else:
                     print(f"  [!] Cannot place {ship_name} at {coord_str} (orientation={orientation_str}). Try again.")
@@ -132,6 +151,23 @@ class Board:
                     return False
         return True
 
+    def add_ship(self, ship_name, row, col, ship_size, orientation):
+        """
+        Place a named ship (after can_place_ship said yes) and track it for
+        sinking. Returns the set of occupied positions.
+        """
+        occupied_positions = self.do_place_ship(row, col, ship_size, orientation)
+        ship = {
+            'name': ship_name,
+            'size': ship_size,
+            'positions': set(occupied_positions)    # shrinks as the ship is hit
+        }
+        self.placed_ships.append(ship)
+        for r, c in occupied_positions:
+            self.ship_at[r * self.size + c] = ship
+        self.cells_afloat += len(occupied_positions)
+        return occupied_positions
+
     def do_place_ship(self, row, col, ship_size, orientation):
         """
         Place the ship on hidden_grid by marking 'S', and return the set of occupied positions.
@@ -145,6 +181,7 @@ class Board:
             for r in range(row, row + ship_size):
                 self.hidden_grid[r][col] = 'S'
                 occupied.add((r, col))
+        self._record_change(occupied)
         return occupied
 
     def fire_at(self, row, col):
@@ -165,6 +202,7 @@ class Board:
             self.display_grid[row][col] = 'X'
             # Check if that hit sank a ship
             sunk_ship_name = self._mark_hit_and_check_sunk(row, col)
+            self._record_change({(row, col)}, sunk_ship_name)
             if sunk_ship_name:
                 return ('hit', sunk_ship_name)  # A ship has just been sunk
             else:
@@ -173,6 +211,7 @@ class Board:
             # Mark a miss
             self.hidden_grid[row][col] = 'o'
             self.display_grid[row][col] = 'o'
+            self._record_change({(row, col)})
             return ('miss', None)
         elif cell == 'X' or cell == 'o':
             return ('already_shot', None)
@@ -184,24 +223,92 @@ class Board:
         """
         Remove (row, col) from the relevant ship's positions.
         If that ship's positions become empty, return the ship name (it's sunk).
-        Otherwise return None.
+        Otherwise return None. Constant time via the ship_at index.
         """
-        for ship in self.placed_ships:
-            if (row, col) in ship['positions']:
-                ship['positions'].remove((row, col))
-                if len(ship['positions']) == 0:
-                    return ship['name']
-                break
-        return None
+        ship = self.ship_at.get(row * self.size + col)
+        if ship is None:
+            return None
+        ship['positions'].discard((row, col))
+        self.cells_afloat -= 1
+        return ship['name'] if not ship['positions'] else None
 
     def all_ships_sunk(self):
         """
         Check if all ships are sunk (i.e. every ship's positions are empty).
         """
-        for ship in self.placed_ships:
-            if len(ship['positions']) > 0:
-                return False
-        return True
+        return self.cells_afloat == 0
+
+    def attack_view(self):
+        """
+        What the attacking player can know about this board, for bots: bitmasks
+        (bit r * size + c) of hits, misses and the cells of sunk ships, plus
+        the sizes of the named ships still afloat.
+        """
+        hits = misses = sunk = 0
+        for r, row in enumerate(self.display_grid):
+            for c, cell in enumerate(row):
+                if cell == 'X':
+                    hits |= 1 << (r * self.size + c)
+                elif cell == 'o':
+                    misses |= 1 << (r * self.size + c)
+        for index, ship in self.ship_at.items():
+            if not ship['positions']:
+                sunk |= 1 << index
+        afloat = [ship['size'] for ship in self.placed_ships if ship['positions']]
+        return hits, misses, sunk, afloat
+
+    def _record_change(self, cells, sunk_ship_name=None):
+        self.version += 1
+        self.changes.append((self.version, cells, sunk_ship_name))
+
+    def changes_since(self, version):
+        """
+        Cells changed after `version` and the ships sunk since then, as
+        (set of (r, c), [ship names]). None if `version` isn't one this board
+        has been at.
+        """
+        if not 0 <= version <= self.version:
+            return None
+        cells, sunk = set(), []
+        for v, changed, sunk_ship_name in reversed(self.changes):
+            if v <= version:
+                break
+            cells |= changed
+            if sunk_ship_name:
+                sunk.append(sunk_ship_name)
+        return cells, sunk[::-1]
+
+    def cell(self, row, col, show_hidden_board=False):
+        """One cell of the hidden or display view ('.', 'o', 'X' or 'S')."""
+        grid = self.hidden_grid if show_hidden_board else self.display_grid
+        return grid[row][col]
+
+    def render(self, show_hidden_board=False):
+        """
+        Text form of the board (hidden or display view), as render_grid lays
+        it out. Cached until the board next changes.
+        """
+        return self._cached_view("text", show_hidden_board, lambda: render_grid(
+            self.hidden_grid if show_hidden_board else self.display_grid, self.size))
+
+    def packed(self, show_hidden_board=False):
+        """
+        The board as sent in BOARD messages: pack_grid's 2 bits per cell.
+        Each view is packed at most once per version, so re-sending an
+        unchanged board (e.g. after an invalid placement) costs a dict lookup.
+        """
+        return self._cached_view("packed", show_hidden_board, lambda: self._pack(show_hidden_board))
+
+    def _pack(self, show_hidden_board):
+        return pack_grid(self.hidden_grid if show_hidden_board else self.display_grid)
+
+    def _cached_view(self, kind, show_hidden_board, build):
+        cached = self._rendered.get((kind, show_hidden_board))
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        view = build()
+        self._rendered[(kind, show_hidden_board)] = (self.version, view)
+        return view
 
     def print_display_grid(self, show_hidden_board=False):
         """
@@ -230,6 +337,171 @@ class Board:
             print(f"{row_label:2} {row_str}")
 
 
+# Spreads the 8 bits of a byte to the even bits of 16, for packing bitmasks 2 bits per cell
+_SPREAD = [sum(((byte >> i) & 1) << (2 * i) for i in range(8)) for byte in range(256)]
+
+@functools.lru_cache(maxsize=4096)
+def _line_mask(size, row, col, ship_size, orientation):
+    """Bitmask of the cells a ship covers (orientation 0 => horizontal)."""
+    start = row * size + col
+    if orientation == 0:
+        return ((1 << ship_size) - 1) << start
+    return sum(1 << (start + i * size) for i in range(ship_size))
+
+def _spread_bits(mask):
+    spread, shift = 0, 0
+    while mask:
+        spread |= _SPREAD[mask & 0xFF] << shift
+        mask >>= 8
+        shift += 16
+    return spread
+
+
+class BitBoard(Board):
+    """
+    Board backend that keeps ships, hits and misses as integer bitmasks (bit
+    r * size + c per cell) plus one mask per named ship, instead of grids of
+    strings. Placement checks, shots, sinking and packing are a few bit
+    operations, and a board is a handful of ints.
+
+    Same API as Board. hidden_grid / display_grid / placed_ships are built on
+    demand for code that still reads them, but are read-only here: change the
+    board through add_ship / do_place_ship / fire_at.
+    """
+
+    def _init_storage(self):
+        self.ships = 0          # every ship cell
+        self.hits = 0
+        self.misses = 0
+        self.ship_masks = []    # [name, mask] per ship added with add_ship
+        self.ship_at = {}       # r * size + c -> its ship_masks entry
+        self.fleet = 0          # union of ship_masks: what must be hit to win
+
+    def _line(self, row, col, ship_size, orientation):
+        return _line_mask(self.size, row, col, ship_size, orientation)
+
+    def _positions(self, mask):
+        positions = set()
+        while mask:
+            low = mask & -mask
+            positions.add(divmod(low.bit_length() - 1, self.size))
+            mask ^= low
+        return positions
+
+    def can_place_ship(self, row, col, ship_size, orientation):
+        if orientation == 0:
+            if col + ship_size > self.size:
+                return False
+        elif row + ship_size > self.size:
+            return False
+        return not (self._line(row, col, ship_size, orientation) & self._taken_mask())
+
+    def _taken_mask(self):
+        return self.ships | self.hits | self.misses
+
+    def add_ship(self, ship_name, row, col, ship_size, orientation):
+        occupied = self.do_place_ship(row, col, ship_size, orientation)
+        line = self._line(row, col, ship_size, orientation)
+        ship = [ship_name, line]
+        self.ship_masks.append(ship)
+        for r, c in occupied:
+            self.ship_at[r * self.size + c] = ship
+        self.fleet |= line
+        return occupied
+
+    def do_place_ship(self, row, col, ship_size, orientation):
+        line = self._line(row, col, ship_size, orientation)
+        self.ships |= line
+        occupied = self._positions(line)
+        self._record_change(occupied)
+        return occupied
+
+    def fire_at(self, row, col):
+        bit = 1 << (row * self.size + col)
+        if bit & self.hits or bit & self.misses:
+            return ('already_shot', None)
+        if not bit & self.ships:
+            self.misses |= bit
+            self._record_change({(row, col)})
+            return ('miss', None)
+
+        self.hits |= bit
+        sunk_ship_name = None
+        ship = self.ship_at.get(row * self.size + col)
+        if ship is not None and not ship[1] & ~self.hits:
+            sunk_ship_name = ship[0]
+        self._record_change({(row, col)}, sunk_ship_name)
+        return ('hit', sunk_ship_name)
+
+    def all_ships_sunk(self):
+        # Like Board: ships placed without a name (do_place_ship only) don't count
+        return not self.fleet & ~self.hits
+
+    def attack_view(self):
+        sunk, afloat = 0, []
+        for _, mask in self.ship_masks:
+            if mask & ~self.hits:
+                afloat.append(mask.bit_count())
+            else:
+                sunk |= mask
+        return self.hits, self.misses, sunk, afloat
+
+    @property
+    def placed_ships(self):
+        return [{'name': name, 'size': mask.bit_count(), 'positions': self._positions(mask & ~self.hits)}
+                for name, mask in self.ship_masks]
+
+    def cell(self, row, col, show_hidden_board=False):
+        bit = 1 << (row * self.size + col)
+        if bit & self.hits:
+            return 'X'
+        if bit & self.misses:
+            return 'o'
+        if show_hidden_board and bit & self.ships:
+            return 'S'
+        return '.'
+
+    def _grid(self, show_hidden_board):
+        return [[self.cell(r, c, show_hidden_board) for c in range(self.size)]
+                for r in range(self.size)]
+
+    @property
+    def hidden_grid(self):
+        return self._grid(True)
+
+    @property
+    def display_grid(self):
+        return self._grid(False)
+
+    def _pack(self, show_hidden_board):
+        # 2-bit cell codes (see utils.CELL_CHARS): miss 01, hit 10, ship 11
+        afloat = self.ships & ~self.hits if show_hidden_board else 0
+        low = _spread_bits(self.misses | afloat)
+        high = _spread_bits(self.hits | afloat) << 1
+        cells = self.size * self.size
+        return bytes([self.size]) + (low | high).to_bytes((cells + 3) // 4, "little")
+
+
+# Backend for boards in networked games (Board and BitBoard behave the same)
+NETWORK_BOARD = BitBoard
+
+_fleet_pools = {}           # tuple(ships) -> FleetPool of NETWORK_BOARDs
+_fleet_pools_lock = threading.Lock()
+
+def fleet_pool(ships=SHIPS):
+    """
+    The shared FleetPool of ready NETWORK_BOARD boards for `ships`, started on
+    first use. Servers call this at start-up so the pool is full before the
+    first player asks for AUTO placement.
+    """
+    key = tuple(ships)
+    with _fleet_pools_lock:
+        pool = _fleet_pools.get(key)
+        if pool is None:
+            pool = _fleet_pools[key] = FleetPool(lambda: NETWORK_BOARD(BOARD_SIZE), ships)
+        return pool
+
+
 def parse_coordinate(coord_str):
     """
     Convert something like 'B5' into zero-based (row, col).
@@ -306,20 +578,41 @@ def run_single_player_game_locally():
         except ValueError as e:
             print("  >> Invalid input:", e)
     
+# ─── AUTO SHIP PLACEMENT ───────────────────────────────────────────────────────
+def auto_place_ships(player, ships=SHIPS):
+    """
+    Answer to AUTO at a placement prompt: a board from the fleet pool, with
+    `ships` already placed, shown to the player. Never waits on generation.
+    """
+    board = fleet_pool(ships).take()
+    with coalesced(player):
+        send_package(player, MessageTypes.BOARD, board, True)
+        send_package(player, MessageTypes.S_MESSAGE, "Your ships have been placed at random.")
+    return board
+
+
 # ─── TESTING SHIP PLACEMENT ────────────────────────────────────────────────────
-def testing_place_ships(board, player):
-    TESTING_SHIPS = [
-        ("Dinghy", 2),
-        ("Single Guy in the Water With Some Floaties", 1)
-    ]
+TESTING_SHIPS = [
+    ("Dinghy", 2),
+    ("Single Guy in the Water With Some Floaties", 1)
+]
+
+# Fleet both online servers (server.py and async_server.py) play by default
+GAME_SHIPS = TESTING_SHIPS
 
+def testing_place_ships(board, player, ships=TESTING_SHIPS):
+    """
+    Placement prompts for the short test fleet. Returns the player's board:
+    `board` itself, or a ready pooled one if they answer AUTO.
+    """
     send_package(player, MessageTypes.S_MESSAGE, "Please place your ships manually on the board.")
 
-    for ship_name, ship_size in TESTING_SHIPS:
+    for ship_name, ship_size in ships:
         while True:
-            send_package(player, MessageTypes.BOARD, board, True)
-            send_package(player, MessageTypes.S_MESSAGE, f"Placing your {ship_name} (size {ship_size})")
-            send_package(player, MessageTypes.PROMPT, "Enter starting coordinate followed by orientation (e.g. A1 V):")
+            with coalesced(player):
+                send_package(player, MessageTypes.BOARD, board, True)
+                send_package(player, MessageTypes.S_MESSAGE, f"Placing your {ship_name} (size {ship_size})")
+                send_package(player, MessageTypes.PROMPT, "Enter starting coordinate followed by orientation (e.g. A1 V), or AUTO to place your whole fleet at random:")
 
             while True:
                 placement = wait_for_message(player)
@@ -328,6 +621,9 @@ def testing_place_ships(board, player):
                 placement = placement.strip().upper()
                 break
 
+            if placement == "AUTO":
+                return auto_place_ships(player, ships)
+
             try:
                 coord_str, orientation_str = placement.split()
                 row, col = parse_coordinate(coord_str)
@@ -342,25 +638,28 @@ def testing_place_ships(board, player):
                 continue
 
             if board.can_place_ship(row, col, ship_size, orientation):
-                occupied_positions = board.do_place_ship(row, col, ship_size, orientation)
-                board.placed_ships.append({
-                    'name': ship_name,
-                    'positions': occupied_positions
-                })
+                board.add_ship(ship_name, row, col, ship_size, orientation)
                 break
             else:
                 send_package(player, MessageTypes.S_MESSAGE, f"[!] Cannot place {ship_name} at {coord_str} (orientation={orientation_str}). Try again.")
-                
+
+    return board
+
 
 # ─── ACTUAL NETWORK SHIP PLACEMENT ─────────────────────────────────────────────
-def network_place_ships(board, player):
+def network_place_ships(board, player, ships=SHIPS):
+    """
+    Placement prompts for the full fleet. Returns the player's board: `board`
+    itself, or a ready pooled one if they answer AUTO.
+    """
     send_package(player, MessageTypes.S_MESSAGE, "Please place your ships manually on the board.")
 
-    for ship_name, ship_size in SHIPS:
+    for ship_name, ship_size in ships:
         while True:
-            send_package(player, MessageTypes.BOARD, board, True)
-            send_package(player, MessageTypes.S_MESSAGE, f"Placing your {ship_name} (size {ship_size})")
-            send_package(player, MessageTypes.PROMPT, "Enter starting coordinate followed by orientation (e.g. A1 V):")
+            with coalesced(player):
+                send_package(player, MessageTypes.BOARD, board, True)
+                send_package(player, MessageTypes.S_MESSAGE, f"Placing your {ship_name} (size {ship_size})")
+                send_package(player, MessageTypes.PROMPT, "Enter starting coordinate followed by orientation (e.g. A1 V), or AUTO to place your whole fleet at random:")
 
             while True:
                 placement = wait_for_message(player)
@@ -369,6 +668,9 @@ def network_place_ships(board, player):
                 placement = placement.strip().upper()
                 break
 
+            if placement == "AUTO":
+                return auto_place_ships(player, ships)
+
             try:
                 coord_str, orientation_str = placement.split()
                 row, col = parse_coordinate(coord_str)
@@ -383,23 +685,21 @@ def network_place_ships(board, player):
                 continue
 
             if board.can_place_ship(row, col, ship_size, orientation):
-                occupied_positions = board.do_place_ship(row, col, ship_size, orientation)
-                board.placed_ships.append({
-                    'name': ship_name,
-                    'positions': occupied_positions
-                })
+                board.add_ship(ship_name, row, col, ship_size, orientation)
                 break
             else:
                 send_package(player, MessageTypes.S_MESSAGE, f"[!] Cannot place {ship_name} at {coord_str} (orientation={orientation_str}). Try again.")
-                
+
+    return board
+
 
 # ─── MAIN GAME LOGIC ───────────────────────────────────────────────────────────
 @detects_lost_connection
-def run_two_player_game_online(p1, p2, gamestate, notify_spectators, broadcast):
+def run_two_player_game_online(p1, p2, gamestate, notify_spectators, broadcast, ships=GAME_SHIPS):
 
     for player in (p1, p2):
         if gamestate.board_of(player.username) is None:
-            board = Board(BOARD_SIZE)
+            board = NETWORK_BOARD(BOARD_SIZE)
 
             opponent = p2 if player is p1 else p1
             send_package(opponent, MessageTypes.WAITING, "Please wait for your opponent to place their ships...")
@@ -411,7 +711,7 @@ def run_two_player_game_online(p1, p2, gamestate, notify_spectators, broadcast):
                 show_ships=False,
                 spectators_only=True
             )
-            testing_place_ships(board, player)
+            board = testing_place_ships(board, player, ships)
             gamestate.set_board(player.username, board)
             broadcast(
                 msg=f"{player.username} has finished placing their ships...",
@@ -424,64 +724,222 @@ def run_two_player_game_online(p1, p2, gamestate, notify_spectators, broadcast):
     if gamestate.current_player is None:
         gamestate.current_player = p1.username
 
+    def prompt_turn(attacker, defender):
+        send_package(attacker, MessageTypes.PROMPT, "Enter coordinate to fire at (e.g. B5) or 'Ctrl + C' to forfeit:")
+        send_package(defender, MessageTypes.WAITING, f"Waiting for {attacker.username} to fire...")
+
+    attacker, defender = (p1, p2) if gamestate.current_player == p1.username else (p2, p1)
+    with coalesced(attacker, defender):
+        prompt_turn(attacker, defender)
+
+    # Each shot's outcome goes out together with the next prompts: one write per player per turn
     while True:
         attacker, defender = (
             (p1, p2) if gamestate.current_player == p1.username else (p2, p1)
         )
         defender_board = gamestate.board_of(defender.username)
 
-        send_package(attacker, MessageTypes.PROMPT, "Enter coordinate to fire at (e.g. B5) or 'Ctrl + C' to forfeit:")
-        send_package(defender, MessageTypes.WAITING, f"Waiting for {attacker.username} to fire...")
-
         guess = wait_for_message(attacker)
         
-        if guess is None:
-            send_package(attacker, MessageTypes.S_MESSAGE, "You lacked too hard. Putting you at the back of the queue...")
-            send_package(defender, MessageTypes.S_MESSAGE, f"{attacker.username} timed out. You win!")
-            notify_spectators(None, "timeout", False, attacker)
-            return "done", defender
+        with coalesced(attacker, defender):
+            if guess is None:
+                send_package(attacker, MessageTypes.S_MESSAGE, "You lacked too hard. Putting you at the back of the queue...")
+                send_package(defender, MessageTypes.S_MESSAGE, f"{attacker.username} timed out. You win!")
+                notify_spectators(None, "timeout", False, attacker)
+                return "done", defender
 
-        guess = guess.strip().upper()
+            guess = guess.strip().upper()
+
+            try:
+                row, col = parse_coordinate(guess)
+                result, sunk_name = defender_board.fire_at(row, col)
+
+                send_package(attacker, MessageTypes.BOARD, defender_board, False)
+
+                if result == "hit":
+                    if sunk_name:
+                        send_package(attacker, MessageTypes.S_MESSAGE, f"HIT! You blew up the {sunk_name}!")
+                        send_package(defender, MessageTypes.S_MESSAGE, f"HIT! {attacker.username} has blown up your {sunk_name}!")
+                    else:
+                        send_package(attacker, MessageTypes.S_MESSAGE, "HIT!")
+                        send_package(defender, MessageTypes.S_MESSAGE, "You were HIT!")
+
+                elif result == "miss":
+                    send_package(attacker, MessageTypes.S_MESSAGE, "MISS!")
+                    send_package(defender, MessageTypes.S_MESSAGE, f"{attacker.username} MISSED!")
+
+                elif result == "already_shot":
+                    send_package(attacker, MessageTypes.S_MESSAGE, "Already fired there.")
+                    send_package(defender, MessageTypes.S_MESSAGE, f"{attacker.username} repeated a shot.")
+                    notify_spectators(defender_board, result, False, attacker)
+                    prompt_turn(attacker, defender)
+                    continue
+
+                ships_sunk = defender_board.all_ships_sunk()
+                notify_spectators(defender_board, result, ships_sunk, attacker)
+
+                if ships_sunk:
+                    send_package(attacker, MessageTypes.RESULT, "Congratulations! You win.")
+                    send_package(defender, MessageTypes.RESULT, "You lost. You are now being put at the back of the queue")
+                    return "done", attacker
+
+                gamestate.current_player = defender.username
+                prompt_turn(defender, attacker)
+
+            except ValueError as e:
+                send_package(attacker, MessageTypes.S_MESSAGE, f"Invalid input: {e}")
+                send_package(defender, MessageTypes.S_MESSAGE, f"{attacker.username} has entered invalid input.")
+                prompt_turn(attacker, defender)
+                continue
+        
+
+# ─── ASYNC NETWORK SHIP PLACEMENT ──────────────────────────────────────────────
+async def network_place_ships_async(board, player, ships=SHIPS):
+    """
+    Coroutine version of network_place_ships() for the asyncio server.
+    """
+    await send_package_async(player, MessageTypes.S_MESSAGE, "Please place your ships manually on the board.")
+
+    for ship_name, ship_size in ships:
+        while True:
+            async with coalesced_async(player):
+                await send_package_async(player, MessageTypes.BOARD, board, True)
+                await send_package_async(player, MessageTypes.S_MESSAGE, f"Placing your {ship_name} (size {ship_size})")
+                await send_package_async(player, MessageTypes.PROMPT, "Enter starting coordinate followed by orientation (e.g. A1 V), or AUTO to place your whole fleet at random:")
+
+            placement = None
+            while placement is None:
+                placement = await wait_for_message_async(player)
+            placement = placement.strip().upper()
+
+            if placement == "AUTO":
+                board = fleet_pool(ships).take()
+                async with coalesced_async(player):
+                    await send_package_async(player, MessageTypes.BOARD, board, True)
+                    await send_package_async(player, MessageTypes.S_MESSAGE, "Your ships have been placed at random.")
+                return board
+
+            try:
+                coord_str, orientation_str = placement.split()
+                row, col = parse_coordinate(coord_str)
+
+                if orientation_str not in ("H", "V"):
+                    raise ValueError("Orientation must be either 'H' or 'V'.")
+
+                orientation = 0 if orientation_str == "H" else 1
+
+            except ValueError as e:
+                await send_package_async(player, MessageTypes.S_MESSAGE, f"[!] Invalid coordinate: {e}")
+                continue
+
+            if board.can_place_ship(row, col, ship_size, orientation):
+                board.add_ship(ship_name, row, col, ship_size, orientation)
+                break
+            else:
+                await send_package_async(player, MessageTypes.S_MESSAGE, f"[!] Cannot place {ship_name} at {coord_str} (orientation={orientation_str}). Try again.")
+
+    return board
+
+
+# ─── ASYNC GAME LOGIC ──────────────────────────────────────────────────────────
+@detects_lost_connection
+async def run_two_player_game_async(p1, p2, gamestate, notify_spectators, broadcast, ships=GAME_SHIPS):
+    """
+    Coroutine version of run_two_player_game_online(), with the same fleet
+    and placement prompts. `notify_spectators` and `broadcast` must be
+    coroutine functions with the same signatures as their threaded
+    counterparts in server.py.
+    """
+    for player in (p1, p2):
+        if gamestate.board_of(player.username) is None:
+            board = NETWORK_BOARD(BOARD_SIZE)
+
+            opponent = p2 if player is p1 else p1
+            await send_package_async(opponent, MessageTypes.WAITING, "Please wait for your opponent to place their ships...")
+
+            await broadcast(
+                msg=f"{player.username} is placing their ships...",
+                msg_type=MessageTypes.S_MESSAGE,
+                spectators_only=True
+            )
+            board = await network_place_ships_async(board, player, ships)
+            gamestate.set_board(player.username, board)
+            await broadcast(
+                msg=f"{player.username} has finished placing their ships...",
+                msg_type=MessageTypes.S_MESSAGE,
+                spectators_only=True
+            )
+
+    if gamestate.current_player is None:
+        gamestate.current_player = p1.username
+
+    async def prompt_turn(attacker, defender):
+        await send_package_async(attacker, MessageTypes.PROMPT, "Enter coordinate to fire at (e.g. B5) or 'Ctrl + C' to forfeit:")
+        await send_package_async(defender, MessageTypes.WAITING, f"Waiting for {attacker.username} to fire...")
+
+    attacker, defender = (p1, p2) if gamestate.current_player == p1.username else (p2, p1)
+    async with coalesced_async(attacker, defender):
+        await prompt_turn(attacker, defender)
+
+    # As in run_two_player_game_online: a shot's outcome and the next prompts go out together
+    while True:
+        attacker, defender = (
+            (p1, p2) if gamestate.current_player == p1.username else (p2, p1)
+        )
+        defender_board = gamestate.board_of(defender.username)
+
+        guess = await wait_for_message_async(attacker)
+
+        async with coalesced_async(attacker, defender):
+            if guess is None:
+                await send_package_async(attacker, MessageTypes.S_MESSAGE, "You lacked too hard. Putting you at the back of the queue...")
+                await send_package_async(defender, MessageTypes.S_MESSAGE, f"{attacker.username} timed out. You win!")
+                await notify_spectators(None, "timeout", False, attacker)
+                return "done", defender
+
+            guess = guess.strip().upper()
+
+            try:
+                row, col = parse_coordinate(guess)
+            except ValueError as e:
+                await send_package_async(attacker, MessageTypes.S_MESSAGE, f"Invalid input: {e}")
+                await send_package_async(defender, MessageTypes.S_MESSAGE, f"{attacker.username} has entered invalid input.")
+                await prompt_turn(attacker, defender)
+                continue
 
-        try:
-            row, col = parse_coordinate(guess)
             result, sunk_name = defender_board.fire_at(row, col)
 
-            send_package(attacker, MessageTypes.BOARD, defender_board, False)
+            await send_package_async(attacker, MessageTypes.BOARD, defender_board, False)
 
             if result == "hit":
                 if sunk_name:
-                    send_package(attacker, MessageTypes.S_MESSAGE, f"HIT! You blew up the {sunk_name}!")
-                    send_package(defender, MessageTypes.S_MESSAGE, f"HIT! {attacker.username} has blown up your {sunk_name}!")
+                    await send_package_async(attacker, MessageTypes.S_MESSAGE, f"HIT! You blew up the {sunk_name}!")
+                    await send_package_async(defender, MessageTypes.S_MESSAGE, f"HIT! {attacker.username} has blown up your {sunk_name}!")
                 else:
-                    send_package(attacker, MessageTypes.S_MESSAGE, "HIT!")
-                    send_package(defender, MessageTypes.S_MESSAGE, "You were HIT!")
+                    await send_package_async(attacker, MessageTypes.S_MESSAGE, "HIT!")
+                    await send_package_async(defender, MessageTypes.S_MESSAGE, "You were HIT!")
 
             elif result == "miss":
-                send_package(attacker, MessageTypes.S_MESSAGE, "MISS!")
-                send_package(defender, MessageTypes.S_MESSAGE, f"{attacker.username} MISSED!")
+                await send_package_async(attacker, MessageTypes.S_MESSAGE, "MISS!")
+                await send_package_async(defender, MessageTypes.S_MESSAGE, f"{attacker.username} MISSED!")
 
             elif result == "already_shot":
-                send_package(attacker, MessageTypes.S_MESSAGE, "Already fired there.")
-                send_package(defender, MessageTypes.S_MESSAGE, f"{attacker.username} repeated a shot.")
-                notify_spectators(defender_board, result, False, attacker)
+                await send_package_async(attacker, MessageTypes.S_MESSAGE, "Already fired there.")
+                await send_package_async(defender, MessageTypes.S_MESSAGE, f"{attacker.username} repeated a shot.")
+                await notify_spectators(defender_board, result, False, attacker)
+                await prompt_turn(attacker, defender)
                 continue
 
             ships_sunk = defender_board.all_ships_sunk()
-            notify_spectators(defender_board, result, ships_sunk, attacker)
+            await notify_spectators(defender_board, result, ships_sunk, attacker)
 
             if ships_sunk:
-                send_package(attacker, MessageTypes.RESULT, "Congratulations! You win.")
-                send_package(defender, MessageTypes.RESULT, "You lost. You are now being put at the back of the queue")
+                await send_package_async(attacker, MessageTypes.RESULT, "Congratulations! You win.")
+                await send_package_async(defender, MessageTypes.RESULT, "You lost. You are now being put at the back of the queue")
                 return "done", attacker
 
             gamestate.current_player = defender.username
-
-        except ValueError as e:
-            send_package(attacker, MessageTypes.S_MESSAGE, f"Invalid input: {e}")
-            send_package(defender, MessageTypes.S_MESSAGE, f"{attacker.username} has entered invalid input.")
-            continue
-        
+            await prompt_turn(defender, attacker)
 
 if __name__ == "__main__":
     run_single_player_game_locally()
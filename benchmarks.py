@@ -0,0 +1,474 @@
+import gc
+import io
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import statistics
+import contextlib
+import tracemalloc
+import client_ui
+from battleship import Board, BitBoard, BOARD_SIZE
+from utils import *
+from utils import _encode_package, _frame_payload, _encode_plaintext, _decode_plaintext
+
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+AUDIENCE_SIZES = (1, 10, 100, 1000)
+REPEATS = 5
+HOT_REPEATS = 7             # Runs per hot-path measurement
+MIN_RUN_TIME = 0.2          # Seconds one run of a hot path should last at least
+REGRESSION_THRESHOLD = 20.0 # Percent slower than the baseline that counts as a regression
+
+
+# ─── Helpers ───────────────────────────────────────────────────────────────────
+class Recipient:
+    """Just enough of a Player for the encode path: a seq counter and a codec."""
+    def __init__(self, codec="json"):
+        self.seq = 0
+        self.codec = codec
+
+class Peer:
+    """One end of a socketpair, with what send_package/receive_package need."""
+    def __init__(self, conn):
+        self.conn = conn
+        self.seq = 0
+        self.recv_seq = 0
+
+def _sample_board():
+    board = Board()
+    board.place_ships_randomly()
+    for r, c in ((0, 0), (4, 4), (9, 9), (2, 7)):
+        board.fire_at(r, c)
+    return board
+
+def _best_of(repeats, fn):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _time_run(op, number, setup=None):
+    """
+    Seconds taken by `number` calls to op(state), where state comes from
+    setup() (untimed). GC is off while timing, as in timeit.
+    """
+    state = setup() if setup else None
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            op(state)
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def _measure_all(cases, repeats=HOT_REPEATS):
+    """
+    Time every case, {name: (op, setup, per_call, number)}; `per_call` is how
+    many operations one call performs and a `number` of None means "as many
+    calls as fill MIN_RUN_TIME", so fast and slow paths are timed equally
+    precisely.
+
+    Runs are interleaved - one run of each case per round - so a burst of
+    noise from the rest of the machine costs every case at most one run
+    rather than all the runs of whichever case it hit. The best run is the
+    figure to compare. Returns {name: measurement dict}.
+    """
+    numbers = {}
+    for name, (op, setup, per_call, number) in cases.items():
+        if number is None:
+            number = 1
+            while _time_run(op, number, setup) < MIN_RUN_TIME:
+                number *= 2
+        numbers[name] = number
+
+    runs = {name: [] for name in cases}
+    for _ in range(repeats):
+        for name, (op, setup, per_call, _) in cases.items():
+            runs[name].append(_time_run(op, numbers[name], setup) / (numbers[name] * per_call))
+
+    results = {}
+    for name, times in runs.items():
+        best = min(times)
+        results[name] = {
+            "ns_per_op": round(best * 1e9, 1),
+            "median_ns": round(statistics.median(times) * 1e9, 1),
+            "ops_per_sec": round(1 / best),
+            "ops_per_run": numbers[name] * cases[name][2],
+            "runs": repeats,
+        }
+    return results
+
+
+# ─── Hot Paths ─────────────────────────────────────────────────────────────────
+def _reference_op(_, data=list(range(200, 0, -1))):
+    sorted(data)
+    json.dumps({"type": "s_msg", "msg": "reference"})
+
+def bench_hot_paths(repeats=HOT_REPEATS):
+    """
+    Per-operation cost of the paths every message or shot goes through:
+    framing, encryption, a send/receive round trip over a socketpair (and
+    a burst of frames received together), board
+    rendering and packing, firing, placement and the client's board table.
+
+    Also times "reference", a fixed pure-Python workload that only tells how
+    fast the machine is running today (CPU scaling, noisy neighbours), so
+    compare() can factor that out. Returns {name: measurement} in a fixed
+    order (see _measure_all).
+    """
+    board = _sample_board()
+    payload = build_payload(MessageTypes.BOARD, board, False)
+    frame_bytes = _frame_payload(Recipient(), MessageTypes.BOARD, payload)
+    frame = Frame()
+    frame.unpack_header(frame_bytes[:16])
+    frame.jsonmsg = frame_bytes[16:]
+    plaintext, _ = _encode_plaintext(Recipient(), payload)
+    ciphertext, nonce = aes_ctr_encrypt(plaintext)
+    grid = board.display_grid
+    cells = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)]
+    text = "alice has HIT the defender."
+
+    left, right = socket.socketpair()
+    sender, receiver = Peer(left), Peer(right)
+
+    def round_trip(type, *args):
+        send_package(sender, type, *args)
+        receive_package(receiver)
+
+    # 50 chat lines arriving together, as a spectator gets them: one recv should serve all
+    chat = build_payload(MessageTypes.CHAT, "bob: gg")
+    burst = b"".join(_frame_payload(Recipient(), MessageTypes.CHAT, chat) for _ in range(50))
+
+    burst_left, burst_right = socket.socketpair()
+    burst_receiver = Peer(burst_right)
+
+    def receive_burst(_):
+        burst_left.sendall(burst)
+        for _ in range(50):
+            burst_receiver.recv_seq = 0     # every frame in the burst carries seq 0
+            receive_package(burst_receiver)
+
+    def placed_boards():
+        boards = []
+        for _ in range(100):
+            b = Board(BOARD_SIZE)
+            b.place_ships_randomly()
+            boards.append(b)
+        return iter(boards)
+
+    def clear_board(boards):
+        b = next(boards)
+        for r, c in cells:
+            b.fire_at(r, c)
+
+    def encode_decode(codec):
+        # What a shot costs on each side, besides encryption: the COMMAND out, its RESULT back
+        recipient = Recipient(codec)
+        def op(_):
+            for type, msg in ((MessageTypes.COMMAND, "B7"), (MessageTypes.S_MESSAGE, text)):
+                _decode_plaintext(*_encode_plaintext(recipient, build_payload(type, msg)))
+        return op
+
+    def print_table(_):
+        with contextlib.redirect_stdout(io.StringIO()):
+            client_ui.print_board(grid, title="Opponent")
+
+    # name: (op, setup, operations per call, calls per run)
+    cases = {
+        "reference": (_reference_op, None, 1, None),
+        "frame_pack": (lambda _: frame.pack(), None, 1, None),
+        "frame_unpack_header": (lambda _: Frame().unpack_header(frame_bytes), None, 1, None),
+        "aes_ctr_encrypt": (lambda _: aes_ctr_encrypt(plaintext), None, 1, None),
+        "aes_ctr_decrypt": (lambda _: aes_ctr_decrypt(ciphertext, nonce), None, 1, None),
+        "encode_decode_json": (encode_decode("json"), None, 2, None),
+        "encode_decode_binary": (encode_decode("binary"), None, 2, None),
+        "send_receive_s_msg": (lambda _: round_trip(MessageTypes.S_MESSAGE, text), None, 1, None),
+        "send_receive_board": (lambda _: round_trip(MessageTypes.BOARD, board, False), None, 1, None),
+        "receive_burst": (receive_burst, None, 50, None),
+        # The text and packed forms a BOARD message is built from, without Board's caches
+        "render_grid": (lambda _: render_grid(grid, BOARD_SIZE), None, 1, None),
+        "pack_grid": (lambda _: pack_grid(grid), None, 1, None),
+        # One call fires at every cell of a fresh board: hits, misses and sinkings in game proportions
+        "board_fire_at": (clear_board, placed_boards, len(cells), 100),
+        "place_ships_randomly": (lambda _: Board(BOARD_SIZE).place_ships_randomly(), None, 1, None),
+        "client_print_board": (print_table, None, 1, None),
+    }
+    try:
+        return _measure_all(cases, repeats)
+    finally:
+        for sock in (left, right, burst_left, burst_right):
+            sock.close()
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    (name, baseline ns, current ns, change %) for every hot path in both,
+    and the names that got more than `threshold` percent slower. When both
+    have a "reference" time, current times are first scaled by the ratio of
+    the two, so a machine that is slower across the board isn't a regression.
+    """
+    scale = 1.0
+    if "reference" in results and "reference" in baseline:
+        scale = baseline["reference"]["ns_per_op"] / results["reference"]["ns_per_op"]
+
+    rows, regressions = [], []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None or name == "reference":
+            continue
+        change = (current["ns_per_op"] * scale / before["ns_per_op"] - 1) * 100
+        rows.append((name, before["ns_per_op"], current["ns_per_op"], change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+# ─── Broadcast Encoding ────────────────────────────────────────────────────────
+def bench_broadcast_encode(sizes=AUDIENCE_SIZES, repeats=REPEATS):
+    """
+    Cost of framing one spectator update (a board plus a text message) for
+    audiences of each size: the old way, rendering and serialising per
+    recipient, against building the payload once and framing it per recipient.
+    Returns a list of rows (audience, per_recipient_ms, shared_ms).
+    """
+    board = _sample_board()
+    text = "alice has HIT the defender."
+    rows = []
+
+    for size in sizes:
+        audience = [Recipient() for _ in range(size)]
+
+        def per_recipient():
+            for r in audience:
+                _encode_package(r, MessageTypes.BOARD, board, False)
+                _encode_package(r, MessageTypes.S_MESSAGE, text)
+
+        def shared():
+            board_payload = build_payload(MessageTypes.BOARD, board, False)
+            text_payload = build_payload(MessageTypes.S_MESSAGE, text)
+            for r in audience:
+                _frame_payload(r, MessageTypes.BOARD, board_payload)
+                _frame_payload(r, MessageTypes.S_MESSAGE, text_payload)
+
+        rows.append((size,
+                     _best_of(repeats, per_recipient) * 1000,
+                     _best_of(repeats, shared) * 1000))
+    return rows
+
+
+# ─── Board Rendering ───────────────────────────────────────────────────────────
+def bench_board_render(sends=1000, repeats=REPEATS):
+    """
+    Cost of building `sends` BOARD payloads for a board that doesn't change
+    in between (e.g. re-prompting after invalid placements), with and without
+    Board's cached views. Returns (uncached_ms, cached_ms).
+    """
+    board = _sample_board()
+
+    class Uncached:
+        size = board.size
+        hidden_grid = board.hidden_grid
+        display_grid = board.display_grid
+
+    def send_all(b):
+        for _ in range(sends):
+            build_payload(MessageTypes.BOARD, b, True).encode()
+
+    return (_best_of(repeats, lambda: send_all(Uncached)) * 1000,
+            _best_of(repeats, lambda: send_all(board)) * 1000)
+
+
+# ─── Payload Codecs ────────────────────────────────────────────────────────────
+def bench_codecs(number=2000, repeats=REPEATS):
+    """
+    Per-message cost of encoding a payload (seq included) and decoding it
+    again, JSON against binary, for the messages a game is made of. Each
+    message is built once; only the encoding is made afresh every time.
+    Returns a list of rows (message, json_us, binary_us, json_bytes, binary_bytes).
+    """
+    board = _sample_board()
+    known = board.version
+    board.fire_at(6, 3)
+    built = {
+        "command": build_payload(MessageTypes.COMMAND, "B7"),
+        "s_msg": build_payload(MessageTypes.S_MESSAGE, "alice has HIT the defender."),
+        "board": build_payload(MessageTypes.BOARD, board, False),
+        "board_delta": board_update(board, False, known)[1],
+    }
+    turn = [build_payload(MessageTypes.RESULT, "alice has HIT the defender."),
+            build_payload(MessageTypes.PROMPT, "Enter coordinate to fire at (e.g. B5)"),
+            build_payload(MessageTypes.S_MESSAGE, "bob fired at G4")]
+    messages = {name: (lambda p=p: Payload(p.type, p.data)) for name, p in built.items()}
+    messages["batch (turn)"] = lambda: BatchPayload([Payload(p.type, p.data) for p in turn])
+    rows = []
+    for name, make in messages.items():
+        row = [name]
+        sizes = []
+        for codec in ("json", "binary"):
+            recipient = Recipient(codec)
+            def run():
+                for _ in range(number):
+                    _decode_plaintext(*_encode_plaintext(recipient, make()))
+            row.append(_best_of(repeats, run) / number * 1e6)
+            sizes.append(len(_encode_plaintext(recipient, make())[0]))
+        rows.append((*row, *sizes))
+    return rows
+
+
+# ─── Payload Compression ───────────────────────────────────────────────────────
+def bench_compression(number=500, repeats=REPEATS):
+    """
+    What compress_payload does to the bigger messages, in each codec: size
+    before and after, and the time to compress (once per payload) and to
+    decompress (once per recipient). Returns a list of rows
+    (message, codec, bytes, compressed_bytes, compress_us, decompress_us).
+    """
+    board = _sample_board()
+    turn = BatchPayload([
+        build_payload(MessageTypes.RESULT, "alice has HIT the defender."),
+        build_payload(MessageTypes.BOARD, board, False),
+        build_payload(MessageTypes.PROMPT, "Enter coordinate to fire at (e.g. B5) or 'Ctrl + C' to forfeit "),
+    ])
+    chat = BatchPayload([build_payload(MessageTypes.CHAT, f"player{i}: gg, well played") for i in range(30)])
+    queue = build_payload(MessageTypes.WAITING, "You are number 12 in the queue - you'll see "
+                                                "live updates of the current game.")
+    rows = []
+    for name, payload in (("turn batch", turn), ("chat burst", chat), ("queue notice", queue)):
+        for codec in PAYLOAD_CODECS:
+            body = payload.encode(codec)
+            packed = compress_payload(body) or body
+            compress = _best_of(repeats, lambda: [compress_payload(body) for _ in range(number)])
+            decompress = (_best_of(repeats, lambda: [decompress_payload(packed) for _ in range(number)])
+                          if packed is not body else 0.0)
+            rows.append((name, codec, len(body), len(packed),
+                         compress / number * 1e6, decompress / number * 1e6))
+    return rows
+
+
+# ─── Board Backends ────────────────────────────────────────────────────────────
+def bench_board_backends(games=200, repeats=REPEATS):
+    """
+    Board vs BitBoard: time to play `games` whole games (random placement,
+    then a shot at every cell in random order, checking for a win after each
+    hit) and memory per board with ships placed.
+    Returns {backend name: (game_ms, bytes_per_board)}.
+    """
+    cells = [(r, c) for r in range(BOARD_SIZE) for c in range(BOARD_SIZE)]
+    shot_orders = [random.sample(cells, len(cells)) for _ in range(games)]
+    results = {}
+
+    for backend in (Board, BitBoard):
+        def play():
+            for order in shot_orders:
+                board = backend(BOARD_SIZE)
+                board.place_ships_randomly()
+                for r, c in order:
+                    result, _ = board.fire_at(r, c)
+                    if result == "hit" and board.all_ships_sunk():
+                        break
+
+        game_ms = _best_of(repeats, play) * 1000     # also warms any caches
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        boards = [backend(BOARD_SIZE) for _ in range(100)]
+        for board in boards:
+            board.place_ships_randomly()
+            board.changes.clear()   # the delta log isn't part of the board's state
+        per_board = (tracemalloc.get_traced_memory()[0] - before) / len(boards)
+        tracemalloc.stop()
+
+        results[backend.__name__] = (game_ms, per_board)
+    return results
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+def run_comparisons(args):
+    """The before/after comparisons: broadcast encoding, board caching, board backends."""
+    print("Broadcast encode (board + text), best of", args.repeats)
+    print(f"{'audience':>9} {'per-recipient ms':>17} {'shared ms':>10} {'speedup':>8}")
+    for size, old, new in bench_broadcast_encode(args.sizes, args.repeats):
+        print(f"{size:>9} {old:>17.3f} {new:>10.3f} {old / new:>7.2f}x")
+
+    uncached, cached = bench_board_render(repeats=args.repeats)
+    print(f"\n1000 BOARD payloads of an unchanged board: {uncached:.3f} ms uncached, "
+          f"{cached:.3f} ms cached ({uncached / cached:.2f}x)")
+
+    print("\nPayload codecs: encode + decode per message, best of", args.repeats)
+    print(f"{'message':>13} {'json us':>8} {'binary us':>10} {'speedup':>8} {'json B':>7} {'binary B':>9}")
+    for name, json_us, binary_us, json_bytes, binary_bytes in bench_codecs(repeats=args.repeats):
+        print(f"{name:>13} {json_us:>8.2f} {binary_us:>10.2f} {json_us / binary_us:>7.2f}x "
+              f"{json_bytes:>7} {binary_bytes:>9}")
+
+    print("\nPayload compression (deflate with the shared dictionary), best of", args.repeats)
+    print(f"{'message':>13} {'codec':>7} {'bytes':>6} {'deflated':>9} {'compress us':>12} {'decompress us':>14}")
+    for name, codec, size, packed, compress_us, decompress_us in bench_compression(repeats=args.repeats):
+        print(f"{name:>13} {codec:>7} {size:>6} {packed:>9} {compress_us:>12.2f} {decompress_us:>14.2f}")
+
+    print("\nBoard backends, 200 full games")
+    for name, (game_ms, per_board) in bench_board_backends(repeats=args.repeats).items():
+        print(f"{name:>9}: {game_ms:8.3f} ms, {per_board:8.0f} bytes per board")
+
+def main():
+    parser = argparse.ArgumentParser(description="Battleships micro-benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(AUDIENCE_SIZES),
+                        help="audience sizes to encode a broadcast for")
+    parser.add_argument("--repeats", type=int, default=REPEATS,
+                        help="runs per measurement (best is reported)")
+    parser.add_argument("--hot-only", action="store_true",
+                        help="only time the per-message hot paths")
+    parser.add_argument("--json", metavar="PATH", default=None,
+                        help="write the hot-path results here (JSON)")
+    parser.add_argument("--compare", metavar="PATH", default=None,
+                        help="compare against a previous --json file; exit 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="percent slower than the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    derive_key('we_love_cs')
+
+    hot = bench_hot_paths(max(args.repeats, HOT_REPEATS))
+    print(f"Hot paths, best of {max(args.repeats, HOT_REPEATS)}")
+    print(f"{'path':>22} {'ns/op':>12} {'median ns':>12} {'ops/sec':>12}")
+    for name, m in hot.items():
+        print(f"{name:>22} {m['ns_per_op']:>12.1f} {m['median_ns']:>12.1f} {m['ops_per_sec']:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": hot,
+            }, f, indent=2)
+        print(f"[INFO] Results written to {args.json}")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        rows, regressions = compare(hot, baseline, args.threshold)
+        print(f"\nAgainst {args.compare} (regression: > {args.threshold:g}% slower, "
+              f"after scaling by the reference workload)")
+        for name, before, now, change in rows:
+            flag = "  <-- regression" if name in regressions else ""
+            print(f"{name:>22} {before:>12.1f} -> {now:>12.1f} ns {change:+7.1f}%{flag}")
+
+    if not args.hot_only:
+        print()
+        run_comparisons(args)
+
+    if regressions:
+        print(f"[WARNING] {len(regressions)} hot path(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+bots.py
+
+Server-side AI opponents. A BotPlayer stands in for a networked Player: the
+match code sends to it and waits on it exactly as it would for a person, and
+the bot answers each PROMPT straight away - AUTO at placement time, otherwise
+a shot chosen by one of the STRATEGIES from what it can see of the opponent's
+board (Board.attack_view()).
+
+Strategies work on integer bitmasks (bit r * size + c per cell) so a move
+costs microseconds, or well under a millisecond for "probability".
+"""
+
+import random
+import functools
+import threading
+import collections
+from fleets import placement_table, edge_masks
+from utils import *
+
+# ─── Bitmask Helpers ───────────────────────────────────────────────────────────
+def _bits(mask):
+    """Indices of the set bits of `mask`, lowest first."""
+    cells = []
+    while mask:
+        low = mask & -mask
+        cells.append(low.bit_length() - 1)
+        mask ^= low
+    return cells
+
+def _random_cell(mask, rng):
+    return rng.choice(_bits(mask))
+
+def _neighbours(mask, size):
+    """Cells orthogonally next to any cell of `mask`."""
+    full, not_first, not_last = edge_masks(size)
+    return (((mask << 1) & not_first) | ((mask >> 1) & not_last)
+            | (mask << size) | (mask >> size)) & full
+
+@functools.lru_cache(maxsize=64)
+def _lattice(size, spacing):
+    """Cells with (row + col) % spacing == 0: every ship at least `spacing` long crosses one."""
+    return sum(1 << (r * size + c) for r in range(size) for c in range(size)
+               if (r + c) % spacing == 0)
+
+@functools.lru_cache(maxsize=64)
+def _placement_cells(size, ship_size):
+    """placement_table as (mask, covered cell indices) pairs."""
+    return tuple((mask, tuple(_bits(mask))) for mask, _, _, _ in placement_table(size, ship_size))
+
+
+# ─── Strategies ────────────────────────────────────────────────────────────────
+# Each takes a board (anything with .size and .attack_view()) and a
+# random.Random, and returns the index r * size + c of a cell not yet shot.
+
+def random_move(board, rng):
+    hits, misses, _, _ = board.attack_view()
+    full = edge_masks(board.size)[0]
+    return _random_cell(full & ~(hits | misses), rng)
+
+def _targets(board, hits, misses, sunk):
+    """Unshot cells next to a hit on a ship that hasn't sunk yet."""
+    return _neighbours(hits & ~sunk, board.size) & ~(hits | misses)
+
+def hunt_move(board, rng):
+    """Hunt/target: finish off a damaged ship first, otherwise shoot at random."""
+    hits, misses, sunk, _ = board.attack_view()
+    targets = _targets(board, hits, misses, sunk)
+    if targets:
+        return _random_cell(targets, rng)
+    full = edge_masks(board.size)[0]
+    return _random_cell(full & ~(hits | misses), rng)
+
+def parity_move(board, rng):
+    """
+    Hunt/target, but hunting only on a lattice spaced by the shortest ship
+    still afloat, since no ship can hide between its points.
+    """
+    hits, misses, sunk, afloat = board.attack_view()
+    targets = _targets(board, hits, misses, sunk)
+    if targets:
+        return _random_cell(targets, rng)
+    unknown = edge_masks(board.size)[0] & ~(hits | misses)
+    lattice = _lattice(board.size, min(afloat)) & unknown if afloat else 0
+    return _random_cell(lattice or unknown, rng)
+
+def probability_move(board, rng):
+    """
+    Count, for every unshot cell, the placements of the ships still afloat
+    that could cover it without crossing a miss or a sunk ship, and shoot the
+    most likely cell. While a ship is damaged only placements through its
+    hits count, weighted by how many of them they explain.
+    """
+    size = board.size
+    hits, misses, sunk, afloat = board.attack_view()
+    blocked = misses | sunk
+    damaged = hits & ~sunk
+    unknown = edge_masks(size)[0] & ~(hits | misses)
+
+    counts = [0] * (size * size)
+    for target_mode in ((True, False) if damaged else (False,)):
+        for ship_size in afloat:
+            for mask, cells in _placement_cells(size, ship_size):
+                if mask & blocked:
+                    continue
+                weight = 1
+                if target_mode:
+                    weight = (mask & damaged).bit_count()
+                    if not weight or not mask & unknown:
+                        continue
+                for cell in cells:
+                    counts[cell] += weight
+        best = max((counts[cell] for cell in _bits(unknown)), default=0)
+        if best:
+            return rng.choice([cell for cell in _bits(unknown) if counts[cell] == best])
+    return _random_cell(unknown, rng)
+
+STRATEGIES = {
+    "random": random_move,
+    "hunt": hunt_move,
+    "parity": parity_move,
+    "probability": probability_move,
+}
+BOT_LEVELS = tuple(STRATEGIES)
+
+
+# ─── Bot Player ────────────────────────────────────────────────────────────────
+class BotPlayer:
+    """
+    Plays a match in place of a networked Player. It has the attributes the
+    match and table code use (inputs, msg_ready, connected, table, ...), but
+    no socket: messages for it arrive at put() - it is its own outbox - and a
+    PROMPT is answered at once by queueing the bot's move, so the match
+    thread's wait_for_message returns without waiting.
+    """
+    is_bot = True
+
+    def __init__(self, username, level="hunt", rng=None):
+        self.username = username
+        self.level = level
+        self.strategy = STRATEGIES[level]
+        self.rng = rng or random.Random()
+        self.addr = ("bot", 0)
+        self.conn = None
+        self.pin = None
+        self.my_turn = False
+        self.inputs = collections.deque()
+        self.msg_lock = threading.Lock()
+        self.msg_ready = threading.Condition(self.msg_lock)
+        self.outbox = self          # see put()
+        self.board_versions = None  # boards reach a bot in full; it ignores them anyway
+        self.connected = True
+        self.seq = 0
+        self.recv_seq = 0
+        self.table = None
+        self.handed_off = False
+
+    # ── Outbox interface ───────────────────────────────────────────────────
+    def put(self, type, payload, key=None):
+        if type == MessageTypes.PROMPT:
+            self.push_input(self.next_move())
+
+    def close(self, flush=False):
+        self.connected = False
+
+    def join(self, timeout=None):
+        pass
+
+    # ── Player interface ───────────────────────────────────────────────────
+    def push_input(self, coord) -> bool:
+        with self.msg_ready:
+            self.inputs.append(coord)
+            self.msg_ready.notify_all()
+            return True
+
+    def clear_inputs(self):
+        with self.msg_lock:
+            self.inputs.clear()
+
+    def game_state(self):
+        """The GameState of the match this bot is in, if any."""
+        return self.table.state if self.table else None
+
+    def next_move(self):
+        """
+        The reply to the current prompt: AUTO while this bot has no board in
+        the match yet, otherwise a coordinate on the opponent's board.
+        """
+        state = self.game_state()
+        if state is None or state.board_of(self.username) is None:
+            return "AUTO"
+        opponent = next(user for user in state.players if user != self.username)
+        board = state.board_of(opponent)
+        row, col = divmod(self.strategy(board, self.rng), board.size)
+        return f"{chr(ord('A') + row)}{col + 1}"
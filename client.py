@@ -1,4 +1,5 @@
 import sys
+import base64
 import socket
 import threading
 from prompt_toolkit import prompt
@@ -16,7 +17,13 @@ PORT = 5000
 class Server:
     def __init__(self, conn, seq):
         self.conn = conn
-        self.seq = seq
+        self.frame_reader = FrameReader(conn)
+        self.seq = seq          # next seq we send
+        self.recv_seq = seq     # next seq we expect from the server
+        self.codec = "json"     # payload codec; hello() switches to the server's pick
+        self.compression = None # likewise for compression
+        self.send_lock = threading.Lock()   # the receiver thread sends RESYNCs too
+        self.boards = {}        # (board id, ships shown) -> [version, grid], for BOARD_DELTA
 
 # ─── Global State ──────────────────────────────────────────────────────────────
 running = True
@@ -100,6 +107,34 @@ def login(s) -> bool:
         return False
 
 
+# ─── Board Deltas ──────────────────────────────────────────────────────────────
+BOARDS_KEPT = 16    # Board views remembered for applying deltas
+
+def remember_board(s, package):
+    """Decode a full BOARD snapshot, keeping it so later BOARD_DELTAs can be applied."""
+    grid = unpack_grid(base64.b64decode(package.get("packed")))
+    if "id" in package:
+        s.boards.pop((package["id"], package["ships"]), None)
+        s.boards[(package["id"], package["ships"])] = [package["version"], grid]
+        while len(s.boards) > BOARDS_KEPT:
+            del s.boards[next(iter(s.boards))]
+    return grid
+
+def apply_board_delta(s, package):
+    """
+    Apply a BOARD_DELTA to our copy of that board and return the updated
+    grid, or None if our copy isn't the version the delta is against.
+    """
+    entry = s.boards.get((package["id"], package["ships"]))
+    if entry is None or entry[0] != package["base"]:
+        return None
+    version, grid = entry
+    for r, c, value in unpack_cells(base64.b64decode(package["cells"]), len(grid)):
+        grid[r][c] = value
+    entry[0] = package["version"]
+    return grid
+
+
 # ─── Receiver Thread ───────────────────────────────────────────────────────────
 def receiver(s):
     global running
@@ -111,7 +146,16 @@ def receiver(s):
                 break
             type = package.get("type")
             if type == "board":
-                print_board_as_table(package.get("data"))
+                print_board(remember_board(s, package))
+            elif type == "board_delta":
+                board = apply_board_delta(s, package)
+                if board is None:
+                    # Out of step: ask for a full copy of that board
+                    send_package(s, MessageTypes.COMMAND,
+                                 f"RESYNC {package['id']} {int(package['ships'])}")
+                    continue
+                sunk = package.get("sunk")
+                print_board(board, title=f"Sunk: {', '.join(sunk)}" if sunk else None)
             elif type == "prompt":
                 print_boxed(package.get("msg"), style="green")
             elif type == "waiting":
@@ -143,7 +187,13 @@ def main():
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.bind(("127.0.0.1", src_port))
         s.connect((HOST, PORT))
+        set_nodelay(s)
         s = Server(s, 0)
+        try:
+            hello(s)
+        except ConnectionError as e:
+            print_boxed(f"[ERROR] {e}", style="red")
+            return
         
         try:
             # Auth
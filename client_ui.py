@@ -15,28 +15,17 @@ def print_boxed(msg, title=None, style="cyan"):
     ansi = rich_to_ansi(panel)
     print_formatted_text(ANSI(ansi))
 
-def print_board_as_table(board_str: str):
-
-    lines = board_str.strip().splitlines()
-
-    if not lines:
-        return
-
-    col_labels = lines[0].split()
+def print_board(grid, title=None):
+    """Render a decoded board grid (rows of cell characters) as a table."""
     table = Table(show_header=True, header_style="bold white", box=None)
 
-    table.add_column(" ", style="bold white") 
-    for col in col_labels:
-        table.add_column(col, justify="center")
+    table.add_column(" ", style="bold white")
+    for col in range(len(grid)):
+        table.add_column(str(col + 1), justify="center")
 
-    for line in lines[1:]:
-        parts = line.strip().split()
-        if not parts:
-            continue
-        row_label = parts[0]
-        row_cells = parts[1:]
-        table.add_row(row_label, *row_cells)
+    for r, row in enumerate(grid):
+        table.add_row(chr(ord('A') + r), *row)
 
-    panel = Panel(table, border_style="cyan", expand=False)
+    panel = Panel(table, title=title, border_style="cyan", expand=False)
     ansi = rich_to_ansi(panel)
-    print_formatted_text(ANSI(ansi))
\ No newline at end of file
+    print_formatted_text(ANSI(ansi))
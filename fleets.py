@@ -0,0 +1,201 @@
+"""
+fleets.py
+
+Random fleet generation from precomputed placement tables, plus a pool of
+ready-made boards refilled in the background, so auto-placement (and bots)
+never wait on placement when a match starts.
+
+A fleet is a list of (ship_name, row, col, ship_size, orientation) tuples,
+i.e. the arguments to Board.add_ship().
+"""
+
+import random
+import functools
+import threading
+import collections
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+UNIFORM_ATTEMPTS = 20       # Whole-fleet draws before falling back to ship-by-ship
+QUICK_DRAWS = 16            # Ship-by-ship: random draws before listing the free spots
+FALLBACK_ATTEMPTS = 1000    # Ship-by-ship restarts before a fleet is declared impossible
+POOL_SIZE = 64              # Boards a FleetPool keeps ready
+POOL_LOW_WATER = 16         # Refill once the pool drops to this many
+
+
+# ─── Placement Tables ──────────────────────────────────────────────────────────
+@functools.lru_cache(maxsize=64)
+def placement_table(size, ship_size):
+    """
+    Every legal placement of a ship of `ship_size` on an empty size x size
+    board, as (mask, row, col, orientation) with bit r * size + c set for each
+    covered cell (orientation 0 => horizontal, 1 => vertical).
+    """
+    table = []
+    for row in range(size):
+        for col in range(size - ship_size + 1):
+            mask = ((1 << ship_size) - 1) << (row * size + col)
+            table.append((mask, row, col, 0))
+    if ship_size > 1:
+        for row in range(size - ship_size + 1):
+            for col in range(size):
+                mask = sum(1 << ((row + i) * size + col) for i in range(ship_size))
+                table.append((mask, row, col, 1))
+    return tuple(table)
+
+def random_fleet(ships, size, taken=0, rng=random, keep=None, apart=False):
+    """
+    Place `ships` (a list of (name, size)) at random on a size x size board
+    whose cells in the bitmask `taken` are already occupied. Returns a fleet.
+    `keep` optionally restricts ships to placements whose mask it accepts;
+    with `apart`, no two ships may touch, diagonally included.
+
+    Each ship's placement is drawn from its table and the whole fleet is
+    redrawn on any overlap, which makes every valid fleet equally likely. For
+    fleets so dense that almost every draw overlaps, it falls back to placing
+    ship by ship among the spots still free (valid, but no longer uniform).
+    Raises ValueError if the fleet can't be placed.
+    """
+    tables = []
+    for _, ship_size in ships:
+        table = placement_table(size, ship_size)
+        if taken or keep is not None:
+            table = [p for p in table if not p[0] & taken and (keep is None or keep(p[0]))]
+        if not table:
+            raise ValueError(f"no room for a ship of size {ship_size}")
+        tables.append(table)
+
+    def claim(mask):
+        # Cells a placed ship rules out for the rest of the fleet
+        return _halo(mask, size) if apart else mask
+
+    for _ in range(UNIFORM_ATTEMPTS):
+        used, fleet = taken, []
+        for (name, ship_size), table in zip(ships, tables):
+            mask, row, col, orientation = table[rng.randrange(len(table))]
+            if mask & used:
+                break
+            used |= claim(mask)
+            fleet.append((name, row, col, ship_size, orientation))
+        else:
+            return fleet
+
+    for _ in range(FALLBACK_ATTEMPTS):
+        used, fleet = taken, []
+        for (name, ship_size), table in zip(ships, tables):
+            placement = _draw_free(table, used, rng)
+            if placement is None:
+                break               # Dead end: start the fleet again
+            mask, row, col, orientation = placement
+            used |= claim(mask)
+            fleet.append((name, row, col, ship_size, orientation))
+        else:
+            return fleet
+
+    raise ValueError("could not fit the fleet on the board")
+
+def _draw_free(table, used, rng):
+    """A random placement from `table` that avoids `used`, or None if none does."""
+    for _ in range(QUICK_DRAWS):
+        placement = table[rng.randrange(len(table))]
+        if not placement[0] & used:
+            return placement
+    free = [p for p in table if not p[0] & used]
+    return free[rng.randrange(len(free))] if free else None
+
+@functools.lru_cache(maxsize=16)
+def _border(size):
+    """Bitmask of the cells on the edge of a size x size board."""
+    return sum(1 << (r * size + c) for r in range(size) for c in range(size)
+               if r in (0, size - 1) or c in (0, size - 1))
+
+@functools.lru_cache(maxsize=16)
+def edge_masks(size):
+    """(every cell, every cell but column 0, every cell but the last column)"""
+    full = (1 << (size * size)) - 1
+    first_col = sum(1 << (r * size) for r in range(size))
+    return full, full & ~first_col, full & ~(first_col << (size - 1))
+
+def _halo(mask, size):
+    """`mask` plus every cell touching it, diagonals included."""
+    full, not_first, not_last = edge_masks(size)
+    wide = mask | ((mask << 1) & not_first) | ((mask >> 1) & not_last)
+    return (wide | (wide << size) | (wide >> size)) & full
+
+
+# ─── Placement Strategies ──────────────────────────────────────────────────────
+# Each takes (ships, size, rng) and returns a fleet, for bots and tournaments.
+
+def uniform_fleet(ships, size, rng=random):
+    """Every valid fleet equally likely."""
+    return random_fleet(ships, size, rng=rng)
+
+def edge_fleet(ships, size, rng=random):
+    """Every ship touches the edge of the board."""
+    border = _border(size)
+    return random_fleet(ships, size, rng=rng, keep=lambda mask: mask & border)
+
+def centre_fleet(ships, size, rng=random):
+    """No ship touches the edge of the board."""
+    border = _border(size)
+    return random_fleet(ships, size, rng=rng, keep=lambda mask: not mask & border)
+
+def spread_fleet(ships, size, rng=random):
+    """No two ships touch, not even diagonally."""
+    return random_fleet(ships, size, rng=rng, apart=True)
+
+PLACEMENTS = {
+    "uniform": uniform_fleet,
+    "edge": edge_fleet,
+    "centre": centre_fleet,
+    "spread": spread_fleet,
+}
+
+
+# ─── Board Pool ────────────────────────────────────────────────────────────────
+class FleetPool:
+    """
+    Keeps up to POOL_SIZE boards with a random fleet already placed. A
+    daemon thread tops the pool up whenever it drops to POOL_LOW_WATER, so
+    take() is normally just a pop; if the pool ever runs dry, take() builds a
+    board inline rather than wait.
+
+    `make_board` is a zero-argument factory for an empty board (e.g.
+    lambda: BitBoard(10)); `ships` is the fleet to place on each one.
+    """
+    def __init__(self, make_board, ships, capacity=POOL_SIZE, low_water=POOL_LOW_WATER):
+        self.make_board = make_board
+        self.ships = list(ships)
+        self.capacity = capacity
+        self.low_water = low_water
+        self.boards = collections.deque()
+        self.cond = threading.Condition()
+        self.misses = 0             # take() calls that found the pool empty
+        self.refiller = threading.Thread(target=self._run, daemon=True, name="fleet-pool")
+        self.refiller.start()
+
+    def build(self):
+        board = self.make_board()
+        for placement in random_fleet(self.ships, board.size):
+            board.add_ship(*placement)
+        return board
+
+    def take(self):
+        """A board with the fleet placed, ready for a match."""
+        with self.cond:
+            if len(self.boards) <= self.low_water:
+                self.cond.notify()
+            if self.boards:
+                return self.boards.popleft()
+            self.misses += 1
+        return self.build()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while len(self.boards) > self.low_water:
+                    self.cond.wait()
+                wanted = self.capacity - len(self.boards)
+            # Build outside the lock so take() never waits on generation
+            fresh = [self.build() for _ in range(wanted)]
+            with self.cond:
+                self.boards.extend(fresh)
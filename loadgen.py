@@ -0,0 +1,378 @@
+"""
+loadgen.py
+
+Headless load generator for server.py / async_server.py. Starts virtual
+clients at a configurable rate, each speaking the real protocol from utils.py
+(framed, AES-CTR encrypted, sequence numbered) over its own connection:
+
+  - opens with a HELLO offering the payload codecs (--codec) and compression
+    (--compression)
+  - registers a fresh account, then logs back in for any further sessions
+  - plays whenever the server seats it: AUTO placement, then shots from a
+    bots.py strategy (or a fixed scripted order), assuming the fleet the
+    server plays (--fleet)
+  - spectates whatever it is shown while queued, and chats now and then
+
+At the end it reports p50/p95/p99 latency per request type (time from
+sending a command to the server's first reply), error counts and what the
+server got through per second.
+
+    python3 loadgen.py --clients 1000 --rate 50
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import collections
+from battleship import BOARD_SIZE, SHIPS, TESTING_SHIPS, GAME_SHIPS
+from bots import STRATEGIES
+from utils import *
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+HOST = "127.0.0.1"
+PORT = 5000
+REPLY_TIMEOUT = 60.0        # Seconds without a message before a client gives up
+PIN = "1234"
+CODEC_OFFERS = {                # --codec: what the HELLO offers
+    "binary": PAYLOAD_CODECS,
+    "json": ("json",),
+}
+COMPRESSION_OFFERS = {          # --compression: the methods the HELLO offers
+    **{method: (method,) for method in COMPRESSION_METHODS},
+    "none": (),
+}
+FLEETS = {                      # --fleet: the ships the target server places
+    "game": GAME_SHIPS,         # what server.py and async_server.py play
+    "standard": SHIPS,
+    "testing": TESTING_SHIPS,
+}
+LOGIN_REPLIES = {"USERNAME_OK", "USERNAME_TAKEN", "USER_NOT_FOUND",
+                 "REGISTRATION_SUCCESS", "LOGIN_SUCCESS", "LOGIN_FAILURE"}
+
+
+# ─── Stats ─────────────────────────────────────────────────────────────────────
+class LoadStats:
+    """Everything the virtual clients measure, shared by all of them (one event loop)."""
+    def __init__(self):
+        self.latency = collections.defaultdict(lambda: LatencyStats(keep=None))
+        self.received = collections.Counter()   # message type -> count
+        self.errors = collections.Counter()     # error kind -> count
+        self.codecs = collections.Counter()     # codec (+ compression) the server picked -> sessions
+        self.games = 0                          # games won by a virtual client
+        self.sessions = 0
+        self.started = time.monotonic()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        total = sum(self.received.values())
+        return {
+            "seconds": round(elapsed, 3),
+            "sessions": self.sessions,
+            "games_completed": self.games,
+            "games_per_sec": round(self.games / elapsed, 2),
+            "messages_received": total,
+            "messages_per_sec": round(total / elapsed, 1),
+            "received_by_type": dict(self.received),
+            "latency": {op: stats.summary() for op, stats in sorted(self.latency.items())},
+            "codecs": dict(self.codecs),
+            "compression": compression_stats.summary(),
+            "errors": dict(self.errors),
+        }
+
+
+# ─── Virtual Client ────────────────────────────────────────────────────────────
+class SeenBoard:
+    """
+    What a client has learnt about the board it is firing at, shaped like
+    Board.attack_view() so bots.py strategies can pick its shots. Which cells
+    belonged to a sunk ship isn't visible client-side, so none are marked.
+    """
+    def __init__(self, size=BOARD_SIZE, ships=SHIPS):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.afloat = dict(ships)   # ship name -> size, for those not yet sunk
+
+    def attack_view(self):
+        return self.hits, self.misses, 0, list(self.afloat.values())
+
+    def record(self, cell, reply):
+        if reply.startswith("HIT"):
+            self.hits |= 1 << cell
+            sunk = reply.partition("You blew up the ")[2].rstrip("!")
+            self.afloat.pop(sunk, None)
+        elif reply.startswith("MISS"):
+            self.misses |= 1 << cell
+
+class VirtualClient:
+    """One simulated player: a connection plus the per-session protocol state."""
+    def __init__(self, name, stats, strategy, games, chat_interval, rng, codecs=PAYLOAD_CODECS,
+                 compression=COMPRESSION_METHODS, ships=GAME_SHIPS):
+        self.name = name
+        self.stats = stats
+        self.strategy = strategy
+        self.games = games
+        self.chat_interval = chat_interval
+        self.rng = rng
+        self.codecs = codecs        # offered in the HELLO
+        self.offer_compression = compression
+        self.ships = ships          # fleet the server plays, for the strategies
+        self.reader = self.writer = None
+        self.seq = self.recv_seq = 0
+        self.codec, self.compression = "json", None
+        self.sent_at = None         # (op, monotonic time) awaiting the first reply
+        self.chat_sent = collections.deque()    # send times of chats not yet echoed back
+        self.stopped = False
+
+    async def send(self, type, text, op):
+        self.sent_at = (op, time.monotonic())
+        await send_package_async(self, type, text)
+
+    async def receive(self, timed=True):
+        """The next message; with `timed`, the first one after a send counts as its reply."""
+        try:
+            package = await asyncio.wait_for(receive_package_async(self), REPLY_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats.errors["timeout"] += 1
+            raise ConnectionError("timed out")
+        kind = package.get("type")
+        self.stats.received[kind] += 1
+        if timed and self.sent_at is not None and kind != "chat":
+            op, sent = self.sent_at
+            self.stats.latency[op].record(time.monotonic() - sent)
+            self.sent_at = None
+        if kind == "chat" and self.chat_sent and package.get("msg", "").startswith(f"{self.name}:"):
+            # Chat is broadcast to everyone, sender included: time it to our own echo
+            self.stats.latency["chat"].record(time.monotonic() - self.chat_sent.popleft())
+        return package
+
+    async def run(self, host, port, sessions):
+        for session in range(sessions):
+            if self.stopped:
+                return
+            try:
+                await self.session(host, port, register=(session == 0))
+            except ConnectionRefusedError:
+                self.stats.errors["connect_refused"] += 1
+                return
+            except (ConnectionError, OSError):
+                if not self.stopped:
+                    self.stats.errors["disconnected"] += 1
+                return
+            finally:
+                if self.writer is not None:
+                    self.writer.close()
+
+    def stop(self):
+        """
+        Hang up at the end of a timed run. The connection is aborted as well as
+        the task cancelled: on a busy loop wait_for() can swallow a cancel, but
+        the next read on a dead connection always fails.
+        """
+        self.stopped = True
+        if self.writer is not None:
+            self.writer.transport.abort()
+
+    async def session(self, host, port, register):
+        start = time.monotonic()
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        if self.stopped:
+            return
+        self.stats.latency["connect"].record(time.monotonic() - start)
+        self.seq = self.recv_seq = 0
+        self.codec, self.compression = "json", None
+        start = time.monotonic()
+        try:
+            codec = await asyncio.wait_for(
+                hello_async(self, self.codecs, self.offer_compression), REPLY_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats.errors["timeout"] += 1
+            raise ConnectionError("timed out")
+        self.stats.codecs[f"{codec}+{self.compression}" if self.compression else codec] += 1
+        self.stats.latency["hello"].record(time.monotonic() - start)
+
+        if not await self.log_in(register):
+            return
+        self.stats.sessions += 1
+        chatter = asyncio.create_task(self.chat()) if self.chat_interval else None
+        try:
+            await self.play()
+        finally:
+            if chatter:
+                chatter.cancel()
+
+    async def login_reply(self):
+        """
+        The server's answer to a login step. Broadcasts also reach connections
+        that haven't logged in yet, so anything else is skipped.
+        """
+        while True:
+            reply = (await self.receive(timed=False)).get("msg")
+            if reply in LOGIN_REPLIES:
+                op, sent = self.sent_at
+                self.stats.latency[op].record(time.monotonic() - sent)
+                self.sent_at = None
+                return reply
+
+    async def log_in(self, register):
+        verb = "REGISTER" if register else "LOGIN"
+        await self.send(MessageTypes.COMMAND, f"{verb} {self.name}", verb.lower())
+        reply = await self.login_reply()
+        if reply != "USERNAME_OK":
+            self.stats.errors[f"{verb.lower()}_{reply}".lower()] += 1
+            return False
+        await self.send(MessageTypes.COMMAND, f"{'SETPIN' if register else 'PIN'} {PIN}", "pin")
+        reply = await self.login_reply()
+        if reply not in ("REGISTRATION_SUCCESS", "LOGIN_SUCCESS"):
+            self.stats.errors[f"pin_{reply}".lower()] += 1
+            return False
+        return True
+
+    async def chat(self):
+        """Say something every `chat_interval` seconds on average (exponential gaps)."""
+        self.chat_sent.clear()
+        try:
+            while True:
+                await asyncio.sleep(self.rng.expovariate(1 / self.chat_interval))
+                self.chat_sent.append(time.monotonic())
+                await send_package_async(self, MessageTypes.CHAT, f"hello from {self.name}")
+        except (ConnectionError, OSError):
+            pass                    # play() notices the dropped connection too
+
+    async def play(self):
+        """Answer prompts until `games` games have finished; anything else is spectating."""
+        played, seen, shot = 0, None, None
+        unshot = []
+
+        while played < self.games:
+            package = await self.receive()
+            kind = package.get("type")
+
+            if kind == "prompt":
+                if "orientation" in package.get("msg", ""):
+                    seen, shot = SeenBoard(ships=self.ships), None
+                    unshot = list(range(BOARD_SIZE * BOARD_SIZE))
+                    await self.send(MessageTypes.COMMAND, "AUTO", "place")
+                    continue
+                if seen is None:
+                    seen, unshot = SeenBoard(ships=self.ships), list(range(BOARD_SIZE * BOARD_SIZE))
+                if self.strategy is None:
+                    shot = unshot.pop(0)                        # scripted: A1, A2, ...
+                else:
+                    shot = self.strategy(seen, self.rng)
+                row, col = divmod(shot, BOARD_SIZE)
+                await self.send(MessageTypes.COMMAND, f"{chr(ord('A') + row)}{col + 1}", "fire")
+
+            elif kind == "s_msg":
+                text = package.get("msg", "")
+                if shot is not None and text.startswith(("HIT", "MISS")):
+                    seen.record(shot, text)
+                    shot = None
+                elif text.startswith("Invalid input"):
+                    self.stats.errors["invalid_input"] += 1
+
+            elif kind == "result":
+                played += 1
+                if "win" in package.get("msg", "").lower():
+                    self.stats.games += 1
+                seen = None
+
+            elif kind == "shutdown":
+                self.stats.errors["server_shutdown"] += 1
+                return
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+def _raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+async def run_load(host, port, clients, rate, sessions, games, strategy, chat_interval, seed, duration,
+                   codecs=PAYLOAD_CODECS, compression=COMPRESSION_METHODS, ships=GAME_SHIPS):
+    stats = LoadStats()
+    rng = random.Random(seed)
+    prefix = f"load{rng.randrange(10**6):06d}"     # fresh names on every run
+    deadline = time.monotonic() + duration if duration else None
+    started, tasks = [], []
+
+    for i in range(clients):
+        if deadline and time.monotonic() >= deadline:
+            break
+        client = VirtualClient(f"{prefix}-{i}", stats, strategy, games, chat_interval,
+                               random.Random(rng.random()), codecs, compression, ships)
+        started.append(client)
+        tasks.append(asyncio.create_task(client.run(host, port, sessions)))
+        if rate:
+            await asyncio.sleep(1 / rate)
+
+    timeout = max(0, deadline - time.monotonic()) if deadline else None
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        stats.errors["unfinished"] += len(pending)
+        for client, task in zip(started, tasks):
+            if not task.done():
+                client.stop()
+                task.cancel()
+        await asyncio.wait(pending)
+    return stats.report()
+
+def main():
+    parser = argparse.ArgumentParser(description="Battleships load generator")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--clients", type=int, default=100, help="virtual clients to start")
+    parser.add_argument("--rate", type=float, default=20.0,
+                        help="new clients per second (0: all at once)")
+    parser.add_argument("--sessions", type=int, default=1,
+                        help="connections per client: the first registers, later ones log in")
+    parser.add_argument("--games", type=int, default=1, help="games per session")
+    parser.add_argument("--strategy", choices=["scripted", *STRATEGIES], default="hunt",
+                        help="how clients pick shots")
+    parser.add_argument("--chat-interval", type=float, default=0, metavar="SECONDS",
+                        help="mean seconds between a client's chat messages (0: never chat)")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="hang up on every client this many seconds after the start")
+    parser.add_argument("--codec", choices=sorted(CODEC_OFFERS), default="binary",
+                        help="payload codecs to offer in the HELLO")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_OFFERS), default=COMPRESSION_METHODS[0],
+                        help="compression to offer in the HELLO")
+    parser.add_argument("--fleet", choices=sorted(FLEETS), default="game",
+                        help="fleet the target server plays (game: the one both servers use)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=None, help="also write the report here (JSON)")
+    args = parser.parse_args()
+
+    derive_key('we_love_cs')
+    _raise_fd_limit()
+    strategy = None if args.strategy == "scripted" else STRATEGIES[args.strategy]
+
+    report = asyncio.run(run_load(args.host, args.port, args.clients, args.rate, args.sessions,
+                                  args.games, strategy, args.chat_interval, args.seed, args.duration,
+                                  CODEC_OFFERS[args.codec], COMPRESSION_OFFERS[args.compression],
+                                  FLEETS[args.fleet]))
+
+    print(f"[INFO] {report['sessions']} sessions, {report['games_completed']} games in "
+          f"{report['seconds']}s ({report['games_per_sec']} games/sec, "
+          f"{report['messages_per_sec']} messages/sec received)")
+    print(f"{'request':>10} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for op, s in report["latency"].items():
+        print(f"{op:>10} {s['count']:>8} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} "
+              f"{s['p99_ms']:>9.3f} {s['max_ms']:>9.3f}")
+    compression = report["compression"]
+    if compression["frames_decompressed"]:
+        print(f"[INFO] Compressed frames received: {compression['frames_decompressed']} "
+              f"({compression['decompress_ratio']:.0%} of their uncompressed size, "
+              f"{compression['decompress_us_per_frame']} us each to decompress)")
+    if report["errors"]:
+        print(f"[WARNING] Errors: {report['errors']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Report written to {args.out}")
+
+if __name__ == "__main__":
+    main()
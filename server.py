@@ -1,89 +1,513 @@
+import os
+import json
+import base64
 import socket
+import signal
+import argparse
+import collections
+import multiprocessing
+from multiprocessing.managers import BaseManager
 import threading
+import itertools
 import time
-from battleship import run_two_player_game_online
+from concurrent.futures import ThreadPoolExecutor
+from battleship import run_two_player_game_online, fleet_pool, GAME_SHIPS
+from bots import BotPlayer, BOT_LEVELS
 from utils import *
 
 
+# ─── Configuration ──────────────────────────────────────────────────────────
+HOST = "127.0.0.1"
+PORT = 5000
+ACCEPT_BACKLOG = 1024        # Default listen() backlog, override with --backlog
+ACCEPT_BATCH = 256           # Most connections dispatched per accept wake-up
+ACCEPT_BACKOFF = 0.1         # Seconds to pause after a failed accept (e.g. out of fds)
+MAX_CONCURRENT_MATCHES = 32  # Size of the match worker pool
+INPUT_QUEUE_LIMIT = 16       # Commands a player may have queued ahead of the game
+OUTBOX_LIMIT = 256           # Messages queued for one client before it's dropped as too slow
+SLOW_CONSUMER_TIMEOUT = 10.0 # Seconds a queued message may wait before its client is dropped
+OUTBOX_BATCH = 64            # Most queued messages a writer sends with one sendmsg()
+BOT_WAIT = 20.0              # Seconds a lone player waits before a bot is seated against them
+BOT_LEVEL = "hunt"           # Bot strategy, one of bots.BOT_LEVELS
+RELAY_BACKLOG = 256          # Lobby-wide messages the lobby service keeps for slow workers
+RELAY_POLL = 1.0             # Seconds a worker's relay thread waits for a message per call
+
+
 # ─── Shared State ───────────────────────────────────────────────────────────
-incoming_connections = []   # List of (conn, addr)
-player_queue = []           # List of Player instances
-t_lock = threading.Lock()  # Protects both lists
+connections = set()         # Every Player with a live client handler
+lobby = PlayerQueue()       # Logged-in players not yet seated at a table
+tables = []                 # Active Table instances, one per running match
+pending_reconnects = {}     # username -> (Table, seat index) awaiting a rejoin
+t_lock = threading.Lock()   # Protects the collections above and every table's queue
+sched_cond = threading.Condition(t_lock)  # Signalled whenever seating changes
 running = False
-current_state = None
-all_player_logins = {}
+matches_completed = 0
+started_at = None
+accept_stats = LatencyStats()  # accept() -> client handler running
+match_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_MATCHES,
+                                thread_name_prefix="match")
+worker_id = None            # Set in --workers mode
+bot_wait = BOT_WAIT         # None = never seat bots (see --bot-wait)
+bot_level = BOT_LEVEL
+bot_ids = itertools.count(1)
+
+
+# ─── Lobby Service ───────────────────────────────────────────────────────────
+class LobbyService:
+    """
+    Accounts plus a who-is-online-where directory. In single-process mode the
+    server uses a local instance; with --workers it lives in a manager process
+    and every worker talks to the same instance through a proxy, so any worker
+    can log any user in. Methods are called from many threads, hence the lock.
+
+    It also carries lobby-wide messages (chat) between workers: a worker
+    publishes one and every worker's relay thread picks it up with
+    messages_after() and fans it out to its own players.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logins = {}       # username -> pin
+        self._online = {}       # username -> worker id
+        self._waiting = {}      # worker id -> players sitting unpaired in its lobby
+        self._bots = set()      # Names of the bots currently seated, off-limits to humans
+        self._feed = collections.deque(maxlen=RELAY_BACKLOG)  # (number, worker, type, msg)
+        self._feed_next = 0     # Number the next published message gets
+        self._feed_cond = threading.Condition(self._lock)
+
+    def exists(self, username):
+        with self._lock:
+            return username in self._logins
+
+    def register(self, username, pin) -> bool:
+        """Atomically create an account. False if the name was taken meanwhile."""
+        with self._lock:
+            if username in self._logins or username in self._bots:
+                return False
+            self._logins[username] = pin
+            return True
+
+    def reserve_bot(self, username) -> bool:
+        """Hold a name for a bot until release_bot(). False if it's in use."""
+        with self._lock:
+            if username in self._logins or username in self._bots:
+                return False
+            self._bots.add(username)
+            return True
+
+    def release_bot(self, username):
+        with self._lock:
+            self._bots.discard(username)
+
+    def check_pin(self, username, pin) -> bool:
+        with self._lock:
+            return self._logins.get(username) == pin
+
+    def set_online(self, username, worker):
+        with self._lock:
+            self._online[username] = worker
+
+    def set_offline(self, username, worker):
+        with self._lock:
+            if self._online.get(username) == worker:
+                del self._online[username]
+
+    def online_per_worker(self):
+        with self._lock:
+            return dict(collections.Counter(self._online.values()))
+
+    def set_waiting(self, worker, count):
+        with self._lock:
+            self._waiting[worker] = count
+
+    def claim_partner(self, worker):
+        """
+        Find another worker with an unpaired player and reserve that player
+        for the caller. Returns the worker id, or None if nobody is waiting.
+        """
+        with self._lock:
+            for other, count in self._waiting.items():
+                if other != worker and count > 0:
+                    self._waiting[other] = count - 1
+                    return other
+            return None
+
+    def publish(self, worker, msg_type, msg):
+        with self._lock:
+            self._feed.append((self._feed_next, worker, msg_type, msg))
+            self._feed_next += 1
+            self._feed_cond.notify_all()
+
+    def messages_after(self, cursor, timeout):
+        """
+        Long-poll for messages numbered `cursor` or later, waiting up to
+        `timeout` seconds for the first one. Returns (next cursor, entries).
+        A cursor of None starts from whatever is published next.
+        """
+        with self._lock:
+            if cursor is None:
+                cursor = self._feed_next
+            self._feed_cond.wait_for(lambda: self._feed_next > cursor, timeout)
+            return self._feed_next, [e for e in self._feed if e[0] >= cursor]
+
+
+class LobbyManager(BaseManager):
+    pass
+
+_shared_lobby = None
+
+def _get_shared_lobby():
+    # Runs inside the manager process: every worker gets a proxy to this one instance
+    global _shared_lobby
+    if _shared_lobby is None:
+        _shared_lobby = LobbyService()
+    return _shared_lobby
+
+LobbyManager.register("lobby", callable=_get_shared_lobby)
+
+lobby_service = LobbyService()  # Replaced by a proxy in --workers mode
 
 
 # ─── Player Class ────────────────────────────────────────────────────────────
 class Player:
-    def __init__(self, conn, addr):
+    is_bot = False
+
+    def __init__(self, conn, addr, pending=b''):
         self.conn = conn
+        self.frame_reader = FrameReader(conn, pending)  # `pending`: bytes already read off conn
         self.addr = addr
         self.username = None
         self.pin = None
         self.my_turn = False
-        self.latest_coord = None
+        self.inputs = collections.deque()   # FIFO of commands not yet consumed by the match
         self.msg_lock = threading.Lock()
+        self.msg_ready = threading.Condition(self.msg_lock)  # Signalled on new input or disconnect
+        self.send_lock = threading.Lock()   # Serialises send_package across threads
+        self.outbox = None          # Outbox drained by this player's writer, once logged in
+        self.board_versions = None  # (board id, show_ships) -> version last sent; set on HELLO
         self.connected = True
         self.seq = 0
+        self.recv_seq = 0
+        self.protocol = LEGACY_PROTOCOL  # Until the client's HELLO says otherwise
+        self.codec = "json"         # Payload codec we send in; the client may pick another in its HELLO
+        self.compression = None     # Compression method agreed in the HELLO, if any
+        self.table = None           # Table this player is playing/spectating at
+        self.handed_off = False     # Moved to another worker; don't clean up
+        self.waiting_since = None   # When they last entered the lobby, for bot backfill
+
+    def push_input(self, coord) -> bool:
+        """
+        Queue a command for wait_for_message. Returns False (and drops the
+        command) if INPUT_QUEUE_LIMIT commands are already waiting.
+        """
+        with self.msg_ready:
+            if len(self.inputs) >= INPUT_QUEUE_LIMIT:
+                return False
+            self.inputs.append(coord)
+            self.msg_ready.notify_all()
+            return True
+
+    def clear_inputs(self):
+        with self.msg_lock:
+            self.inputs.clear()
+
+# ─── Outbox Class ────────────────────────────────────────────────────────────
+class Outbox:
+    """
+    Bounded queue of outgoing messages for one player, written to the socket
+    by that player's own writer thread. Once a player has an outbox,
+    send_package just queues here, so a broadcast never waits on a client's
+    TCP window.
+
+    Slow consumers:
+    • A message posted with a `key` supersedes any queued, unsent message with
+      the same key (e.g. an older spectator board or queue position).
+    • A client with OUTBOX_LIMIT messages queued, or whose oldest message has
+      waited SLOW_CONSUMER_TIMEOUT seconds, is given up on: the outbox closes
+      and the socket is shut down, which the client handler treats as a
+      disconnect.
+    Seq numbers are assigned as messages are written, so dropping one never
+    leaves a gap.
+
+    The writer sends everything queued (up to OUTBOX_BATCH messages) with one
+    send_payloads call, folded into BATCH frames. Code that queues a turn's
+    worth of messages wraps it in utils.coalesced(), which holds the writer
+    (hold/release) until the last one is in, so they leave in a single write.
+    """
+    def __init__(self, player: "Player"):
+        self.player = player
+        self.entries = collections.deque()  # [queued_at, type, payload, key]; payload None = superseded
+        self.latest = {}            # key -> its queued entry
+        self.pending = 0            # Entries not superseded
+        self.cond = threading.Condition()
+        self.closed = False
+        self.holds = 0              # hold() calls not yet released
+        self.writer = threading.Thread(target=self._run, daemon=True,
+                                       name=f"writer-{player.username}")
+
+    def start(self):
+        self.writer.start()
+
+    def put(self, type: MessageTypes, payload: Payload, key=None):
+        with self.cond:
+            if self.closed:
+                raise ConnectionError("outbox closed")
+            now = time.monotonic()
+            while self.entries and self.entries[0][2] is None:
+                self.entries.popleft()
+            stalled = self.entries and now - self.entries[0][0] > SLOW_CONSUMER_TIMEOUT
+            if self.pending >= OUTBOX_LIMIT or stalled:
+                self._give_up_locked()
+                raise ConnectionError("client too slow")
+
+            if key is not None and key in self.latest:
+                self.latest[key][2] = None
+                self.pending -= 1
+            entry = [now, type, payload, key]
+            if key is not None:
+                self.latest[key] = entry
+            self.entries.append(entry)
+            self.pending += 1
+            self.cond.notify()
+
+    def hold(self):
+        with self.cond:
+            self.holds += 1
+
+    def release(self):
+        with self.cond:
+            self.holds -= 1
+            if not self.holds:
+                self.cond.notify()
+
+    def close(self, flush=False):
+        """
+        Stop accepting messages. With `flush` the writer still sends what is
+        queued (see join); otherwise the queue is dropped.
+        """
+        with self.cond:
+            self.closed = True
+            if not flush:
+                self.entries.clear()
+                self.latest.clear()
+                self.pending = 0
+            self.cond.notify()
+
+    def join(self, timeout=None):
+        if self.writer.is_alive():
+            self.writer.join(timeout)
+
+    def _give_up_locked(self):
+        print(f"[INFO] {self.player.username} can't keep up ({self.pending} messages queued) - disconnecting")
+        self.closed = True
+        self.entries.clear()
+        self.latest.clear()
+        self.pending = 0
+        self.cond.notify()
+        try:
+            self.player.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while (not self.entries or self.holds) and not self.closed:
+                    self.cond.wait()
+                if not self.entries:
+                    return
+                batch = []
+                while self.entries and len(batch) < OUTBOX_BATCH:
+                    entry = self.entries.popleft()
+                    _, type, payload, key = entry
+                    if payload is None:
+                        continue
+                    self.pending -= 1
+                    if key is not None and self.latest.get(key) is entry:
+                        del self.latest[key]
+                    batch.append((type, payload))
+            if not batch:
+                continue
+            try:
+                send_payloads(self.player, batch, batch=True)
+            except ConnectionError:
+                self.close()
+                try:
+                    self.player.conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return
 
 # ─── Game State Class ────────────────────────────────────────────────────────
 class GameState:
     def __init__(self, p1: "Player", p2: "Player"):
-        self.players        = {p1.username, p2.username}      
-        self.boards         = {p1.username: None,             
+        self.players        = {p1.username, p2.username}
+        self.boards         = {p1.username: None,
                                p2.username: None}
-        self.current_player = None            
+        self.current_player = None
 
     # convenience helpers
     def board_of(self, user):      return self.boards[user]
     def set_board(self, user, b):  self.boards[user] = b
 
-# ─── Receiver Thread ─────────────────────────────────────────────────────────
-def receiver_thread(server_sock):
+# ─── Table Class ─────────────────────────────────────────────────────────────
+class Table:
     """
-    Accept new connections and append them to incoming_connections.
+    One match slot. `queue` (a PlayerQueue) is laid out like the old global queue:
+    the first two players are playing, everyone after them is spectating this
+    match. Winner/loser requeueing happens within the table.
+    All access to `queue` must hold t_lock.
     """
-    global running
-    while running:
-        try:
-            conn, addr = server_sock.accept()
-            with t_lock:
-                incoming_connections.append((conn, addr))
-            print(f"[INFO] New connection from {addr}")
-        except OSError:
-            break
-
+    def __init__(self, p1: Player, p2: Player):
+        self.queue = PlayerQueue([p1, p2])
+        self.state = None
+        for p in self.queue:
+            p.table = self
+
+    def seat(self, player: Player, index=None):
+        if index is None:
+            self.queue.append(player)
+        else:
+            self.queue.insert(index, player)
+        player.table = self
+
+    def unseat(self, player: Player):
+        self.queue.discard(player)
+        if player.table is self:
+            player.table = None
+
+    # ── Announcements scoped to this table ─────────────────────────────────
+    def broadcast(self, *, msg=None, msg_type=MessageTypes.S_MESSAGE,
+                  board=None, show_ships=False, spectators_only=False):
+        """
+        Same parameters as the module-level broadcast(), but the audience is
+        only this table's players and spectators.
+        """
+        with t_lock:
+            targets = self.queue.tail(2) if spectators_only else list(self.queue)
+        # One supersede key per board view: a newer snapshot of the same board
+        # may replace a queued one, but never a different board's snapshot
+        board_key = ("board", board.board_id, show_ships) if board is not None else None
+        _fan_out(targets, msg, msg_type, board, show_ships, board_key=board_key)
+
+    def notify_spectators(self, defender_board, result, ships_sunk, attacker):
+        """
+        Computes the right message(s) then delegates to broadcast().
+        """
+        if ships_sunk:
+            self.broadcast(
+                msg=f"{attacker.username} has won!",
+                msg_type=MessageTypes.S_MESSAGE,
+                spectators_only=True
+            )
+            self.resend_queue_pos()
+            return
+
+        if result == "timeout":
+            text = f"{attacker.username} timed out. They lose!"
+            self.resend_queue_pos()
+        else:
+            verb = {"hit": "HIT", "miss": "MISSED", "already_shot": "ALREADY SHOT"}[result]
+            text = f"{attacker.username} has {verb} the defender."
+
+        # message + updated defender board
+        self.broadcast(msg=text,
+                       msg_type=MessageTypes.S_MESSAGE,
+                       board=defender_board,
+                       show_ships=False,
+                       spectators_only=True)
+
+    def resend_queue_pos(self, from_position=1):
+        """
+        Tell spectators their place in line. Pass `from_position` when only
+        those from that place back have moved (e.g. someone ahead left).
+        """
+        with t_lock:
+            spectators = self.queue.tail(1 + from_position)
+
+        position = from_position
+        for spec in spectators:
+            if _safe_send(
+                spec,
+                MessageTypes.WAITING,
+                f"You are number {position} in the queue",
+                key="queue_pos"
+            ):
+                position += 1
 
-# ─── Queue Maintainer Thread ─────────────────────────────────────────────────
-def queue_maintainer_thread():
+# ─── Receiver Thread ─────────────────────────────────────────────────────────
+def receiver_thread(server_sock):
     """
-    Move sockets from incoming_connections into the player_queue for matching.
+    Accept new connections and hand each one straight to its own client
+    handler. After each blocking accept we drain whatever else is already
+    waiting in the backlog (up to ACCEPT_BATCH) without blocking, so a
+    connection storm is dispatched in batches rather than one at a time.
+
+    A failed accept (out of file descriptors, a connection reset before we
+    got to it, ...) only ends the current batch: we log it, back off for
+    ACCEPT_BACKOFF and keep going. The loop exits once the server is
+    shutting down and the listening socket has been closed.
     """
-    global running
     while running:
-        with t_lock:
-            if incoming_connections:
-                conn, addr = incoming_connections.pop(0)
-                player = Player(conn, addr)  
-                threading.Thread(target=client_handler, args=(player,), daemon=True).start()
-                print(f"[INFO] A client-handler has been assigned to {addr}, now trying to log this client in.")
-                
-        time.sleep(0.5)
+        try:
+            batch = [(*server_sock.accept(), time.monotonic())]
+        except OSError as e:
+            if not running or server_sock.fileno() == -1:
+                break
+            print(f"[WARNING] accept() failed: {e}")
+            time.sleep(ACCEPT_BACKOFF)
+            continue
+
+        accept_error = None
+        server_sock.setblocking(False)
+        try:
+            while len(batch) < ACCEPT_BATCH:
+                batch.append((*server_sock.accept(), time.monotonic()))
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            accept_error = e
+        finally:
+            if server_sock.fileno() != -1:
+                server_sock.setblocking(True)
+
+        for conn, addr, accepted_at in batch:
+            conn.setblocking(True)
+            set_nodelay(conn)
+            player = Player(conn, addr)
+            threading.Thread(target=client_handler, args=(player, accepted_at), daemon=True).start()
+
+        if len(batch) > 1:
+            print(f"[INFO] Accepted a batch of {len(batch)} connections")
+        else:
+            print(f"[INFO] New connection from {batch[0][1]}")
+
+        if accept_error is not None:
+            if not running or server_sock.fileno() == -1:
+                break
+            print(f"[WARNING] accept() failed: {accept_error}")
+            time.sleep(ACCEPT_BACKOFF)
 
 
 # ─── Client Handler Thread ────────────────────────────────────────────────────
-def client_handler(player: Player):
+def client_handler(player: Player, accepted_at: float):
     """
+    0) Record how long the connection took to go from accept() to here.
     1) Ask the client to log in (username).
-    2) Once logged in, push them onto player_queue.
+    2) Once logged in, hand them to the lobby (or back to their table if they
+       are reconnecting mid-match).
     3) Then sit in a loop:
        • CHAT  -> broadcast immediately.
-       • In-game commands -> accept only if this player is one of the first two
-         in player_queue **and** it is currently their turn.
+       • In-game commands -> accept only if this player is one of the two
+         players at their table (or is answering a prompt). Commands are
+         queued in order, so clients may send placements and shots ahead
+         of the matching PROMPT.
        • Anything else -> polite 'wait your turn' message.
     """
-    global running, current_state
+    global running
+
+    accept_stats.record(time.monotonic() - accepted_at)
+    with t_lock:
+        connections.add(player)
 
     try:
         # ── 1.  Login / Register ────────────────────────────────────────────
@@ -91,6 +515,10 @@ def client_handler(player: Player):
             package = receive_package(player)
             if not package:
                 raise ConnectionError("Lost during login")
+            if package.get("type") == "hello":
+                answer_hello(player, package)
+                player.board_versions = {}  # Only clients that said HELLO get deltas
+                continue
 
             try:
                 cmd, username = package.get("coord").split(maxsplit=1)
@@ -98,48 +526,47 @@ def client_handler(player: Player):
                 raise ConnectionError
 
             if cmd == "REGISTER":
-                if username in all_player_logins:
+                if lobby_service.exists(username):
                     send_package(player, MessageTypes.S_MESSAGE, "USERNAME_TAKEN")
                     continue
                 send_package(player, MessageTypes.S_MESSAGE, "USERNAME_OK")
                 pin_package = receive_package(player)
                 pin = pin_package.get("coord").split()[-1]
-                all_player_logins[username] = pin
+                if not lobby_service.register(username, pin):
+                    # another connection (possibly on another worker) got there first
+                    send_package(player, MessageTypes.S_MESSAGE, "USERNAME_TAKEN")
+                    continue
                 send_package(player, MessageTypes.S_MESSAGE, "REGISTRATION_SUCCESS")
                 player.username, player.pin = username, pin
 
 
             elif cmd == "LOGIN":
-                if username not in all_player_logins:
+                if not lobby_service.exists(username):
                     send_package(player, MessageTypes.S_MESSAGE, "USER_NOT_FOUND")
                     continue
                 send_package(player, MessageTypes.S_MESSAGE, "USERNAME_OK")
                 for _ in range(3):
                     pin_package = receive_package(player)
                     pin_try = pin_package.get("coord").split()[-1]
-                    if pin_try == all_player_logins[username]:
+                    if lobby_service.check_pin(username, pin_try):
                         send_package(player, MessageTypes.S_MESSAGE, "LOGIN_SUCCESS")
                         player.username, player.pin = username, pin_try
                         break
                     send_package(player, MessageTypes.S_MESSAGE, "LOGIN_FAILURE")
                 else:
                     continue
-            
+
 
             else:
                 send_package(player, MessageTypes.S_MESSAGE, "You must either login or register before joining")
 
-        role_msg = (
-            "Waiting for your opponent…" if len(player_queue) < 2
-            else f"You are number {len(player_queue)-1} in the queue - you'll see live updates of the current game."
-        )
-        send_package(player, MessageTypes.WAITING, role_msg)
-
-
-
-        # ── 2.  Join the queue ──────────────────────────────────────────────
-        with t_lock:
-            player_queue.append(player)
+        # ── 2.  Join the lobby (ours, or another worker's with an opponent) ─
+        if hand_off_to_partner(player):
+            return
+        # From here on every send to this player goes through its writer thread
+        player.outbox = Outbox(player)
+        player.outbox.start()
+        join_lobby(player)
 
         # ── 3.  Main receive loop ───────────────────────────────────────────
         while running and player.connected:
@@ -152,29 +579,32 @@ def client_handler(player: Player):
             # --- CHAT ------------------------------------------------------
             if p_type == "chat":
                 msg = f"{player.username}: {package.get('msg')}"
-                broadcast(msg=msg, msg_type=MessageTypes.CHAT)
+                announce(msg, MessageTypes.CHAT)
+                continue
+
+            # --- RESYNC (client missed a BOARD_DELTA) ----------------------
+            if (package.get("coord") or "").startswith("RESYNC"):
+                resync_board(player, package.get("coord"))
                 continue
 
             # --- NON-CHAT (commands / coords) -----------------------------
             with t_lock:
-                actively_playing = current_state and player.username in current_state.players
-                placement_phase  = actively_playing and (
-                    current_state.board_of(player.username) is None
-                )
-                turn_phase       = current_state and current_state.current_player == player.username
+                state = player.table.state if player.table else None
+                actively_playing = state and player.username in state.players
 
-            accepting_prompt = player.my_turn       
+            accepting_prompt = player.my_turn
 
-            if not (placement_phase or turn_phase or accepting_prompt):
+            if not (actively_playing or accepting_prompt):
                 send_package(player, MessageTypes.S_MESSAGE,
                             "Please wait, it isn't your turn.")
                 continue
 
-            # It's their turn and they sent a coord
+            # They're in the match: queue the coord for the match thread
             coord = package.get("coord")
             if coord:
-                with player.msg_lock:
-                    player.latest_coord = coord
+                if not player.push_input(coord):
+                    send_package(player, MessageTypes.S_MESSAGE,
+                                 f"Too many commands queued - dropped '{coord}'.")
             else:
                 send_package(player, MessageTypes.S_MESSAGE,
                              "Invalid move payload.")
@@ -182,20 +612,336 @@ def client_handler(player: Player):
     except ConnectionError:
         print(f"[INFO] {player.username} disconnected.")
     finally:
-        player.connected = False
-        # Remove from queue if they’re still there
-        with t_lock:
-            if player in player_queue:
-                player_queue.remove(player)
-        resend_queue_pos()
+        if player.handed_off:
+            with t_lock:
+                connections.discard(player)
+            player.conn.close()     # the other worker holds its own copy of the socket
+            return
+
+        if player.outbox is not None:
+            player.outbox.close()
+        with player.msg_ready:
+            player.connected = False
+            player.msg_ready.notify_all()   # wake a match waiting on this player
+        # Remove from the lobby / their table if they're still there
+        with sched_cond:
+            table = player.table
+            # Only the spectators behind a leaving player move up
+            index = table.queue.position(player) if table else None
+            connections.discard(player)
+            _remove_player_locked(player)
+            sched_cond.notify_all()
+        if index is not None:
+            table.resend_queue_pos(max(1, index - 1))
+        publish_waiting()
+        if player.username is not None:
+            try:
+                lobby_service.set_offline(player.username, worker_id)
+            except (OSError, EOFError):
+                pass    # lobby service already gone during shutdown
         try:
             player.conn.close()
         except:
             pass
 
 
+def resync_board(player: Player, command: str):
+    """
+    'RESYNC <board id> <0|1>': the client's copy of that board view doesn't
+    match a delta it got, so send it a full snapshot. Only boards at the
+    player's table qualify, and only their own board with ships showing.
+    """
+    try:
+        _, board_id, show_ships = command.split()
+        board_id, show_ships = int(board_id), show_ships == "1"
+    except ValueError:
+        return
+    with t_lock:
+        state = player.table.state if player.table else None
+        boards = [b for b in state.boards.values() if b is not None] if state else []
+    for board in boards:
+        if board.board_id != board_id:
+            continue
+        if show_ships and state.boards.get(player.username) is not board:
+            return
+        if player.board_versions is not None:
+            player.board_versions.pop((board_id, show_ships), None)
+        _send_or_drop(player, send_board, player, board, show_ships)
+        return
+
+
+# ─── Lobby & Scheduling ──────────────────────────────────────────────────────
+def join_lobby(player: Player):
+    """
+    Called once a player has logged in. A player who is being waited on by
+    handle_connection_lost goes straight back to their seat; everyone else
+    joins the lobby and is seated by the scheduler.
+    """
+    lobby_service.set_online(player.username, worker_id)
+
+    with t_lock:
+        reconnecting = player.username in pending_reconnects
+    if not reconnecting:
+        # Sent before they are seatable so it can't race the match's first messages
+        _safe_send(player, MessageTypes.WAITING, "Waiting for your opponent…")
+
+    with sched_cond:
+        table, seat = pending_reconnects.pop(player.username, (None, None))
+        if table is not None:
+            table.seat(player, seat)
+        else:
+            player.waiting_since = time.monotonic()
+            lobby.append(player)
+        sched_cond.notify_all()
+
+    publish_waiting()
+
+def _remove_player_locked(player: Player):
+    lobby.discard(player)
+    if player.table is not None:
+        player.table.unseat(player)
+
+def _all_players_locked():
+    players = list(lobby)
+    for table in tables:
+        players.extend(table.queue)
+    return players
+
+def _take_waiting_pair_locked(donors):
+    """
+    Pop the next two players who are free to start a match: lobby players
+    first, then the next-in-line spectator of the most crowded table (which
+    is added to `donors` so its queue positions can be resent).
+    Returns None (and takes nobody) if fewer than two are available.
+    """
+    available = len(lobby) + sum(len(t.queue) - 2 for t in tables if len(t.queue) > 2)
+    if available < 2:
+        return None
+
+    pair = []
+    while len(pair) < 2:
+        if lobby:
+            pair.append(lobby.popleft())
+            continue
+        donor = max(tables, key=lambda t: len(t.queue))
+        spectator = donor.queue.head(3)[2]
+        donor.unseat(spectator)
+        donors.add(donor)
+        pair.append(spectator)
+    return pair
+
+def publish_waiting():
+    """
+    --workers mode: tell the lobby service how many of our players are sitting
+    unpaired, so another worker can send us an opponent for them.
+    """
+    if worker_id is None:
+        return
+    with t_lock:
+        # An even lobby is about to be paired locally; only an odd one out needs help
+        unpaired = len(lobby) % 2 if len(tables) < MAX_CONCURRENT_MATCHES else 0
+    try:
+        lobby_service.set_waiting(worker_id, unpaired)
+    except (OSError, EOFError):
+        pass    # lobby service already gone during shutdown
+
+def schedule_matches():
+    """
+    Start as many tables as there are free pairs and free pool slots.
+    Once every slot is busy, anyone left in the lobby is seated as a
+    spectator at the table with the shortest queue.
+    Returns after one scheduling pass; the caller loops on sched_cond.
+    """
+    started, spectating, donors = [], [], set()
+
+    with t_lock:
+        bot_due = _bot_due_in_locked() == 0
+    bot = new_bot() if bot_due else None
+
+    with t_lock:
+        while len(tables) < MAX_CONCURRENT_MATCHES:
+            pair = _take_waiting_pair_locked(donors)
+            if pair is None:
+                break
+            table = Table(*pair)
+            tables.append(table)
+            started.append(table)
+
+        # Still due after pairing? Then the lone player gets the bot
+        if bot is not None and _bot_due_in_locked() == 0:
+            table = Table(lobby.popleft(), bot)
+            tables.append(table)
+            started.append(table)
+            print(f"[INFO] Seated {bot.username} against {table.queue.head(1)[0].username}")
+            bot = None
+
+        if len(tables) >= MAX_CONCURRENT_MATCHES:
+            while lobby:
+                table = min(tables, key=lambda t: len(t.queue))
+                player = lobby.popleft()
+                table.seat(player)
+                spectating.append((player, len(table.queue) - 2))
+
+    if bot is not None:
+        retire_bot(bot)     # Not needed after all: the lone player was paired
+    publish_waiting()
+
+    for player, position in spectating:
+        _safe_send(player, MessageTypes.WAITING,
+                   f"You are number {position} in the queue - you'll see live updates of the current game.",
+                   key="queue_pos")
+
+    for table in donors:
+        table.resend_queue_pos()
+
+    for table in started:
+        match_pool.submit(run_table, table)
+
+def _bot_due_in_locked():
+    """
+    Seconds until the lone player at the front of the lobby has waited
+    bot_wait and gets a bot opponent (0 = now). None if nobody is owed a
+    bot: bots are off, the player can be paired, or every slot is busy.
+    """
+    if bot_wait is None or len(lobby) != 1 or len(tables) >= MAX_CONCURRENT_MATCHES:
+        return None
+    if any(len(t.queue) > 2 for t in tables):
+        return None     # a spectator can be moved to play them
+    waited = time.monotonic() - lobby.head(1)[0].waiting_since
+    return max(0.0, bot_wait - waited)
+
+def new_bot():
+    """
+    A BotPlayer under a fresh name, reserved so no human can register it
+    while the bot plays. retire_bot() gives the name back.
+    """
+    while True:
+        username = f"{bot_level.capitalize()}Bot-{next(bot_ids)}"
+        if worker_id is not None:
+            username += f"-w{worker_id}"
+        if lobby_service.reserve_bot(username):
+            return BotPlayer(username, bot_level)
+
+def retire_bot(bot):
+    try:
+        lobby_service.release_bot(bot.username)
+    except (OSError, EOFError):
+        pass    # lobby service already gone during shutdown
+
+def _scheduling_needed_locked():
+    if not running:
+        return True
+    if _bot_due_in_locked() == 0:
+        return True
+    if len(tables) < MAX_CONCURRENT_MATCHES:
+        spare = sum(len(t.queue) - 2 for t in tables if len(t.queue) > 2)
+        return len(lobby) + spare >= 2
+    return bool(lobby)
+
+def match_scheduler():
+    """
+    Re-run the scheduler whenever the lobby or a table changes in a way that
+    lets it seat someone. Sleeps on sched_cond otherwise.
+    """
+    while running:
+        schedule_matches()
+        with sched_cond:
+            # Re-arm the timeout on every wake-up: a new lone player may be owed a bot sooner
+            while not _scheduling_needed_locked():
+                sched_cond.wait(_bot_due_in_locked())
+
+
+# ─── Worker Hand-off ─────────────────────────────────────────────────────────
+def _handoff_address(worker):
+    # Linux abstract-namespace socket, unique to this --workers group
+    return f"\0battleships-{os.getppid()}-worker-{worker}"
+
+def hand_off_to_partner(player: Player) -> bool:
+    """
+    --workers mode only. If our lobby has nobody for this freshly logged-in
+    player but another worker has someone waiting, pass the socket (and the
+    session state) to that worker over a Unix socket so the two can be
+    matched there. Returns True if the player now belongs to another worker.
+    Only done straight after login, when no other thread is using the socket.
+    """
+    if worker_id is None:
+        return False
+    with t_lock:
+        if lobby or player.username in pending_reconnects:
+            return False
+
+    target = lobby_service.claim_partner(worker_id)
+    if target is None:
+        return False
+
+    state = json.dumps({
+        "addr": list(player.addr), "username": player.username, "pin": player.pin,
+        "seq": player.seq, "recv_seq": player.recv_seq, "protocol": player.protocol,
+        "codec": player.codec, "compression": player.compression,
+        # Anything the client sent that we read but haven't decoded yet
+        "pending": base64.b64encode(player.frame_reader.leftover()).decode(),
+    }).encode()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as link:
+            link.connect(_handoff_address(target))
+            socket.send_fds(link, [state], [player.conn.fileno()])
+    except OSError as e:
+        print(f"[WARNING] Hand-off of {player.username} to worker {target} failed: {e}")
+        return False
+
+    player.handed_off = True
+    print(f"[INFO] Handed {player.username} to worker {target}, which has an opponent waiting")
+    return True
+
+def handoff_listener_thread(listener):
+    """
+    Receive players handed to us by other workers and give each a client
+    handler that starts from the lobby step (they are already logged in).
+    """
+    while running:
+        try:
+            link, _ = listener.accept()
+        except OSError:
+            break
+        with link:
+            try:
+                state, fds, _, _ = socket.recv_fds(link, 4096, 1)
+            except OSError:
+                continue
+        if not fds:
+            continue
+
+        state = json.loads(state)
+        conn = socket.socket(fileno=fds[0])
+        player = Player(conn, tuple(state["addr"]), base64.b64decode(state["pending"]))
+        player.username, player.pin = state["username"], state["pin"]
+        player.seq, player.recv_seq = state["seq"], state["recv_seq"]
+        player.protocol = state["protocol"]
+        if player.protocol != LEGACY_PROTOCOL:
+            player.board_versions = {}
+        player.codec, player.compression = state["codec"], state["compression"]
+        threading.Thread(target=client_handler, args=(player, time.monotonic()), daemon=True).start()
+        print(f"[INFO] Took over {player.username} from another worker")
+
+def relay_thread():
+    """
+    --workers mode only. Deliver lobby-wide messages published by the other
+    workers to our own players. Our own messages were delivered locally
+    when they were announced, so they are skipped here.
+    """
+    cursor = None
+    while running:
+        try:
+            cursor, entries = lobby_service.messages_after(cursor, RELAY_POLL)
+        except (OSError, EOFError):
+            break       # Lobby service gone, we're shutting down
+        for _, origin, msg_type, msg in entries:
+            if origin != worker_id:
+                broadcast(msg=msg, msg_type=msg_type)
+
+
 # ─── Match & Rematch Logic ───────────────────────────────────────────────────
-def start_match(p1: Player, p2: Player, current_state: GameState) -> str:
+def start_match(p1: Player, p2: Player, table: Table) -> str:
     """
     Start a single match between p1 and p2. Returns 'done' or 'early_exit'.
     """
@@ -203,85 +949,189 @@ def start_match(p1: Player, p2: Player, current_state: GameState) -> str:
     game_starting_message = f"Starting match between {p1.username} and {p2.username}"
 
     print("[INFO] " + game_starting_message)
-    broadcast(msg=game_starting_message, msg_type=MessageTypes.S_MESSAGE)
+    table.broadcast(msg=game_starting_message, msg_type=MessageTypes.S_MESSAGE)
 
     time.sleep(2)
 
-    return run_two_player_game_online(p1, p2, current_state, notify_spectators, broadcast)
+    return run_two_player_game_online(p1, p2, table.state, table.notify_spectators, table.broadcast)
 
-def handle_connection_lost(p1, p2):
+def run_table(table: Table):
+    """
+    Worker-pool task: keep playing matches at this table while it has two
+    players. Winner stays at the front, loser goes to the back of the table's
+    queue. When the table runs dry its remaining players return to the lobby.
+    """
+    global matches_completed
+
+    try:
+        while running:
+            with t_lock:
+                if len(table.queue) < 2:
+                    break
+                p1, p2 = table.queue.head(2)
+
+            if (table.state is None) or (table.state.players != {p1.username, p2.username}): # (no game) OR (different players)
+                table.state = GameState(p1, p2)
+                # Don't let leftovers pipelined during the last game leak into this one
+                for player in (p1, p2):
+                    player.clear_inputs()
+
+            # Play a match
+            result, winner = start_match(p1, p2, table)
+            conn_lost = (result == "connection_lost")
+            conn_found = conn_lost and handle_connection_lost(p1, p2, table)
+
+            if not conn_found:
+                table.state = None
+
+            if conn_lost:
+                continue
+
+            # this logic will execute if the game successfully finishes
+            loser = p2 if winner is p1 else p1
+            with t_lock:
+                matches_completed += 1
+                for player in (p1, p2):
+                    table.unseat(player)
+
+                table.seat(winner, 0)
+                # A bot that loses makes way for anyone waiting to play
+                retiring = loser.is_bot and len(table.queue) > 1
+                if not retiring:
+                    table.seat(loser)
+                next_up = table.queue.head(2)
+            if retiring:
+                retire_bot(loser)
+
+            print(f"[INFO] {winner.username} beat {loser.username} "
+                  f"({matches_completed} matches, {_matches_per_hour():.0f}/hour)")
+
+            if len(next_up) == 2:
+                table.broadcast(msg=f"A new game will start shortly between {next_up[0].username} and {next_up[1].username}", msg_type=MessageTypes.WAITING)
+            table.resend_queue_pos()
+            time.sleep(3)
+
+    except Exception as e:
+        print(f"[ERROR] Table crashed: {e}")
+    finally:
+        close_table(table)
+
+def close_table(table: Table):
+    """
+    Free the table's pool slot and send whoever is left back to the lobby,
+    keeping their relative order.
+    """
+    with sched_cond:
+        if table in tables:
+            tables.remove(table)
+        leftovers = list(table.queue)
+        for player in leftovers:
+            table.unseat(player)
+        # Bots only backfill a match; they don't wait in the lobby
+        returning = [p for p in leftovers if p.connected and not p.is_bot]
+        now = time.monotonic()
+        for player in returning:
+            player.waiting_since = now
+        lobby.extendleft(returning)
+        sched_cond.notify_all()
+    for player in leftovers:
+        if player.is_bot:
+            retire_bot(player)
+
+def handle_connection_lost(p1, p2, table: Table):
     """
     Probes both p1 and p2 to find who left (loser) and who stayed (winner).
-    Over the next 30 seconds, once every second (roughly), we look through the player queue.
-    If the player who left is in the queue, we insert them into their spot, and return true.
-    If they are not found in time, the queue remains unchanged and we return false.
+    The loser's seat is held for 15 seconds: if they log back in within that
+    window join_lobby() puts them straight back into it and we return True.
+    If they are not found in time, the table's queue remains unchanged and we
+    return False.
     """
     winner, loser = determine_winner_and_loser(p1, p2)
 
-    broadcast(
-        msg=f"{loser.username} has disconnected, they have 15 seconds to reconnect...", 
+    table.broadcast(
+        msg=f"{loser.username} has disconnected, they have 15 seconds to reconnect...",
         msg_type=MessageTypes.WAITING
     )
 
-    with t_lock:
-        if loser in player_queue:
-            player_queue.remove(loser)
-
-    for _ in range(15):
-        time.sleep(1)
-
-        rejoined_player = None
-        insert_at = 0 if loser is p1 else 1     
-
-        with t_lock:
-            for idx, pl in enumerate(player_queue):
-                if pl.username == loser.username:
-                    rejoined_player = player_queue.pop(idx)
-                    player_queue.insert(insert_at, rejoined_player)
-                    break
+    with sched_cond:
+        table.unseat(loser)
+        insert_at = 0 if loser is p1 else 1
+        pending_reconnects[loser.username] = (table, insert_at)
+        sched_cond.wait_for(
+            lambda: not running or loser.username not in pending_reconnects,
+            timeout=15
+        )
+        rejoined = loser.username not in pending_reconnects
+        if not rejoined:
+            pending_reconnects.pop(loser.username, None)
+
+    if rejoined:
+        table.broadcast(msg=f"{loser.username} has reconnected! "
+                            "Resuming game from where it left off...",
+                        msg_type=MessageTypes.S_MESSAGE)
+        return True
 
-        if rejoined_player:
-            broadcast(msg=f"{rejoined_player.username} has reconnected! "
-                          "Resuming game from where it left off...",
-                      msg_type=MessageTypes.S_MESSAGE)
-            return True
-        
-    broadcast(msg=f"{loser.username} failed to reconnect in time – starting a new game…",
-              msg_type=MessageTypes.S_MESSAGE)
+    table.broadcast(msg=f"{loser.username} failed to reconnect in time – starting a new game…",
+                    msg_type=MessageTypes.S_MESSAGE)
     return False
 
 def disconnect_player(player: Player, message: str = "You are being disconnected..."):
     with t_lock:
-        if player in player_queue:
-            player_queue.remove(player)
+        _remove_player_locked(player)
     try:
         send_package(player, MessageTypes.SHUTDOWN, message)
+        if player.outbox is not None:
+            player.outbox.close(flush=True)
+            player.outbox.join(timeout=1)
         player.conn.close()
     except:
         pass # doesn't really matter if we can't reach the client to shut them down
 
+def _matches_per_hour():
+    if started_at is None:
+        return 0.0
+    elapsed = time.monotonic() - started_at
+    return matches_completed * 3600 / elapsed if elapsed > 0 else 0.0
+
 
 # ─── Announcements ─────────────────────────────────────────────────────
-def _safe_send(player, *args):
+def _safe_send(player, type, *args, key=None):
+    return _send_or_drop(player, send_package, player, type, *args, key=key)
+
+def _safe_send_prepared(player, type, payload, key=None):
+    return _send_or_drop(player, send_prepared, player, type, payload, key=key)
+
+def _send_or_drop(player, send, *args, **kwargs):
     try:
-        send_package(player, *args)
+        send(*args, **kwargs)
         return True
     except ConnectionError:
         with t_lock:
-            if player in player_queue:
-                player_queue.remove(player)
+            _remove_player_locked(player)
         print(f"[INFO] Removed unreachable player {player.username}")
         return False
-    
+
+def _fan_out(targets, msg, msg_type, board, show_ships, board_key=None):
+    # Render and serialise once (boards once per distinct delta); only seq,
+    # encryption and framing are per player, done later in each writer thread
+    board_updates = {}
+    msg_payload = build_payload(msg_type, msg) if msg is not None else None
+    for p in list(targets):
+        if board is not None:
+            _send_or_drop(p, send_board, p, board, show_ships, key=board_key, shared=board_updates)
+        if msg_payload is not None:
+            _safe_send_prepared(p, msg_type, msg_payload)
+
 def broadcast(
         *,
         msg=None,
         msg_type=MessageTypes.S_MESSAGE,
         board=None,
-        show_ships=False,
-        spectators_only=False):
+        show_ships=False):
     """
-    Fan-out a message (and optionally a board) to the desired audience.
+    Fan-out a message (and optionally a board) to every logged-in player,
+    whether they are in the lobby or at a table. Match-specific updates go
+    through Table.broadcast instead.
 
     Parameters
     ----------
@@ -290,118 +1140,77 @@ def broadcast(
     board / show_ships
                      - If board is given we send a MessageTypes.BOARD first,
                        using the supplied `show_ships` flag.
-    spectators_only  - If True we skip the first two queue slots.
     """
     with t_lock:
-        targets = player_queue[2:] if spectators_only else player_queue[:]
+        targets = _all_players_locked()
 
-    for p in list(targets):
-        if board is not None:
-            _safe_send(p, MessageTypes.BOARD, board, show_ships)
-        if msg is not None:
-            _safe_send(p, msg_type, msg)
+    _fan_out(targets, msg, msg_type, board, show_ships)
 
-def notify_spectators(defender_board, result, ships_sunk, attacker):
+def announce(msg, msg_type=MessageTypes.S_MESSAGE):
     """
-    Computes the right message(s) then delegates to broadcast().
+    Like broadcast(), but in --workers mode the message also reaches the
+    players of every other worker, by way of the lobby service's relay.
     """
-    if ships_sunk:
-        broadcast(
-            msg=f"{attacker.username} has won!",
-            msg_type=MessageTypes.S_MESSAGE,
-            spectators_only=True
-        )
-        resend_queue_pos()
-        return
-
-    if result == "timeout":
-        text = f"{attacker.username} timed out. They lose!"
-        resend_queue_pos()
-    else:
-        verb = {"hit": "HIT", "miss": "MISSED", "already_shot": "ALREADY SHOT"}[result]
-        text = f"{attacker.username} has {verb} the defender."
+    broadcast(msg=msg, msg_type=msg_type)
+    if worker_id is not None:
+        try:
+            lobby_service.publish(worker_id, msg_type, msg)
+        except (OSError, EOFError) as e:
+            print(f"[WARNING] Could not relay a message to the other workers: {e}")
 
-    # message + updated defender board
-    broadcast(msg=text,
-              msg_type=MessageTypes.S_MESSAGE,
-              board=defender_board,
-              show_ships=False,
-              spectators_only=True)
 
+# ─── Main Server Loop ─────────────────────────────────────────────────────────
+def main(host=HOST, port=PORT, backlog=ACCEPT_BACKLOG, lobby_address=None, worker=None,
+         wait_for_bot=BOT_WAIT, bot_strategy=BOT_LEVEL):
+    """
+    Run one server. With `lobby_address` this is worker number `worker` of a
+    --workers group: it shares the port via SO_REUSEPORT and uses the shared
+    lobby service at that address instead of a private one. A player left
+    alone in the lobby for `wait_for_bot` seconds (None = never) is matched
+    against a `bot_strategy` bot.
+    """
+    global running, started_at, lobby_service, worker_id, bot_wait, bot_level
 
-def resend_queue_pos():
-    with t_lock:
-        spectators = list(player_queue[2:])
+    bot_wait, bot_level = wait_for_bot, bot_strategy
 
-    position = 1
-    for spec in spectators:
-        if _safe_send(
-            spec,
-            MessageTypes.WAITING,
-            f"You are number {position} in the queue"
-        ):
-            position += 1
+    # Set key
+    derive_key('we_love_cs')
 
+    # Start filling the AUTO placement pool before anyone can ask for it
+    fleet_pool(GAME_SHIPS)
 
-# ─── Main Server Loop ─────────────────────────────────────────────────────────
-def main():
-    global running, current_state
+    if lobby_address is not None:
+        manager = LobbyManager(address=lobby_address)
+        manager.connect()
+        lobby_service = manager.lobby()
+        worker_id = worker
 
-    # Set key
-    derive_key('we_love_cs')
+        handoff_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        handoff_sock.bind(_handoff_address(worker_id))
+        handoff_sock.listen()
 
     # Set up listening socket
     server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server_sock.bind(( '127.0.0.1', 5000 ))
-    server_sock.listen()
+    if lobby_address is not None:
+        # Every worker binds its own socket; the kernel spreads connections across them
+        server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server_sock.bind(( host, port ))
+    server_sock.listen(backlog)
 
     running = True
-    print("[INFO] Server started, listening for connections...")
+    started_at = time.monotonic()
+    label = "Server" if worker_id is None else f"Worker {worker_id} (pid {os.getpid()})"
+    print(f"[INFO] {label} started, listening for connections (up to {MAX_CONCURRENT_MATCHES} concurrent matches)...")
 
     # Start helper threads
     threading.Thread(target=receiver_thread, args=(server_sock,), daemon=True).start()
-    threading.Thread(target=queue_maintainer_thread, daemon=True).start()
+    if worker_id is not None:
+        threading.Thread(target=handoff_listener_thread, args=(handoff_sock,), daemon=True).start()
+        threading.Thread(target=relay_thread, daemon=True).start()
 
     try:
-        while running:
-            with t_lock:
-                if len(player_queue) >= 2:
-                    p1, p2 = player_queue[0], player_queue[1]
-                else:
-                    p1 = p2 = None
-
-            if not (p1 and p2) or (p1.username == None or p2.username == None):
-                time.sleep(1)
-                continue
-
-            if (current_state is None) or (current_state.players != {p1.username, p2.username}): # (no game) OR (different players)
-                current_state = GameState(p1, p2)
-
-            # Play a match
-            result, winner = start_match(p1, p2, current_state)
-            conn_lost = (result == "connection_lost")
-            conn_found = conn_lost and handle_connection_lost(p1, p2)
-
-            if not conn_found:
-                current_state = None
-
-            if conn_lost:
-                continue
-
-            # this logic will execute if the game successfully finishes
-            loser = p2 if winner is p1 else p1
-            with t_lock:
-                for player in (p1, p2):
-                    if player in player_queue:
-                        player_queue.remove(player)
-
-                player_queue.insert(0, winner)
-                player_queue.append(loser)
-
-            broadcast(msg=f"A new game will start shortly between {player_queue[0].username} and {player_queue[1].username}", msg_type=MessageTypes.WAITING)
-            resend_queue_pos()
-            time.sleep(3)
+        match_scheduler()
 
     except KeyboardInterrupt:
         print("[INFO] Ctrl+C received. Shutting down...")
@@ -409,20 +1218,89 @@ def main():
 
         # Notify all waiting/incoming players
         broadcast(msg="Server is shutting down.", msg_type=MessageTypes.SHUTDOWN)
-        # Also notify those not yet in queue
+        # Also notify those still logging in
         with t_lock:
-            for conn, addr in incoming_connections:
+            logging_in = [p for p in connections if p.username is None]
+        for player in logging_in:
+            try:
+                send_package(player, MessageTypes.SHUTDOWN, "Server is shutting down.")
+            except:
+                pass
+
+        # Give writers a moment to deliver the notice before the sockets go
+        with t_lock:
+            outboxes = [p.outbox for p in connections if p.outbox is not None]
+        for outbox in outboxes:
+            outbox.close(flush=True)
+        deadline = time.monotonic() + 2
+        for outbox in outboxes:
+            outbox.join(timeout=max(0, deadline - time.monotonic()))
+
+        with t_lock:
+            # Unblock handler and match threads still waiting on these sockets
+            for player in connections:
                 try:
-                    temp_p = Player(conn, addr)
-                    send_package(temp_p, MessageTypes.SHUTDOWN, "Server is shutting down.")
-                    conn.close()
-                except:
+                    player.conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
                     pass
+            sched_cond.notify_all()
 
     finally:
+        match_pool.shutdown(wait=False, cancel_futures=True)
         server_sock.close()
+        print(f"[INFO] Accept-to-handler latency: {accept_stats.summary()}")
+        print(f"[INFO] Compression: {compression_stats.summary()}")
         print("[INFO] Server socket closed. Exiting.")
 
 
+def run_workers(count, host=HOST, port=PORT, backlog=ACCEPT_BACKLOG,
+                wait_for_bot=BOT_WAIT, bot_strategy=BOT_LEVEL):
+    """
+    Fork `count` worker processes that all listen on the same port and share
+    one LobbyService hosted by a manager process. Ctrl+C reaches every worker
+    (same process group) and each shuts down its own clients.
+    """
+    manager = LobbyManager()
+    # The manager must outlive the workers' shutdown, so it ignores Ctrl+C
+    manager.start(initializer=signal.signal, initargs=(signal.SIGINT, signal.SIG_IGN))
+    print(f"[INFO] Lobby service running in pid {manager._process.pid}, starting {count} workers...")
+
+    workers = [
+        multiprocessing.Process(target=main, args=(host, port, backlog, manager.address, i,
+                                                   wait_for_bot, bot_strategy),
+                                name=f"worker-{i}")
+        for i in range(count)
+    ]
+    for w in workers:
+        w.start()
+
+    try:
+        for w in workers:
+            w.join()
+    except KeyboardInterrupt:
+        print(f"[INFO] Players online per worker: {manager.lobby().online_per_worker()}")
+        for w in workers:
+            w.join()
+    finally:
+        manager.shutdown()
+        print("[INFO] All workers stopped.")
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Battleships server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--backlog", type=int, default=ACCEPT_BACKLOG,
+                        help="listen() backlog for pending connections")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of server processes sharing the port (SO_REUSEPORT)")
+    parser.add_argument("--bot-wait", type=float, default=BOT_WAIT,
+                        help="seconds a lone player waits before playing a bot (negative: never)")
+    parser.add_argument("--bot-level", choices=BOT_LEVELS, default=BOT_LEVEL,
+                        help="strategy the bot plays")
+    args = parser.parse_args()
+    wait_for_bot = args.bot_wait if args.bot_wait >= 0 else None
+    if args.workers > 1:
+        run_workers(args.workers, args.host, args.port, args.backlog, wait_for_bot, args.bot_level)
+    else:
+        main(args.host, args.port, args.backlog, wait_for_bot=wait_for_bot, bot_strategy=args.bot_level)
@@ -0,0 +1,277 @@
+"""
+simulate.py
+
+Batched Battleship simulator. Thousands of games are held as NumPy arrays
+(one row per game, one column per cell) and every step fires one shot in
+each unfinished game at once, so strategies can be compared - and the game
+rules regression-tested against battleship.Board - over millions of games.
+
+Uses the same board size and fleet as battleship.py (BOARD_SIZE, SHIPS).
+
+    python3 simulate.py --games 1000000 --strategy hunt --check 200
+"""
+
+import time
+import argparse
+import numpy as np
+from battleship import Board, BOARD_SIZE, SHIPS
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+BATCH_SIZE = 50_000         # Games simulated together; bounds memory use
+
+# Shot outcomes as recorded per step
+MISS, HIT, SUNK = 0, 1, 2
+
+
+# ─── Fleet Placement ───────────────────────────────────────────────────────────
+def random_fleets(games, rng, size=BOARD_SIZE, ships=SHIPS):
+    """
+    Place `ships` on `games` boards at once. Returns an int8 array of shape
+    (games, size * size): the index into `ships` of the ship on each cell, or
+    -1 for water. Each ship is drawn uniformly from its legal placements (the
+    same set as fleets.placement_table) and only the boards where it collides
+    redraw it. That is fleets.random_fleet's ship-by-ship fallback rather than
+    its whole-fleet redraw, so the fleets are close to, but not exactly, the
+    uniform ones the server's FleetPool hands out for AUTO placement.
+    """
+    ship_id = np.full((games, size * size), -1, dtype=np.int8)
+
+    for k, (_, length) in enumerate(ships):
+        pending = np.arange(games)
+        steps = np.arange(length)
+        while pending.size:
+            n = pending.size
+            vertical = rng.integers(0, 2, n).astype(bool)
+            # Pick the start so the ship fits: rows limited when vertical, cols when horizontal
+            row = np.where(vertical, rng.integers(0, size - length + 1, n), rng.integers(0, size, n))
+            col = np.where(vertical, rng.integers(0, size, n), rng.integers(0, size - length + 1, n))
+            stride = np.where(vertical, size, 1)
+            cells = (row * size + col)[:, None] + stride[:, None] * steps
+
+            free = (ship_id[pending[:, None], cells] == -1).all(axis=1)
+            placed = pending[free]
+            ship_id[placed[:, None], cells[free]] = k
+            pending = pending[~free]
+
+    return ship_id
+
+
+# ─── Strategies ────────────────────────────────────────────────────────────────
+# A strategy gets the live games' `shots` and `open_hits` (hits on ships not
+# yet sunk), both bool (games, cells), plus the board size and the rng, and
+# returns the flat cell index to fire at in each game. Cells already shot
+# must never be chosen.
+
+def _pick(shots, preference, rng):
+    """Uniformly random cell among the unshot ones with the lowest preference."""
+    score = rng.random(shots.shape) + preference
+    score[shots] = np.inf
+    return score.argmin(axis=1)
+
+def random_strategy(shots, open_hits, size, rng):
+    return _pick(shots, 0, rng)
+
+def _neighbours(mask, size):
+    grid = mask.reshape(-1, size, size)
+    near = np.zeros_like(grid)
+    near[:, 1:, :] |= grid[:, :-1, :]
+    near[:, :-1, :] |= grid[:, 1:, :]
+    near[:, :, 1:] |= grid[:, :, :-1]
+    near[:, :, :-1] |= grid[:, :, 1:]
+    return near.reshape(mask.shape)
+
+def hunt_strategy(shots, open_hits, size, rng):
+    """Hunt/target: fire next to a hit on a ship still afloat, else at random."""
+    targets = _neighbours(open_hits, size) & ~shots
+    return _pick(shots, np.where(targets, 0.0, 2.0), rng)
+
+def parity_strategy(shots, open_hits, size, rng):
+    """Hunt/target, but hunting only on a checkerboard (no ship is shorter than 2)."""
+    targets = _neighbours(open_hits, size) & ~shots
+    cells = np.arange(size * size)
+    off_parity = ((cells // size + cells % size) % 2).astype(float)
+    return _pick(shots, np.where(targets, 0.0, 2.0 + off_parity), rng)
+
+STRATEGIES = {
+    "random": random_strategy,
+    "hunt": hunt_strategy,
+    "parity": parity_strategy,
+}
+
+
+# ─── Simulation ────────────────────────────────────────────────────────────────
+def simulate_batch(games, strategy, rng, size=BOARD_SIZE, ships=SHIPS, record=False):
+    """
+    Play `games` games to the end with `strategy` (a STRATEGIES value).
+    Returns a dict with per-game `shots_to_win` (int16 array) and, with
+    `record`, the placements (`ship_id`), the shot sequence per game
+    (`shot_log`) and each shot's outcome (`outcome_log`: MISS/HIT/SUNK).
+    """
+    cells = size * size
+    lengths = np.array([length for _, length in ships], dtype=np.int16)
+
+    ship_id = random_fleets(games, rng, size, ships)
+    shots = np.zeros((games, cells), dtype=bool)
+    open_hits = np.zeros((games, cells), dtype=bool)
+    ship_hits = np.zeros((games, len(ships)), dtype=np.int16)
+    afloat = np.full(games, lengths.sum(), dtype=np.int32)
+    shots_to_win = np.zeros(games, dtype=np.int16)
+    if record:
+        shot_log = np.full((games, cells), -1, dtype=np.int16)
+        outcome_log = np.full((games, cells), -1, dtype=np.int8)
+
+    live = np.arange(games)
+    for step in range(cells):
+        if not live.size:
+            break
+        target = strategy(shots[live], open_hits[live], size, rng)
+        if (shots[live, target]).any():
+            raise RuntimeError("strategy fired at a cell it had already shot")
+        shots[live, target] = True
+
+        owner = ship_id[live, target]
+        hit = owner >= 0
+        hit_games, hit_ships = live[hit], owner[hit]
+        open_hits[hit_games, target[hit]] = True
+        ship_hits[hit_games, hit_ships] += 1
+        afloat[hit_games] -= 1
+
+        # A ship sinks when every one of its cells has been hit
+        sunk = ship_hits[hit_games, hit_ships] == lengths[hit_ships]
+        sunk_games, sunk_ships = hit_games[sunk], hit_ships[sunk]
+        open_hits[sunk_games] &= ship_id[sunk_games] != sunk_ships[:, None]
+
+        if record:
+            outcome = np.where(hit, HIT, MISS).astype(np.int8)
+            outcome[np.flatnonzero(hit)[sunk]] = SUNK
+            shot_log[live, step] = target
+            outcome_log[live, step] = outcome
+
+        won = afloat[live] == 0
+        shots_to_win[live[won]] = step + 1
+        live = live[~won]
+
+    result = {"shots_to_win": shots_to_win}
+    if record:
+        result.update(ship_id=ship_id, shot_log=shot_log, outcome_log=outcome_log)
+    return result
+
+def simulate(games, strategy="hunt", batch_size=BATCH_SIZE, seed=None):
+    """
+    Play `games` games in batches of `batch_size` and summarise them:
+    shots-to-win distribution and throughput. Returns a dict.
+    """
+    rng = np.random.default_rng(seed)
+    play = STRATEGIES[strategy]
+    counts = np.zeros(BOARD_SIZE * BOARD_SIZE + 1, dtype=np.int64)
+
+    start = time.perf_counter()
+    done = 0
+    while done < games:
+        batch = min(batch_size, games - done)
+        shots_to_win = simulate_batch(batch, play, rng)["shots_to_win"]
+        counts += np.bincount(shots_to_win, minlength=counts.size)
+        done += batch
+    elapsed = time.perf_counter() - start
+
+    return summarise(counts, elapsed, strategy)
+
+def summarise(counts, elapsed, strategy):
+    """
+    Summary dict from a histogram of shots-to-win (index = shots). With no
+    games in it the shot statistics are None.
+    """
+    games = int(counts.sum())
+    cumulative = np.cumsum(counts)
+    def percentile(pct):
+        return int(np.searchsorted(cumulative, games * pct / 100)) if games else None
+    shots = np.arange(counts.size)
+    played = shots[counts > 0]
+    return {
+        "strategy": strategy,
+        "games": games,
+        "seconds": round(elapsed, 3),
+        "games_per_sec": round(games / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_shots": round(float((shots * counts).sum() / games), 2) if games else None,
+        "min_shots": int(played.min()) if games else None,
+        "p50_shots": percentile(50),
+        "p90_shots": percentile(90),
+        "p99_shots": percentile(99),
+        "max_shots": int(played.max()) if games else None,
+        "histogram": {int(s): int(c) for s, c in zip(shots, counts) if c},
+    }
+
+
+# ─── Rule Check ────────────────────────────────────────────────────────────────
+def _fleet_from_ship_id(row, size, ships):
+    """(name, row, col, length, orientation) per ship from one ship_id row."""
+    fleet = []
+    for k, (name, length) in enumerate(ships):
+        cells = np.flatnonzero(row == k)
+        r, c = divmod(int(cells[0]), size)
+        vertical = length > 1 and cells[1] - cells[0] == size
+        fleet.append((name, r, c, length, 1 if vertical else 0))
+    return fleet
+
+def check_against_board(games, strategy="hunt", seed=None, size=BOARD_SIZE, ships=SHIPS):
+    """
+    Replay `games` simulated games through battleship.Board - same fleets,
+    same shots - and check every shot's outcome and the game-over step agree.
+    Returns the number of games that disagreed (0 means the rules match).
+    """
+    rng = np.random.default_rng(seed)
+    run = simulate_batch(games, STRATEGIES[strategy], rng, size, ships, record=True)
+    mismatches = 0
+
+    for g in range(games):
+        board = Board(size)
+        for name, r, c, length, orientation in _fleet_from_ship_id(run["ship_id"][g], size, ships):
+            board.add_ship(name, r, c, length, orientation)
+
+        ok = True
+        for step in range(int(run["shots_to_win"][g])):
+            r, c = divmod(int(run["shot_log"][g, step]), size)
+            result, sunk_name = board.fire_at(r, c)
+            expected = run["outcome_log"][g, step]
+            got = SUNK if sunk_name else HIT if result == "hit" else MISS
+            over = board.all_ships_sunk()
+            if got != expected or result == "already_shot" or over != (step + 1 == run["shots_to_win"][g]):
+                ok = False
+                break
+        mismatches += not ok
+
+    return mismatches
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Batched Battleship simulator")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="hunt")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE,
+                        help="games simulated together")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="also replay N games through battleship.Board and compare")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    if args.batch < 1:
+        parser.error("--batch must be at least 1")
+
+    summary = simulate(args.games, args.strategy, args.batch, args.seed)
+    print(f"[INFO] {summary['games']} games ({summary['strategy']}) in {summary['seconds']}s "
+          f"- {summary['games_per_sec']:.0f} games/sec")
+    print(f"[INFO] Shots to win: mean {summary['mean_shots']}, min {summary['min_shots']}, "
+          f"p50 {summary['p50_shots']}, p90 {summary['p90_shots']}, "
+          f"p99 {summary['p99_shots']}, max {summary['max_shots']}")
+
+    if args.check:
+        mismatches = check_against_board(args.check, args.strategy, args.seed)
+        if mismatches:
+            print(f"[WARNING] {mismatches}/{args.check} games disagree with battleship.Board")
+        else:
+            print(f"[INFO] {args.check} replayed games agree with battleship.Board")
+
+if __name__ == "__main__":
+    main()
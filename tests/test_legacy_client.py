@@ -0,0 +1,123 @@
+"""
+A client speaking the original, pre-HELLO protocol must still be able to
+log in and play against both servers: one seq counter for both directions,
+JSON bodies, boards as text. The client here is written against that
+protocol directly rather than through utils.py, so changes to utils.py
+can't quietly change what it speaks.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import socket
+import struct
+import signal
+import hashlib
+import subprocess
+
+import pytest
+from Crypto.Cipher import AES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEY = hashlib.sha256(b"we_love_cs").digest()
+COMMAND = 0
+
+
+class LegacyClient:
+    """The framing, encryption and seq counting of the original utils.py."""
+    def __init__(self, port):
+        self.conn = socket.create_connection(("127.0.0.1", port), timeout=10)
+        self.seq = 0
+
+    def send(self, text):
+        cipher = AES.new(KEY, AES.MODE_CTR)
+        body = cipher.encrypt(json.dumps({
+            "data": {"type": "command", "coord": text}, "seq": self.seq}).encode())
+        frame = struct.pack(f"HHI8s{len(body)}s", COMMAND, len(body), 0, cipher.nonce, body)
+        checksum = zlib.crc32(frame)
+        self.conn.sendall(struct.pack(f"HHI8s{len(body)}s", COMMAND, len(body), checksum,
+                                      cipher.nonce, body))
+        self.seq += 1
+
+    def _recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            block = self.conn.recv(size - len(data))
+            if not block:
+                raise ConnectionError("Connection closed.")
+            data += block
+        return data
+
+    def receive(self):
+        type, length, checksum, nonce = struct.unpack("HHI8s", self._recv_exact(16))
+        body = self._recv_exact(length)
+        assert type < 8, f"message type {type} isn't in the original protocol"
+        assert checksum == zlib.crc32(struct.pack(f"HHI8s{length}s", type, length, 0, nonce, body))
+        payload = json.loads(AES.new(KEY, AES.MODE_CTR, nonce=nonce).decrypt(body))
+        assert payload["seq"] == self.seq, f"bad seq: expected {self.seq} got {payload['seq']}"
+        self.seq += 1
+        return payload["data"]
+
+    def receive_until(self, predicate):
+        while True:
+            data = self.receive()
+            if predicate(data):
+                return data
+
+    def close(self):
+        self.conn.close()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(params=["server.py", "async_server.py"])
+def server_port(request):
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, request.param, "--port", str(port), "--bot-wait", "0"],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or proc.poll() is not None:
+                proc.kill()
+                pytest.fail(f"{request.param} did not start")
+            time.sleep(0.1)
+    yield port
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def test_legacy_client_registers_and_plays(server_port):
+    client = LegacyClient(server_port)
+    try:
+        client.send(f"REGISTER legacy{os.getpid()}")
+        assert client.receive()["msg"] == "USERNAME_OK"
+        client.send("SETPIN 1234")
+        assert client.receive()["msg"] == "REGISTRATION_SUCCESS"
+
+        # --bot-wait 0: a bot is seated against us straight away
+        client.receive_until(lambda d: d["type"] == "prompt" and "orientation" in d["msg"])
+        client.send("AUTO")
+        board = client.receive_until(lambda d: d["type"] == "board")
+        assert set(board) == {"type", "ships", "data"}
+        assert board["data"].splitlines()[1].startswith("A ")
+
+        client.receive_until(lambda d: d["type"] == "prompt")
+        client.send("A1")
+        reply = client.receive_until(lambda d: d["type"] in ("prompt", "result"))
+        assert reply["msg"]
+    finally:
+        client.close()
@@ -0,0 +1,170 @@
+"""
+tournament.py
+
+Headless bot-vs-bot round robins, to rank targeting strategies (bots.py) and
+placement strategies (fleets.PLACEMENTS) against each other. No sockets:
+each game is two boards and two strategies taking turns to fire_at().
+
+Every pairing plays the same number of games, split into chunks that are
+spread over a ProcessPoolExecutor. Each chunk seeds its own random.Random
+from (--seed, the two competitors, chunk), so results are reproducible
+whatever the number of workers.
+
+    python3 tournament.py --games 10000 --out tournament.json
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from battleship import BitBoard, BOARD_SIZE, SHIPS
+from bots import STRATEGIES
+from fleets import PLACEMENTS
+
+# ─── Configuration ─────────────────────────────────────────────────────────────
+GAMES_PER_PAIRING = 1000
+CHUNK_SIZE = 250            # Games per pool task
+
+
+# ─── Games ─────────────────────────────────────────────────────────────────────
+def play_game(a, b, rng, first=0):
+    """
+    One game between competitors `a` and `b`, each a (targeting, placement)
+    pair of names; competitor `first` (0 or 1) shoots first. Returns
+    (winner index, shots the winner fired).
+    """
+    boards, shooters = [], []
+    for targeting, placement in (a, b):
+        board = BitBoard(BOARD_SIZE)
+        for ship in PLACEMENTS[placement](SHIPS, BOARD_SIZE, rng):
+            board.add_ship(*ship)
+        boards.append(board)
+        shooters.append(STRATEGIES[targeting])
+
+    shots = [0, 0]
+    turn = first
+    while True:
+        target = boards[1 - turn]
+        row, col = divmod(shooters[turn](target, rng), BOARD_SIZE)
+        result, _ = target.fire_at(row, col)
+        shots[turn] += 1
+        if result == "hit" and target.all_ships_sunk():
+            return turn, shots[turn]
+        turn = 1 - turn
+
+def play_chunk(task):
+    """
+    Pool task: (a, b, games, seed) -> (wins by a, wins by b, winning shots by
+    a, winning shots by b). First move alternates between games.
+    """
+    a, b, games, seed = task
+    rng = random.Random(seed)
+    wins, win_shots = [0, 0], [0, 0]
+    for game in range(games):
+        winner, shots = play_game(a, b, rng, first=game % 2)
+        wins[winner] += 1
+        win_shots[winner] += shots
+    return wins[0], wins[1], win_shots[0], win_shots[1]
+
+
+# ─── Tournament ────────────────────────────────────────────────────────────────
+def _tasks(competitors, games, chunk_size, seed):
+    for i, j in itertools.combinations(range(len(competitors)), 2):
+        for chunk, start in enumerate(range(0, games, chunk_size)):
+            size = min(chunk_size, games - start)
+            a, b = competitors[i], competitors[j]
+            # Seeded by name, so a pairing replays identically in any field
+            yield i, j, (a, b, size, f"{seed}:{'/'.join(a)}:{'/'.join(b)}:{chunk}")
+
+def run_tournament(competitors, games=GAMES_PER_PAIRING, workers=None,
+                   seed=0, chunk_size=CHUNK_SIZE):
+    """
+    Round robin: every pair of `competitors` ((targeting, placement) names)
+    plays `games` games. Returns a summary dict: per-competitor win rate and
+    average shots to win, the head-to-head win rates, and throughput.
+    """
+    n = len(competitors)
+    wins = [[0] * n for _ in range(n)]          # wins[i][j]: games i won against j
+    win_shots = [0] * n
+    tasks = list(_tasks(competitors, games, chunk_size, seed))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(play_chunk, [task for _, _, task in tasks], chunksize=4)
+        for (i, j, _), (won_i, won_j, shots_i, shots_j) in zip(tasks, results):
+            wins[i][j] += won_i
+            wins[j][i] += won_j
+            win_shots[i] += shots_i
+            win_shots[j] += shots_j
+    elapsed = time.perf_counter() - start
+
+    total_games = games * n * (n - 1) // 2
+    standings = []
+    for i, (targeting, placement) in enumerate(competitors):
+        played = games * (n - 1)
+        won = sum(wins[i])
+        standings.append({
+            "targeting": targeting,
+            "placement": placement,
+            "games": played,
+            "wins": won,
+            "win_rate": round(won / played, 4) if played else 0.0,
+            "avg_shots_to_win": round(win_shots[i] / won, 2) if won else None,
+        })
+    standings.sort(key=lambda row: row["win_rate"], reverse=True)
+
+    names = [f"{t}/{p}" for t, p in competitors]
+    return {
+        "games_per_pairing": games,
+        "seed": seed,
+        "games": total_games,
+        "seconds": round(elapsed, 3),
+        "games_per_sec": round(total_games / elapsed, 1) if elapsed > 0 else 0.0,
+        "standings": standings,
+        "head_to_head": {
+            names[i]: {names[j]: round(wins[i][j] / games, 4) for j in range(n) if j != i}
+            for i in range(n)
+        },
+    }
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Bot-vs-bot Battleship tournament")
+    parser.add_argument("--targeting", nargs="+", choices=sorted(STRATEGIES),
+                        default=list(STRATEGIES), help="targeting strategies to enter")
+    parser.add_argument("--placement", nargs="+", choices=sorted(PLACEMENTS),
+                        default=list(PLACEMENTS), help="placement strategies to enter")
+    parser.add_argument("--games", type=int, default=GAMES_PER_PAIRING,
+                        help="games per pairing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes in the pool")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE,
+                        help="games per pool task")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="tournament.json",
+                        help="where to write the results (JSON)")
+    args = parser.parse_args()
+
+    competitors = list(itertools.product(args.targeting, args.placement))
+    if len(competitors) < 2:
+        parser.error("need at least two competitors")
+
+    summary = run_tournament(competitors, args.games, args.workers, args.seed, args.chunk)
+    with open(args.out, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"[INFO] {summary['games']} games in {summary['seconds']}s "
+          f"({summary['games_per_sec']:.0f} games/sec on {args.workers} workers)")
+    print(f"{'targeting':>12} {'placement':>10} {'win rate':>9} {'avg shots':>10}")
+    for row in summary["standings"]:
+        shots = row["avg_shots_to_win"]
+        print(f"{row['targeting']:>12} {row['placement']:>10} {row['win_rate']:>9.3f} "
+              f"{shots if shots is not None else '-':>10}")
+    print(f"[INFO] Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,42 @@
 import time
+import asyncio
 import struct
+import socket
 import json
 import enum
 import zlib
 import functools
+import itertools
+import threading
+import contextlib
+import collections
 from Crypto.Cipher import AES
 import hashlib
+import base64
 
 # ─── Global Variables ──────────────────────────────────────────────────────────
 
 key = None
+BOARD_VERSIONS_KEPT = 8     # Board views per client that deltas can be sent against
+RECV_BUFFER_SIZE = 1 << 17  # Per-connection receive buffer; holds any frame (<= 16 + 65535 bytes)
+SENDMSG_MAX_BUFFERS = 1024  # Frames per sendmsg() call (the usual IOV_MAX)
+BATCH_MAX_BYTES = 60_000    # Most payload bytes in one BATCH (a frame body is at most 65535)
+PROTOCOL_VERSION = 2        # Sent in every HELLO; peers on another version are turned away
+LEGACY_PROTOCOL = 1         # What a peer that never says HELLO speaks (see _wire_seq)
+PAYLOAD_CODECS = ("binary", "json")  # Codecs we speak, best first (see hello / answer_hello)
+LEGACY_CODEC = "legacy"     # JSON with text boards, for LEGACY_PROTOCOL peers
+COMPRESSION_METHODS = ("deflate-1",) # Compression we speak; the number versions COMPRESSION_DICT
+COMPRESS_MIN_BYTES = 200    # Encoded payloads shorter than this are never compressed
+COMPRESS_LEVEL = 6          # zlib level: 1 fastest .. 9 smallest
+MAX_DECOMPRESSED = 1 << 20  # Compressed payloads that inflate past this are refused
 
 # ─── Frame Class ───────────────────────────────────────────────────────────────
 
 class Frame:
+    HEADER_FORMAT = 'HHI8s'     # type, length, checksum, nonce - 16 bytes
+    BINARY_BODY = 0x4000        # Flag in the type field: the body is the binary codec, not JSON
+    COMPRESSED = 0x8000         # Flag in the type field: the payload is deflated (compress_payload)
+
     def __init__(self):
         self.type = None
         self.length = 0
@@ -23,10 +46,10 @@ class Frame:
 
     def pack(self):
         # H = unsigned short (2 bytes), I = unsigned int (4 bytes), s = bytes
-        return struct.pack(f'HHI8s{len(self.jsonmsg)}s', self.type, self.length, self.checksum, self.nonce, self.jsonmsg)
+        return struct.pack(f'{self.HEADER_FORMAT}{len(self.jsonmsg)}s', self.type, self.length, self.checksum, self.nonce, self.jsonmsg)
 
     def unpack_header(self, header):
-        self.type, self.length, self.checksum, self.nonce = struct.unpack_from(f'HHI8s', header)
+        self.type, self.length, self.checksum, self.nonce = struct.unpack_from(self.HEADER_FORMAT, header)
 
 # ─── Encryption: AES-CTR ────────────────────────────────────────────────────────
 
@@ -56,6 +79,11 @@ class MessageTypes(enum.Enum):
     S_MESSAGE = 5   # General server messages
     WAITING = 6     # Show spinner / wait screen
     SHUTDOWN = 7    # Tell client to shut down
+    BOARD_DELTA = 8 # Cells changed since a board version the client already has
+    BATCH = 9       # Several of the above, in order, under one seq / nonce / checksum
+
+    # both ways
+    HELLO = 10      # Codecs and compression offered (client) / picked (server); always JSON
 
     # client -> server
     COMMAND = 0     # Send input (e.g., fire, place ship)
@@ -64,13 +92,19 @@ class MessageTypes(enum.Enum):
 # ─── Message Builders ──────────────────────────────────────────────────────────
 
 def _build_result(msg): return {"type": "result", "msg": msg}
-def _build_board(show_ships, board): return {"type": "board", "ships": show_ships, "data": board}
+def _build_board(show_ships, board): return {"type": "board", "ships": show_ships, "packed": board}
 def _build_prompt(msg): return {"type": "prompt", "msg": msg}
 def _build_command(data): return {"type": "command", "coord": data}
 def _build_s_message(msg): return {"type": "s_msg", "msg": msg}
 def _build_waiting(msg): return {"type": "waiting", "msg": msg}
 def _build_shutdown(msg): return {"type": "shutdown", "msg": msg}
 def _build_chat(msg): return {"type": "chat", "msg": msg}
+def _build_board_delta(show_ships, board_id, base, version, cells, sunk):
+    return {"type": "board_delta", "ships": show_ships, "id": board_id,
+            "base": base, "version": version, "cells": cells, "sunk": sunk}
+def _build_hello(codecs, compression=(), version=PROTOCOL_VERSION):
+    return {"type": "hello", "version": version, "codecs": list(codecs),
+            "compression": list(compression)}
 
 _builders = {
     MessageTypes.RESULT: _build_result,
@@ -80,7 +114,9 @@ _builders = {
     MessageTypes.S_MESSAGE: _build_s_message,
     MessageTypes.WAITING: _build_waiting,
     MessageTypes.SHUTDOWN: _build_shutdown,
-    MessageTypes.CHAT: _build_chat
+    MessageTypes.CHAT: _build_chat,
+    MessageTypes.BOARD_DELTA: _build_board_delta,
+    MessageTypes.HELLO: _build_hello
 }
 
 def _build_json(type: MessageTypes, *args):
@@ -88,32 +124,387 @@ def _build_json(type: MessageTypes, *args):
 
 # ─── Board Creation ────────────────────────────────────────────────────────────
 
-def _create_board(board, setup=False):
-    output = ["  " + " ".join(str(i + 1).rjust(2) for i in range(board.size)) + '\n']
-    for r in range(board.size):
+@functools.lru_cache(maxsize=None)
+def _column_header(size):
+    return "  " + " ".join(str(i + 1).rjust(2) for i in range(size)) + '\n'
+
+def render_grid(grid, size):
+    """Text form of one grid, as sent in BOARD messages."""
+    output = [_column_header(size)]
+    for r in range(size):
         row_label = chr(ord('A') + r)
-        row_str = " ".join(
-            board.hidden_grid[r][c] if setup else board.display_grid[r][c]
-            for c in range(board.size)
-        )
+        row_str = " ".join(grid[r])
         output.append(f"{row_label:2} {row_str}\n")
     output.append('\n')
     return "".join(output)
 
-# ─── Reliable Receive ──────────────────────────────────────────────────────────
+# ─── Board Packing ─────────────────────────────────────────────────────────────
+# Boards travel as 2 bits per cell: a size byte, then the cells row by row,
+# four to a byte, first cell in the lowest bits. 26 bytes for a 10x10 board.
+CELL_CHARS = ".oXS"                                 # unknown/water, miss, hit, ship
+CELL_CODES = {ch: code for code, ch in enumerate(CELL_CHARS)}
+
+def pack_grid(grid) -> bytes:
+    size = len(grid)
+    cells = [CELL_CODES[ch] for row in grid for ch in row]
+    cells += [0] * (-len(cells) % 4)
+    packed = bytes(
+        cells[i] | cells[i + 1] << 2 | cells[i + 2] << 4 | cells[i + 3] << 6
+        for i in range(0, len(cells), 4)
+    )
+    return bytes([size]) + packed
+
+def unpack_grid(data: bytes):
+    size = data[0]
+    cells = [CELL_CHARS[byte >> shift & 3] for byte in data[1:] for shift in (0, 2, 4, 6)]
+    return [cells[r * size:(r + 1) * size] for r in range(size)]
+
+def pack_cells(cells, size) -> bytes:
+    """Delta cells [(r, c, ch), ...] as one little-endian uint16 each: index << 2 | code."""
+    return struct.pack(f"<{len(cells)}H", *((r * size + c) << 2 | CELL_CODES[ch] for r, c, ch in cells))
+
+def unpack_cells(data: bytes, size):
+    values = struct.unpack(f"<{len(data) // 2}H", data)
+    return [((v >> 2) // size, (v >> 2) % size, CELL_CHARS[v & 3]) for v in values]
+
+def _pack_board(board, setup=False) -> bytes:
+    """Packed grid for a BOARD payload (the JSON codec base64s it)."""
+    # Boards that cache their views (battleship.Board) only re-pack after a change
+    packed = getattr(board, "packed", None)
+    return packed(setup) if packed is not None else \
+        pack_grid(board.hidden_grid if setup else board.display_grid)
+
+# ─── Payload Codecs ────────────────────────────────────────────────────────────
+# A message's `data` travels in the codec its connection agreed on in the
+# HELLO exchange (hello / answer_hello). "json" is the original format.
+# "binary" is one tag byte (the MessageTypes value) followed by, per type:
+#   text messages  the UTF-8 text ("msg", or "coord" for COMMAND)
+#   BOARD          flags (1: ships shown, 2: id and version follow),
+#                  [id, version as uint32], the packed grid
+#   BOARD_DELTA    flags, id, base, version (uint32), uint16 length of the
+#                  packed cells, the cells, then each sunk ship's name as a
+#                  uint8 length + UTF-8
+#   BATCH          each inner message as a uint16 length + its binary form
+# A binary frame has Frame.BINARY_BODY set in its type field and its seq as
+# a uint32 in front of the body, so decoding never depends on what was
+# negotiated. Both codecs decode to the same dicts.
+#
+# A peer that never says HELLO gets LEGACY_CODEC instead: JSON as the
+# original protocol had it, with boards as rendered text under "data"
+# rather than packed grids.
+#
+# The tables are keyed by tag rather than by MessageTypes: hashing an enum
+# member runs Python code, and these lookups are most of a small message's cost.
+_TEXT_FIELDS = {
+    MessageTypes.RESULT.value: "msg",
+    MessageTypes.PROMPT.value: "msg",
+    MessageTypes.S_MESSAGE.value: "msg",
+    MessageTypes.WAITING.value: "msg",
+    MessageTypes.SHUTDOWN.value: "msg",
+    MessageTypes.CHAT.value: "msg",
+    MessageTypes.COMMAND.value: "coord",
+}
+_TYPES_BY_TAG = {t.value: t for t in MessageTypes}
+_TAG_BYTES = {t.value: bytes((t.value,)) for t in MessageTypes}
+_TEXT_BUILDERS = {tag: _builders[_TYPES_BY_TAG[tag]] for tag in _TEXT_FIELDS}
+_SEQ = struct.Struct("<I")
+_IDS = struct.Struct("<II")             # BOARD id, version
+_DELTA_HEAD = struct.Struct("<BIIIH")   # flags, id, base, version, cells length
+_LENGTH = struct.Struct("<H")
+
+def _base64_bytes(value):
+    # JSON has no bytes: packed grids and cells go as base64 text
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+_json_encoder = json.JSONEncoder(default=_base64_bytes)
+
+def _encode_binary(type: MessageTypes, data) -> bytes:
+    tag = type.value
+    field = _TEXT_FIELDS.get(tag)
+    tag = _TAG_BYTES[tag]
+    if field is not None:
+        return tag + data[field].encode()
+    if type == MessageTypes.BOARD:
+        if "id" in data:
+            head = bytes((data["ships"] | 2,)) + _IDS.pack(data["id"], data["version"])
+        else:
+            head = bytes((int(data["ships"]),))
+        return tag + head + data["packed"]
+    if type == MessageTypes.BOARD_DELTA:
+        names = [name.encode() for name in data["sunk"]]
+        return (tag + _DELTA_HEAD.pack(int(data["ships"]), data["id"], data["base"],
+                                       data["version"], len(data["cells"]))
+                + data["cells"] + b"".join(bytes((len(n),)) + n for n in names))
+    raise ValueError(f"{type.name} has no binary form")
+
+def _decode_binary(body: bytes) -> dict:
+    """Inverse of _encode_binary, with packed bytes base64'd as the JSON codec has them."""
+    build = _TEXT_BUILDERS.get(body[0])
+    if build is not None:
+        return build(body[1:].decode())
+    type = _TYPES_BY_TAG[body[0]]
+    if type == MessageTypes.BOARD:
+        flags, start = body[1], 2
+        if flags & 2:
+            board_id, version = _IDS.unpack_from(body, start)
+            start += _IDS.size
+        data = _build_board(bool(flags & 1), base64.b64encode(body[start:]).decode())
+        if flags & 2:
+            data["id"], data["version"] = board_id, version
+        return data
+    if type == MessageTypes.BOARD_DELTA:
+        flags, board_id, base, version, length = _DELTA_HEAD.unpack_from(body, 1)
+        start = 1 + _DELTA_HEAD.size
+        cells, pos = body[start:start + length], start + length
+        sunk = []
+        while pos < len(body):
+            end = pos + 1 + body[pos]
+            sunk.append(body[pos + 1:end].decode())
+            pos = end
+        return _build_board_delta(bool(flags & 1), board_id, base, version,
+                                  base64.b64encode(cells).decode(), sunk)
+    if type == MessageTypes.BATCH:
+        messages, pos = [], 1
+        while pos < len(body):
+            (length,) = _LENGTH.unpack_from(body, pos)
+            pos += _LENGTH.size
+            messages.append(_decode_binary(body[pos:pos + length]))
+            pos += length
+        return {"type": "batch", "messages": messages}
+    raise ValueError(f"{type.name} has no binary form")
+
+class Payload:
+    """
+    A message's `data` as build_payload makes it: a _builders dict (with
+    bytes where JSON has base64), snapshotted so it stays valid however long
+    it waits in an outbox. Each codec's encoding is made the first time a
+    recipient needs it and then kept, so a broadcast serialises a message
+    once per codec in use, not once per recipient.
+    """
+    def __init__(self, type: MessageTypes, data):
+        self.type = type
+        self.data = data
+        self.encoded = {}
+
+    def encode(self, codec="json") -> bytes:
+        body = self.encoded.get(codec)
+        if body is None:
+            body = self.encoded[codec] = self._encode(codec)
+        return body
+
+    def compressed(self, codec="json"):
+        """
+        encode(codec) deflated by compress_payload, or None if that doesn't
+        make it smaller. Kept like the encodings, so a broadcast compresses once.
+        """
+        key = (codec, "compressed")
+        if key not in self.encoded:
+            self.encoded[key] = compress_payload(self.encode(codec))
+        return self.encoded[key]
+
+    def _encode(self, codec):
+        if codec == "binary":
+            return _encode_binary(self.type, self.data)
+        if codec == LEGACY_CODEC and self.type == MessageTypes.BOARD:
+            grid = unpack_grid(self.data["packed"])
+            return _json_encoder.encode({"type": "board", "ships": self.data["ships"],
+                                         "data": render_grid(grid, len(grid))}).encode()
+        return _json_encoder.encode(self.data).encode()
+
+class BatchPayload(Payload):
+    """A BATCH of payloads; each codec splices in the inner encodings as they are."""
+    def __init__(self, payloads):
+        super().__init__(MessageTypes.BATCH, {"type": "batch", "messages": [p.data for p in payloads]})
+        self.payloads = payloads
+
+    def _encode(self, codec):
+        inner = [p.encode(codec) for p in self.payloads]
+        if codec == "binary":
+            return bytes((MessageTypes.BATCH.value,)) + b"".join(_LENGTH.pack(len(b)) + b for b in inner)
+        return b'{"type": "batch", "messages": [' + b', '.join(inner) + b']}'
+
+def _encode_plaintext(s, payload: Payload):
+    """
+    (plaintext, type flags) of `payload` with the next seq we send, in the
+    codec `s` speaks, compressed if `s` agreed to compression and it's worth it.
+    """
+    seq = _wire_seq(s, s.seq)
+    codec = LEGACY_CODEC if _is_legacy(s) else getattr(s, "codec", "json")
+    flags = Frame.BINARY_BODY if codec == "binary" else 0
+    if getattr(s, "compression", None) is not None:
+        body = payload.encode(codec)
+        if len(body) >= COMPRESS_MIN_BYTES:
+            packed = payload.compressed(codec)
+            if packed is not None:
+                compression_stats.record_sent(len(body), len(packed))
+                return _SEQ.pack(seq) + packed, flags | Frame.COMPRESSED
+    if flags:
+        return _SEQ.pack(seq) + payload.encode("binary"), flags
+    # Same layout json.dumps({"data": ..., "seq": ...}) would produce
+    return b'{"data": ' + payload.encode(codec) + b', "seq": ' + str(seq).encode() + b'}', 0
 
-def _recv_exact(s, size):
-    buffer = b''
-    while len(buffer) < size:
-        block = s.recv(size - len(buffer))
-        if not block:
+def _decode_plaintext(plaintext: bytes, type_field: int):
+    """(seq, data) from a decrypted frame body. Raises ValueError / KeyError if malformed."""
+    if not type_field & (Frame.BINARY_BODY | Frame.COMPRESSED):
+        payload = json.loads(plaintext.decode())
+        return payload['seq'], payload['data']
+    try:
+        (seq,) = _SEQ.unpack_from(plaintext)
+        body = plaintext[_SEQ.size:]
+        if type_field & Frame.COMPRESSED:
+            body = decompress_payload(body)
+        if type_field & Frame.BINARY_BODY:
+            return seq, _decode_binary(body)
+        return seq, json.loads(body)
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"Bad payload: {e}")
+
+# ─── Payload Compression ───────────────────────────────────────────────────────
+# Negotiated in the same HELLO as the codec, and only used on payloads of
+# COMPRESS_MIN_BYTES or more. A compressed frame has Frame.COMPRESSED set
+# (plus Frame.BINARY_BODY if the payload is binary); its body is the seq as a
+# uint32, then the encoded payload as raw deflate. Compression happens before
+# encryption: ciphertext doesn't compress.
+#
+# The deflate stream is primed with COMPRESSION_DICT, the vocabulary boards
+# and server messages are made of, so even a turn's few hundred bytes shrink.
+# Both ends must hold the same dictionary: change it, and the method's number
+# in COMPRESSION_METHODS changes with it. Deflate copies best from the end of
+# the dictionary, so the most common strings go last.
+_DICTIONARY_WORDS = (
+    "Enter starting coordinate followed by orientation (e.g. A1 V), or AUTO to place your whole fleet at random ",
+    "Orientation must be either 'H' or 'V'.", "Please place your ships manually on the board.",
+    "Your ships have been placed at random.", "Please wait for your opponent to place their ships...",
+    " is placing their ships...", " has finished placing their ships...", "Cannot place ", " (orientation=",
+    "). Try again.", "Placing your ", " (size ", "Invalid coordinate", "Too many commands queued - dropped ",
+    "Resuming game from where it left off...", " has disconnected, they have 15 seconds to reconnect...",
+    " failed to reconnect in time", " has reconnected! ", "A new game will start shortly between ",
+    "You lost. You are now being put at the back of the queue", "Congratulations! You win.",
+    "Waiting for your opponent", "Please wait, it isn't your turn.", "Already fired there.",
+    " timed out. You win!", " timed out. They lose!", " repeated a shot.", " has entered invalid input.",
+    "You are number ", " in the queue", "Carrier", "Battleship", "Cruiser", "Submarine", "Destroyer",
+    "HIT! You blew up the ", " has blown up your ", "You were HIT!", " has won!", "Waiting for ", " to fire...",
+    " has ALREADY SHOT the defender.", " MISSED!", " has MISSED the defender.", " has HIT the defender.",
+    "Enter coordinate to fire at (e.g. B5) or 'Ctrl + C' to forfeit ",
+    '"sunk": [', '"cells": "', '"base": ', '{"type": "board_delta", "ships": false, "id": ',
+    '{"type": "result", "msg": "', '{"type": "waiting", "msg": "', '{"type": "prompt", "msg": "',
+    '{"type": "chat", "msg": "', ', "version": ', '{"type": "board", "ships": false, "packed": "',
+    '"}, {"type": "s_msg", "msg": "', '{"type": "batch", "messages": [',
+)
+COMPRESSION_DICT = "".join(_DICTIONARY_WORDS).encode()
+
+def compress_payload(body: bytes):
+    """`body` as raw deflate primed with COMPRESSION_DICT, or None if that doesn't make it smaller."""
+    start = time.perf_counter()
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15, zdict=COMPRESSION_DICT)
+    packed = compressor.compress(body) + compressor.flush()
+    compression_stats.record_compress(len(body), len(packed), time.perf_counter() - start)
+    return packed if len(packed) < len(body) else None
+
+def decompress_payload(packed: bytes) -> bytes:
+    """Inverse of compress_payload. Raises ValueError if `packed` is corrupt or inflates too far."""
+    start = time.perf_counter()
+    decompressor = zlib.decompressobj(-15, zdict=COMPRESSION_DICT)
+    try:
+        body = decompressor.decompress(packed, MAX_DECOMPRESSED)
+    except zlib.error as e:
+        raise ValueError(f"Bad compressed payload: {e}")
+    if decompressor.unconsumed_tail or not decompressor.eof:
+        raise ValueError("Compressed payload truncated or too large")
+    compression_stats.record_decompress(len(packed), len(body), time.perf_counter() - start)
+    return body
+
+# ─── Buffered Receive ──────────────────────────────────────────────────────────
+
+class FrameReader:
+    """
+    Per-connection receive buffer. Each recv_into() pulls in as much as the
+    socket has ready, straight into one reusable bytearray, and every whole
+    frame in it is handed out before the socket is touched again - a burst
+    of small messages costs one syscall instead of two per message.
+
+    `pending` seeds the buffer with bytes already read off the connection
+    elsewhere (see leftover()).
+    """
+    HEADER_SIZE = struct.calcsize(Frame.HEADER_FORMAT)
+
+    def __init__(self, conn, pending=b'', size=RECV_BUFFER_SIZE):
+        self.conn = conn
+        self.buffer = bytearray(max(size, len(pending)))
+        self.view = memoryview(self.buffer)
+        self.buffer[:len(pending)] = pending
+        self.start = 0              # first byte not yet handed out
+        self.end = len(pending)     # end of the bytes received so far
+
+    def next_frame(self):
+        """The next whole frame already in the buffer, or None."""
+        available = self.end - self.start
+        if available < self.HEADER_SIZE:
+            return None
+        f = Frame()
+        f.unpack_header(self.view[self.start:self.start + self.HEADER_SIZE])
+        body = self.start + self.HEADER_SIZE
+        if self.end - body < f.length:
+            return None
+        f.jsonmsg = bytes(self.view[body:body + f.length])
+        self.start = body + f.length
+        return f
+
+    def fill(self):
+        """One recv_into() onto the end of the buffer. Raises ConnectionError on EOF."""
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif len(self.buffer) - self.end < self.HEADER_SIZE + 0xFFFF:
+            # Not sure a whole frame still fits: move the partial one to the front
+            kept = self.end - self.start
+            self.buffer[:kept] = bytes(self.view[self.start:self.end])
+            self.start, self.end = 0, kept
+        try:
+            received = self.conn.recv_into(self.view[self.end:])
+        except OSError as e:
+            raise ConnectionError(f"recv failed: {e}")
+        if not received:
             raise ConnectionError("Connection closed.")
-        buffer += block
-    return buffer
+        self.end += received
+
+    def read_frame(self) -> Frame:
+        """The next frame, receiving only when the buffer has no whole one."""
+        while True:
+            f = self.next_frame()
+            if f is not None:
+                return f
+            self.fill()
+
+    def frames(self):
+        """Receive once, then yield every whole frame the buffer holds."""
+        self.fill()
+        while (f := self.next_frame()) is not None:
+            yield f
+
+    def leftover(self) -> bytes:
+        """Bytes received but not handed out yet, for whoever reads the connection next."""
+        return bytes(self.view[self.start:self.end])
+
+def _frame_reader(s) -> FrameReader:
+    reader = getattr(s, "frame_reader", None)
+    if reader is None:
+        reader = s.frame_reader = FrameReader(s.conn)
+    return reader
 
 # ─── Connection-Safe Send Wrapper ──────────────────────────────────────────────
 
 def detects_lost_connection(func):
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except (BrokenPipeError, ConnectionResetError, OSError) as e:
+                return "connection_lost", None
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
@@ -124,84 +515,704 @@ def detects_lost_connection(func):
 
 # ─── Send and Receive Functions ────────────────────────────────────────────────
 
-def send_package(s, type: MessageTypes, *args):
+def build_payload(type: MessageTypes, *args) -> Payload:
     """
-    `s`: 'Player' or 'Server' object.
+    The `data` part of a message - everything except the recipient's seq -
+    as a Payload. Boards are packed here, so the result is a snapshot that
+    stays valid however long it waits in an outbox, and a broadcast can
+    build it once and frame it for each recipient with _frame_payload.
     """
-    f = Frame()
-    f.type = type.value
-
-    # Create JSON dictionary
     if type == MessageTypes.BOARD:
         board_obj, show_ships = args
-        board_string = _create_board(board_obj, show_ships)
-        json_dict = _build_json(type, show_ships, board_string)
+        json_dict = _build_json(type, show_ships, _pack_board(board_obj, show_ships))
+        if hasattr(board_obj, "board_id"):
+            # Lets the client apply later BOARD_DELTAs to this snapshot
+            json_dict["id"], json_dict["version"] = board_obj.board_id, board_obj.version
     else:
         json_dict = _build_json(type, *args)
+    return Payload(type, json_dict)
+
+def batch_messages(messages, codec="json"):
+    """
+    Fold a run of (type, payload) messages for one recipient into BATCH
+    messages, each carrying as many as fit in BATCH_MAX_BYTES once encoded
+    in `codec`, so they cost one seq, one encryption and one checksum
+    instead of one each. A lone message is left as it is. Inner payloads
+    are spliced in as already encoded.
+    """
+    batched, run, size = [], [], 0
+
+    def flush():
+        if len(run) == 1:
+            batched.append(run[0])
+        elif run:
+            batched.append((MessageTypes.BATCH, BatchPayload([payload for _, payload in run])))
 
-    # Encrypt
-    plaintext = json.dumps({
-        "data" : json_dict,
-        "seq": s.seq
-    }).encode()
+    for type, payload in messages:
+        length = len(payload.encode(codec)) + 2
+        if run and size + length > BATCH_MAX_BYTES:
+            flush()
+            run, size = [], 0
+        run.append((type, payload))
+        size += length
+    flush()
+    return batched
 
+def _frame_payload(s, type: MessageTypes, payload: Payload) -> bytes:
+    """
+    Add `s.seq` to a payload from build_payload, encode it in `s.codec`,
+    encrypt and frame it, returning the packed bytes. Only this part is per
+    recipient. Shared by the blocking and asyncio send paths so both speak
+    the same wire format.
+    """
+    plaintext, flags = _encode_plaintext(s, payload)
+
+    # Encrypt (fresh nonce per recipient: CTR keystreams must never be reused)
     ciphertext, nonce = aes_ctr_encrypt(plaintext)
-    f.jsonmsg = ciphertext
-    f.nonce = nonce
 
+    # Checksum over the header with checksum=0, then the body, without re-packing
+    header = struct.pack(Frame.HEADER_FORMAT, type.value | flags, len(ciphertext), 0, nonce)
+    checksum = zlib.crc32(ciphertext, zlib.crc32(header))
+    return struct.pack(Frame.HEADER_FORMAT, type.value | flags, len(ciphertext), checksum, nonce) + ciphertext
+
+def _encode_package(s, type: MessageTypes, *args) -> bytes:
+    return _frame_payload(s, type, build_payload(type, *args))
+
+def _unbatch(s, data):
+    """
+    Receivers see a BATCH as the messages inside it: the first is returned
+    and the rest wait in `s.unbatched` for the next receive calls.
+    """
+    if data.get("type") != "batch":
+        return data
+    messages = collections.deque(data["messages"])
+    if not messages:
+        return None
+    first = messages.popleft()
+    if messages:
+        if getattr(s, "unbatched", None) is None:
+            s.unbatched = collections.deque()
+        s.unbatched.extend(messages)
+    return first
+
+def _is_legacy(s):
+    return getattr(s, "protocol", PROTOCOL_VERSION) == LEGACY_PROTOCOL
+
+def _wire_seq(s, count):
+    """
+    The seq that goes on the wire for message number `count` in one
+    direction (s.seq sending, s.recv_seq receiving). Each direction has its
+    own counter, except with a peer on LEGACY_PROTOCOL - one that connected
+    without a HELLO - which numbers everything sent and received with one
+    shared counter, as the original protocol did.
+    """
+    if _is_legacy(s):
+        return s.seq + s.recv_seq
+    return count
+
+def _decode_frame(s, f: Frame) -> dict:
+    """
+    Verify, decrypt and seq-check a frame whose header and body have been read.
+    Raises ValueError / KeyError for packages that should be ignored.
+    """
     # Checksum
-    f.length = len(f.jsonmsg)
+    expected_checksum = f.checksum
+    f.checksum = 0
+    if expected_checksum != zlib.crc32(f.pack()):
+        raise ValueError("Corrupted packet received.")
+
+    # Decrypt
+    plaintext = aes_ctr_decrypt(f.jsonmsg, f.nonce)
+    seq_incoming, data = _decode_plaintext(plaintext, f.type)
+
+    # Seq check (each direction has its own counter, see _wire_seq)
+    expected = _wire_seq(s, s.recv_seq)
+    if seq_incoming != expected:
+        raise ValueError(f"Bad seq: expected {expected} got {seq_incoming}")
+    s.recv_seq += 1
+
+    return data
+
+def send_package(s, type: MessageTypes, *args, key=None):
+    """
+    `s`: 'Player' or 'Server' object. `s.seq` numbers what we send,
+    `s.recv_seq` what we expect to receive.
+    If `s` has an `outbox`, the message is queued there for its writer thread
+    and this returns at once (raising ConnectionError if the outbox has been
+    closed); otherwise it is written straight to the socket. `key` lets a
+    queued message be superseded by a newer one with the same key.
+    Boards sent to an `s` with `board_versions` go through send_board.
+    """
+    if type == MessageTypes.BOARD and getattr(s, "board_versions", None) is not None:
+        send_board(s, *args, key=key)
+        return
+    send_prepared(s, type, build_payload(type, *args), key=key)
+
+def board_update(board, show_ships, known_version=None):
+    """
+    (type, payload) bringing a client that has `known_version` of this view
+    of `board` up to date: a BOARD_DELTA with just the changed cells (and any
+    ships sunk meanwhile) when possible, otherwise a full BOARD snapshot.
+    """
+    changes = None
+    if known_version is not None and hasattr(board, "changes_since"):
+        changes = board.changes_since(known_version)
+    # Each changed cell costs 2 bytes; past half a snapshot's size, send the snapshot
+    if changes is None or len(changes[0]) * 8 > board.size * board.size:
+        return MessageTypes.BOARD, build_payload(MessageTypes.BOARD, board, show_ships)
+
+    cells, sunk = changes
+    packed = pack_cells([(r, c, board.cell(r, c, show_ships)) for r, c in sorted(cells)], board.size)
+    return MessageTypes.BOARD_DELTA, build_payload(
+        MessageTypes.BOARD_DELTA, show_ships, board.board_id, known_version,
+        board.version, packed, sunk)
+
+def board_message(s, board, show_ships, shared=None):
+    """
+    (type, payload) that brings `s` up to date with `board`: a delta against
+    the version `s` was last sent (tracked in `s.board_versions`, keyed by
+    (board id, show_ships)), or the full board if it has none. Records the
+    version as sent, so the message must actually go out. `shared` is a
+    dict a broadcast passes for every recipient so each distinct update is
+    only built once.
+    """
+    versions = getattr(s, "board_versions", None)
+    if versions is None or not hasattr(board, "board_id"):
+        return MessageTypes.BOARD, build_payload(MessageTypes.BOARD, board, show_ships)
 
-    packed = f.pack()
-    f.checksum = zlib.crc32(packed)
-    packed = f.pack()
+    view = (board.board_id, show_ships)
+    known = versions.pop(view, None)
+    if shared is not None and known in shared:
+        type, payload = shared[known]
+    else:
+        type, payload = board_update(board, show_ships, known)
+        if shared is not None:
+            shared[known] = (type, payload)
+
+    versions[view] = board.version
+    while len(versions) > BOARD_VERSIONS_KEPT:
+        del versions[next(iter(versions))]     # forget the least recently sent view
+    return type, payload
+
+def send_board(s, board, show_ships, key=None, shared=None):
+    """
+    Send `board` to `s` as board_message() has it. Only full snapshots take
+    `key`: a superseded delta would break the client's chain.
+    """
+    type, payload = board_message(s, board, show_ships, shared)
+    send_prepared(s, type, payload, key=key if type == MessageTypes.BOARD else None)
+
+def send_prepared(s, type: MessageTypes, payload: Payload, key=None):
+    """
+    send_package for a payload that was already built with build_payload, so
+    a broadcast renders and serialises its message once for every recipient.
+    """
+    outbox = getattr(s, "outbox", None)
+    if outbox is not None:
+        outbox.put(type, payload, key)
+        return
+    send_payload(s, type, payload)
+
+def send_payload(s, type: MessageTypes, payload: Payload):
+    """
+    Write an already-built payload to `s` now, bypassing any outbox.
+    If `s` has a `send_lock`, framing and sending happen under it so that two
+    threads sending to the same peer can't reuse a seq number.
+    """
+    with getattr(s, "send_lock", None) or contextlib.nullcontext():
+        packed = _frame_payload(s, type, payload)
+        # Claim the seq before the bytes leave: the peer may reply before sendall returns
+        s.seq += 1
+
+        # Send
+        try:
+            s.conn.sendall(packed)
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            # wrap any socket failure as ConnectionError
+            raise ConnectionError(f"send_package failed: {e}")
 
-    # Send
+def send_payloads(s, messages, batch=False):
+    """
+    send_payload for several (type, payload) messages at once: framed with
+    consecutive seqs and written with one sendmsg() (writev), so a turn's
+    worth of messages costs one syscall and leaves in as few packets as
+    fit. Being a single write, it needs no TCP_CORK; see set_nodelay.
+    With `batch`, they are first folded into BATCH frames (batch_messages),
+    unless `s` is on LEGACY_PROTOCOL and wouldn't know what a BATCH is.
+    """
+    if batch and not _is_legacy(s):
+        messages = batch_messages(messages, getattr(s, "codec", "json"))
+    with getattr(s, "send_lock", None) or contextlib.nullcontext():
+        frames = []
+        for type, payload in messages:
+            frames.append(_frame_payload(s, type, payload))
+            s.seq += 1
+        try:
+            _sendmsg_all(s.conn, frames)
+        except (BrokenPipeError, ConnectionResetError, OSError) as e:
+            raise ConnectionError(f"send_package failed: {e}")
+
+def _sendmsg_all(conn, frames):
+    """sendall() for a list of byte strings, resuming after partial writes."""
+    if not hasattr(conn, "sendmsg"):
+        conn.sendall(b"".join(frames))     # no sendmsg (e.g. Windows)
+        return
+    frames = [memoryview(f) for f in frames]
+    while frames:
+        sent = conn.sendmsg(frames[:SENDMSG_MAX_BUFFERS])
+        while frames and sent >= len(frames[0]):
+            sent -= len(frames[0])
+            frames.pop(0)
+        if sent:
+            frames[0] = frames[0][sent:]
+
+def set_nodelay(conn):
+    """
+    Turn off Nagle's algorithm on a TCP socket. Messages leave already
+    coalesced (send_payloads), and Nagle would only hold back the next
+    write until the peer's delayed ACK - tens of milliseconds per turn.
+    """
     try:
-        s.conn.sendall(packed)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (OSError, AttributeError):
+        pass                        # not TCP (e.g. a socketpair in benchmarks)
+
+@contextlib.contextmanager
+def coalesced(*peers):
+    """
+    Hold back the outbox writers of `peers` while the block queues several
+    messages, so each peer's messages go out together in one write when it
+    ends. Peers without a holdable outbox (bots, pre-login) are unaffected.
+    """
+    held = [p.outbox for p in peers if hasattr(getattr(p, "outbox", None), "hold")]
+    for outbox in held:
+        outbox.hold()
+    try:
+        yield
+    finally:
+        for outbox in held:
+            outbox.release()
+
+def receive_package(s) -> dict:
+    """
+    `s`: 'Player' or 'Server' object. Reads through `s.frame_reader`
+    (created on first use), so frames that arrived together are decoded
+    from one recv.
+    """
+    if getattr(s, "unbatched", None):
+        return s.unbatched.popleft()
+    reader = _frame_reader(s)
+    while True:
+        f = reader.read_frame()
+        try:
+            data = _unbatch(s, _decode_frame(s, f))
+            if data is not None:
+                return data
+        
+        except (ValueError, KeyError) as e:
+            print(f"[WARNING] Ignored a bad package: {e}")
+            continue
+
+# ─── Codec Negotiation ─────────────────────────────────────────────────────────
+
+def _pick(offered, supported, default=None):
+    """The first of `offered` (best first) that is also in `supported`, else `default`."""
+    return next((choice for choice in offered or () if choice in supported), default)
+
+def _version_notice(version):
+    return (f"This server speaks protocol version {PROTOCOL_VERSION} and your client "
+            f"speaks version {version}. Please update your client.")
+
+def _accept_hello(s, reply, codecs, compression):
+    if reply.get("type") == "shutdown":
+        raise ConnectionError(reply.get("msg"))
+    if reply.get("version") != PROTOCOL_VERSION:
+        raise ConnectionError(f"Server speaks protocol version {reply.get('version')}, "
+                              f"we speak {PROTOCOL_VERSION}")
+    s.codec = _pick(reply.get("codecs"), codecs, "json")
+    s.compression = _pick(reply.get("compression"), compression)
+    return s.codec
+
+def hello(s, codecs=PAYLOAD_CODECS, compression=COMPRESSION_METHODS) -> str:
+    """
+    Client side of the HELLO exchange, straight after connecting: offer
+    `codecs` and `compression` methods (best first), wait for the server's
+    picks and send with them from then on. Both HELLOs go as JSON, so either
+    side can read them whatever it speaks. Anything that arrives first
+    (broadcasts also reach connections still logging in) is dropped.
+    Returns the codec; `s.compression` is the method, or None. Raises
+    ConnectionError if the server speaks another protocol version.
+    """
+    send_package(s, MessageTypes.HELLO, codecs, compression)
+    while True:
+        reply = receive_package(s)
+        if reply.get("type") in ("hello", "shutdown"):
+            return _accept_hello(s, reply, codecs, compression)
+
+def answer_hello(s, package) -> str:
+    """
+    Server side: reply to a client's HELLO with the codec and compression
+    we picked from its offer, then send to `s` with them. Returns the codec.
+    A client on another protocol version is sent a SHUTDOWN saying so, and
+    ConnectionError is raised. A client that never says HELLO stays on
+    LEGACY_PROTOCOL: the original JSON, seq counting and message types.
+    """
+    if package.get("version") != PROTOCOL_VERSION:
+        refuse_client(s, package.get("version"))
+    s.protocol = PROTOCOL_VERSION   # the reply already counts seqs per direction
+    codec = _pick(package.get("codecs"), PAYLOAD_CODECS, "json")
+    compression = _pick(package.get("compression"), COMPRESSION_METHODS)
+    send_package(s, MessageTypes.HELLO, [codec], [compression] if compression else [])
+    s.codec, s.compression = codec, compression
+    return codec
+
+def refuse_client(s, version):
+    """
+    Turn away a client whose HELLO names another protocol version: send a
+    SHUTDOWN telling them to update, then raise ConnectionError so the
+    caller drops the connection. (A client that never says HELLO isn't
+    refused: it is served LEGACY_PROTOCOL.)
+    """
+    send_package(s, MessageTypes.SHUTDOWN, _version_notice(version))
+    raise ConnectionError("protocol version mismatch")
+
+# ─── Async Send and Receive ───────────────────────────────────────────────────
+
+async def send_package_async(s, type: MessageTypes, *args):
+    """
+    asyncio twin of send_package.
+    `s`: any object with an asyncio `writer` (StreamWriter) and a `seq` counter.
+    Boards sent to an `s` with `board_versions` may go as a BOARD_DELTA.
+    """
+    if type == MessageTypes.BOARD:
+        await send_payload_async(s, *board_message(s, *args))
+        return
+    await send_payload_async(s, type, build_payload(type, *args))
+
+async def send_payload_async(s, type: MessageTypes, payload: Payload):
+    """
+    asyncio twin of send_payload, for payloads shared across recipients.
+    Like send_prepared, hands the payload to `s.outbox` instead if it has one
+    (e.g. a server-side bot).
+    """
+    outbox = getattr(s, "outbox", None)
+    if outbox is not None:
+        outbox.put(type, payload)
+        return
+    held = getattr(s, "coalescing", None)
+    if held is not None:
+        held.append((type, payload))    # sent when the coalesced_async block ends
+        return
+    packed = _frame_payload(s, type, payload)
+
+    try:
+        s.writer.write(packed)
         s.seq += 1
+        await s.writer.drain()
     except (BrokenPipeError, ConnectionResetError, OSError) as e:
-        # wrap any socket failure as ConnectionError
-        raise ConnectionError(f"send_package failed: {e}")
-    
-def receive_package(s) -> dict:
+        raise ConnectionError(f"send_package_async failed: {e}")
+
+async def send_payloads_async(s, messages, batch=False):
+    """asyncio twin of send_payloads: one write (and drain) for all of `messages`."""
+    if batch and not _is_legacy(s):
+        messages = batch_messages(messages, getattr(s, "codec", "json"))
+    frames = []
+    for type, payload in messages:
+        frames.append(_frame_payload(s, type, payload))
+        s.seq += 1
+    try:
+        s.writer.writelines(frames)
+        await s.writer.drain()
+    except (BrokenPipeError, ConnectionResetError, OSError) as e:
+        raise ConnectionError(f"send_package_async failed: {e}")
+
+@contextlib.asynccontextmanager
+async def coalesced_async(*peers):
     """
-    `s`: 'Player' or 'Server' object.
+    asyncio twin of coalesced: what the block sends to `peers` through
+    send_payload_async is collected, then written to each peer in one go -
+    as BATCH frames - when it ends. Peers with an outbox (bots) are
+    unaffected.
+    """
+    held = [p for p in peers
+            if getattr(p, "outbox", None) is None and getattr(p, "coalescing", None) is None]
+    for p in held:
+        p.coalescing = []
+    try:
+        yield
+    finally:
+        failed = None
+        for p in held:
+            messages, p.coalescing = p.coalescing, None
+            if not messages:
+                continue
+            try:
+                await send_payloads_async(p, messages, batch=True)
+            except ConnectionError as e:
+                failed = failed or e    # still deliver to the others
+        if failed:
+            raise failed
+
+async def receive_package_async(s) -> dict:
     """
+    asyncio twin of receive_package.
+    `s`: any object with an asyncio `reader` (StreamReader) and a `recv_seq` counter.
+    """
+    if getattr(s, "unbatched", None):
+        return s.unbatched.popleft()
     while True:
         f = Frame()
         try:
-            # Receive and unpack
-            header = _recv_exact(s.conn, 16)
+            header = await s.reader.readexactly(16)
             f.unpack_header(header)
-            f.jsonmsg = _recv_exact(s.conn, f.length)
-
-            # Checksum
-            expected_checksum = f.checksum
-            f.checksum = 0
-            if expected_checksum != zlib.crc32(f.pack()):
-                raise ValueError("Corrupted packet received.")
-            
-            # Decrypt
-            plaintext = aes_ctr_decrypt(f.jsonmsg, f.nonce)
-            payload = json.loads(plaintext.decode())
-            
-            data = payload['data']
-            seq_incoming = payload['seq']
-
-            # Seq check
-            if seq_incoming != s.seq:
-                raise ValueError(f"Bad seq: expected {s.seq} got {seq_incoming}")
-            s.seq += 1
+            f.jsonmsg = await s.reader.readexactly(f.length)
 
-            return data
-        
+            data = _unbatch(s, _decode_frame(s, f))
+            if data is not None:
+                return data
+
+        except asyncio.IncompleteReadError:
+            raise ConnectionError("Connection closed.")
         except (ValueError, KeyError) as e:
             print(f"[WARNING] Ignored a bad package: {e}")
             continue
 
+async def hello_async(s, codecs=PAYLOAD_CODECS, compression=COMPRESSION_METHODS) -> str:
+    """asyncio twin of hello."""
+    await send_package_async(s, MessageTypes.HELLO, codecs, compression)
+    while True:
+        reply = await receive_package_async(s)
+        if reply.get("type") in ("hello", "shutdown"):
+            return _accept_hello(s, reply, codecs, compression)
+
+async def answer_hello_async(s, package) -> str:
+    """asyncio twin of answer_hello."""
+    if package.get("version") != PROTOCOL_VERSION:
+        await refuse_client_async(s, package.get("version"))
+    s.protocol = PROTOCOL_VERSION
+    codec = _pick(package.get("codecs"), PAYLOAD_CODECS, "json")
+    compression = _pick(package.get("compression"), COMPRESSION_METHODS)
+    await send_package_async(s, MessageTypes.HELLO, [codec], [compression] if compression else [])
+    s.codec, s.compression = codec, compression
+    return codec
+
+async def refuse_client_async(s, version):
+    """asyncio twin of refuse_client."""
+    await send_package_async(s, MessageTypes.SHUTDOWN, _version_notice(version))
+    raise ConnectionError("protocol version mismatch")
+
 # ─── Miscellaneous Utility ─────────────────────────────────────────────────────
 
+class LatencyStats:
+    """
+    Rolling latency recorder. Keeps the most recent `keep` samples (seconds)
+    and reports percentiles over them in milliseconds.
+    """
+    def __init__(self, keep=10_000):
+        self.samples = collections.deque(maxlen=keep)
+        self.count = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[idx] * 1000
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(max(self.samples, default=0.0) * 1000, 3),
+        }
+
+class CompressionStats:
+    """
+    Whether compression pays for itself, in this process: bytes in and out
+    and CPU time for every payload compressed (once, however many recipients
+    share it) and every frame decompressed, plus the bytes compressed frames
+    actually saved on the wire.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()    # outbox writer threads all record here
+        self.compressed = self.not_smaller = 0
+        self.compress_in = self.compress_out = 0
+        self.compress_seconds = 0.0
+        self.frames_sent = self.sent_raw = self.sent_compressed = 0
+        self.decompressed = self.decompress_in = self.decompress_out = 0
+        self.decompress_seconds = 0.0
+
+    def record_compress(self, raw, packed, seconds):
+        with self.lock:
+            if packed < raw:
+                self.compressed += 1
+            else:
+                self.not_smaller += 1
+            self.compress_in += raw
+            self.compress_out += packed
+            self.compress_seconds += seconds
+
+    def record_sent(self, raw, packed):
+        with self.lock:
+            self.frames_sent += 1
+            self.sent_raw += raw
+            self.sent_compressed += packed
+
+    def record_decompress(self, packed, raw, seconds):
+        with self.lock:
+            self.decompressed += 1
+            self.decompress_in += packed
+            self.decompress_out += raw
+            self.decompress_seconds += seconds
+
+    def summary(self):
+        attempts = self.compressed + self.not_smaller
+        return {
+            "payloads_compressed": self.compressed,
+            "payloads_not_smaller": self.not_smaller,
+            "compress_ratio": round(self.compress_out / self.compress_in, 3) if self.compress_in else None,
+            "compress_us_per_payload": round(self.compress_seconds / attempts * 1e6, 2) if attempts else None,
+            "frames_sent_compressed": self.frames_sent,
+            "wire_bytes_saved": self.sent_raw - self.sent_compressed,
+            "frames_decompressed": self.decompressed,
+            "decompress_ratio": round(self.decompress_in / self.decompress_out, 3) if self.decompress_out else None,
+            "decompress_us_per_frame": round(self.decompress_seconds / self.decompressed * 1e6, 2) if self.decompressed else None,
+        }
+
+compression_stats = CompressionStats()
+
+class PlayerQueue:
+    """
+    Ordered queue of players with O(1) append / appendleft / removal by player
+    and lookup by username, plus O(log n) position queries.
+
+    Order lives in an OrderedDict (player -> slot). Every player also owns a
+    slot number that only grows towards the back (and shrinks towards the
+    front for appendleft), and a Fenwick tree over the slots counts who is
+    still queued, so a player's position is the number of occupied slots in
+    front of theirs. Slots are renumbered when either end runs out of room.
+    Not thread-safe: callers hold whatever lock guards the queue.
+    """
+    def __init__(self, players=()):
+        self._slots = collections.OrderedDict()
+        self._by_name = {}
+        self._rebuild()
+        for player in players:
+            self.append(player)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __iter__(self):
+        return iter(list(self._slots))
+
+    def __contains__(self, player):
+        return player in self._slots
+
+    def __repr__(self):
+        return f"PlayerQueue({[p.username for p in self._slots]})"
+
+    # ── Fenwick tree ───────────────────────────────────────────────────────
+    def _rebuild(self):
+        n = len(self._slots)
+        pad = max(8, n)                 # free slots kept at each end
+        self._size = n + 2 * pad
+        self._lo, self._hi = pad, pad + n
+        self._tree = [0] * (self._size + 1)
+        for slot, player in enumerate(self._slots, start=pad):
+            self._slots[player] = slot
+            self._tree[slot + 1] = 1
+        for i in range(1, self._size + 1):
+            parent = i + (i & -i)
+            if parent <= self._size:
+                self._tree[parent] += self._tree[i]
+
+    def _add(self, slot, delta):
+        i = slot + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_before(self, slot):
+        total, i = 0, slot
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _track(self, player, slot):
+        self._slots[player] = slot
+        self._add(slot, 1)
+        if player.username is not None:
+            self._by_name[player.username] = player
+
+    # ── Queue operations ───────────────────────────────────────────────────
+    def append(self, player):
+        if self._hi == self._size:
+            self._rebuild()
+        self._track(player, self._hi)
+        self._hi += 1
+
+    def appendleft(self, player):
+        if self._lo == 0:
+            self._rebuild()
+        self._lo -= 1
+        self._track(player, self._lo)
+        self._slots.move_to_end(player, last=False)
+
+    def extendleft(self, players):
+        """Put `players` at the front, keeping their order."""
+        for player in reversed(list(players)):
+            self.appendleft(player)
+
+    def insert(self, index, player):
+        """Insert at `index`. O(index), so meant for the first few places."""
+        ahead = [self.popleft() for _ in range(min(index, len(self)))]
+        self.appendleft(player)
+        self.extendleft(ahead)
+
+    def discard(self, player) -> bool:
+        """Remove `player` if queued. Returns whether they were."""
+        slot = self._slots.pop(player, None)
+        if slot is None:
+            return False
+        self._add(slot, -1)
+        if self._by_name.get(player.username) is player:
+            del self._by_name[player.username]
+        return True
+
+    def popleft(self):
+        player = next(iter(self._slots))
+        self.discard(player)
+        return player
+
+    # ── Lookups ─────────────────────────────────────────────────────────────
+    def get(self, username):
+        """The queued player logged in as `username`, or None."""
+        return self._by_name.get(username)
+
+    def position(self, player):
+        """0-based index of `player` in the queue, or None if not queued."""
+        slot = self._slots.get(player)
+        if slot is None:
+            return None
+        return self._count_before(slot)
+
+    def head(self, n):
+        """The first `n` players (fewer if the queue is shorter)."""
+        return list(itertools.islice(self._slots, n))
+
+    def tail(self, start):
+        """Everyone from index `start` to the back, in order. O(len - start)."""
+        count = max(0, len(self._slots) - start)
+        return list(itertools.islice(reversed(self._slots), count))[::-1]
+
 def determine_winner_and_loser(p1, p2):
     """
     Probe p1's connection: if it's still good, p1 is the winner; otherwise p2 is.
@@ -218,8 +1229,12 @@ def wait_for_message(player,
                      timeout: float = 30.0,
                      allowed: tuple[str, ...] | None = None) -> str | None:
     """
-    Block (with polling) until the player has typed something or the
-    timeout elapses.
+    Take the oldest command from the player's input queue (`player.inputs`),
+    blocking until one arrives or the timeout elapses. Sleeps on
+    `player.msg_ready` (a Condition over `player.msg_lock`), which
+    client_handler notifies as soon as input arrives or the socket drops, so
+    there is no polling delay and a waiting match uses no CPU. Commands the
+    client pipelined ahead of the prompt are consumed in the order sent.
 
     * `allowed` - optional tuple of accepted replies (case-insensitive).
                   If given, the first match (UPPER-CASE) is returned;
@@ -232,28 +1247,73 @@ def wait_for_message(player,
     Raises ConnectionError if the socket drops.
     """
     player.my_turn = True          # opens the gate in client_handler
-    start = time.time()
+    deadline = time.monotonic() + timeout
+
+    try:
+        with player.msg_ready:
+            while True:
+                if not player.connected:
+                    raise ConnectionError
+
+                while player.inputs:
+                    raw = player.inputs.popleft().strip()
+
+                    if allowed is None:
+                        return raw            # normal gameplay / placement
+
+                    cand = raw.upper()
+                    if cand in allowed:
+                        return cand           # validated prompt reply
+                    # else: garbage - discard it and keep waiting
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                player.msg_ready.wait(remaining)
+    finally:
+        player.my_turn = False
 
-    while time.time() - start < timeout:
-        if not player.connected:
-            raise ConnectionError
 
-        with player.msg_lock:
-            if player.latest_coord is not None:
-                raw = player.latest_coord.strip()
-                player.latest_coord = None
+async def wait_for_message_async(player,
+                                 timeout: float = 30.0,
+                                 allowed: tuple[str, ...] | None = None) -> str | None:
+    """
+    asyncio twin of wait_for_message. Awaits the player's `inbox`
+    (a bounded asyncio.Queue fed in arrival order by the client handler)
+    instead of polling, so a waiting match costs nothing until input arrives.
+
+    Same contract: returns the raw string (or the validated UPPER-CASE
+    variant if `allowed` was supplied), None on timeout, and raises
+    ConnectionError if the player drops.
+    """
+    player.my_turn = True
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    try:
+        while True:
+            if not player.connected:
+                raise ConnectionError
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
 
-                if allowed is None:
-                    player.my_turn = False
-                    return raw            # normal gameplay / placement
+            try:
+                raw = await asyncio.wait_for(player.inbox.get(), remaining)
+            except asyncio.TimeoutError:
+                return None
 
-                cand = raw.upper()
-                if cand in allowed:
-                    player.my_turn = False
-                    return cand           # validated prompt reply
-                # else: garbage - keep looping until timeout
+            if raw is None:            # handler posts None when the socket drops
+                raise ConnectionError
 
-        time.sleep(0.05)
+            raw = raw.strip()
+            if allowed is None:
+                return raw
 
-    player.my_turn = False
-    return None
\ No newline at end of file
+            cand = raw.upper()
+            if cand in allowed:
+                return cand
+            # else: garbage - keep waiting until timeout
+    finally:
+        player.my_turn = False